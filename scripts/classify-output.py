@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Streaming Error Classifier for Multi-Agent Squad
+Reads tool output from stdin in bounded chunks and forwards a short excerpt of real errors
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+CHUNK_SIZE = 64 * 1024
+MAX_LINE = 4096
+MAX_EXCERPT_LINES = 12
+MAX_EXCERPT_CHARS = 1500
+TAIL_LINES = 5
+
+# (signature, pattern, severity); higher severity wins the classification
+SIGNATURES = [
+    ("panic", r'\b(?:panic(?:ked)?|segmentation fault|core dumped|out of memory|OOMKilled)\b', 5),
+    ("fatal", r'\bfatal\b|\bFATAL\b', 5),
+    ("traceback", r'^Traceback \(most recent call last\)', 4),
+    ("exception", r'(?-i:\b\w*(?:Exception|Error):\s)', 4),
+    ("npm-error", r'^npm ERR!', 4),
+    ("build-failed", r'\b(?:build|compilation|compile) (?:failed|error)\b', 4),
+    ("test-failed", r'\b\d+ (?:failed|failing)\b|^FAILED |\bTests? failed\b', 3),
+    ("error", r'\berror\b|\bERROR\b|\bError\b', 3),
+    ("failed", r'\bfail(?:ed|ure)?\b', 2),
+    ("critical", r'\bcritical\b', 2),
+    ("warning", r'\bwarn(?:ing)?\b', 1),
+]
+SEVERITY_NAMES = {5: "critical", 4: "error", 3: "error", 2: "warning", 1: "warning"}
+
+# Phrases that mention errors without reporting one
+BENIGN_RE = re.compile(r'\b(?:0 errors?|0 failed|no errors?|errors?: 0|without errors?)\b', re.IGNORECASE)
+# Volatile tokens removed before deduplicating lines
+NORMALIZE_RE = re.compile(r'0x[0-9a-f]+|\b\d+(?:\.\d+)*\b|[0-9a-f]{8,}', re.IGNORECASE)
+
+# Every signature contains one of these; a bytes.find() prefilter skips all other lines
+KEYWORDS = (b'error', b'fail', b'fatal', b'panic', b'segmentation fault', b'core dumped',
+            b'out of memory', b'oomkilled', b'traceback', b'exception', b'npm err',
+            b'critical', b'warn')
+
+COMBINED_RE = re.compile(
+    '|'.join(f'(?P<s{i}>{pattern})' for i, (_, pattern, _) in enumerate(SIGNATURES)),
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+class OutputClassifier:
+    """Incremental classifier; memory stays bounded regardless of input size"""
+
+    def __init__(self):
+        self.partial = b''
+        self.bytes_read = 0
+        self.lines = 0
+        self.hits: Dict[str, int] = {}
+        self.severity = 0
+        self.excerpt: "OrderedDict[str, List]" = OrderedDict()
+        self.tail = deque(maxlen=TAIL_LINES)
+
+    def feed(self, chunk: bytes) -> None:
+        self.bytes_read += len(chunk)
+        data = self.partial + chunk
+        cut = data.rfind(b'\n') + 1
+        # Keep an unterminated line for the next chunk, bounded to MAX_LINE
+        self.partial = data[cut:][-MAX_LINE:]
+        self._block(data[:cut])
+
+    def close(self) -> None:
+        if self.partial:
+            self._block(self.partial + b'\n')
+            self.partial = b''
+
+    def _block(self, block: bytes) -> None:
+        """Scan a run of complete lines; only lines containing a keyword are decoded"""
+        if not block:
+            return
+        self.lines += block.count(b'\n')
+        for line in block[-TAIL_LINES * MAX_LINE:].splitlines()[-TAIL_LINES:]:
+            if line.strip():
+                self.tail.append(line.strip().decode('utf-8', 'replace'))
+
+        lowered = block.lower()
+        starts = set()
+        for keyword in KEYWORDS:
+            pos = lowered.find(keyword)
+            while pos != -1:
+                start = lowered.rfind(b'\n', 0, pos) + 1
+                starts.add(start)
+                pos = lowered.find(keyword, lowered.find(b'\n', pos) + 1 or len(lowered))
+        for start in sorted(starts):
+            end = block.find(b'\n', start)
+            self._line(block[start:end][:MAX_LINE].decode('utf-8', 'replace'))
+
+    def _line(self, line: str) -> None:
+        stripped = line.strip()
+        if not stripped or BENIGN_RE.search(stripped):
+            return
+        severity = 0
+        for match in COMBINED_RE.finditer(stripped):
+            name, _, weight = SIGNATURES[int(match.lastgroup[1:])]
+            self.hits[name] = self.hits.get(name, 0) + 1
+            severity = max(severity, weight)
+        self.severity = max(self.severity, severity)
+        if severity < 2:
+            return
+        key = NORMALIZE_RE.sub('#', stripped.lower())
+        if key in self.excerpt:
+            self.excerpt[key][1] += 1
+        elif len(self.excerpt) < MAX_EXCERPT_LINES:
+            self.excerpt[key] = [stripped[:200], 1]
+
+    def result(self) -> Dict:
+        lines = []
+        for text, count in self.excerpt.values():
+            lines.append(f"{text}  (x{count})" if count > 1 else text)
+        excerpt = '\n'.join(lines)
+        if len(excerpt) > MAX_EXCERPT_CHARS:
+            excerpt = excerpt[:MAX_EXCERPT_CHARS] + "\n..."
+        return {
+            'severity': self.severity,
+            'level': SEVERITY_NAMES.get(self.severity, "ok"),
+            'signatures': self.hits,
+            'lines': self.lines,
+            'bytes': self.bytes_read,
+            'excerpt': excerpt,
+            'tail': '\n'.join(self.tail),
+        }
+
+
+def classify_stream(stream, copy=None) -> Dict:
+    """Classify a binary stream; `copy`, a writable file, receives the raw output as it is read"""
+    classifier = OutputClassifier()
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        classifier.feed(chunk)
+        if copy is not None:
+            copy.write(chunk)
+    classifier.close()
+    return classifier.result()
+
+
+def notify(target: str, message: str, result: Dict, log_path: Optional[str] = None) -> int:
+    """Hand the bounded excerpt to the Slack or email notifier; email also attaches the full log"""
+    details = result['excerpt']
+    if result['tail'] and result['tail'] not in details:
+        details += "\n--- last lines ---\n" + result['tail'][-500:]
+    summary = f"{message} [{result['level']}: {', '.join(sorted(result['signatures']))}]"
+    if target == "slack":
+        command = ["python", "scripts/slack-notify.py", summary, "--error", details]
+        if result['severity'] >= 5:
+            command.append("--mention")
+    else:
+        command = ["python", "scripts/email-notify.py", "--template", "error_alert",
+                   "--message", summary, "--error", details, "--immediate"]
+        if log_path:
+            command += ["--error-file", log_path]
+    return subprocess.run(command).returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify tool output read from stdin")
+    parser.add_argument("message", nargs="?", default="⚠️ Error detected in command output",
+                        help="Notification headline")
+    parser.add_argument("--notify", choices=["slack", "email"], help="Notifier to call on errors")
+    parser.add_argument("--min-severity", type=int, default=3,
+                        help="Lowest severity that counts as an error (1-5)")
+    parser.add_argument("--json", action="store_true", help="Print the classification")
+    args = parser.parse_args()
+
+    # Email attaches the whole output, so keep a raw copy on disk while classifying
+    copy = None
+    if args.notify == "email":
+        copy = tempfile.NamedTemporaryFile(prefix="command-output-", suffix=".log", delete=False)
+    try:
+        result = classify_stream(sys.stdin.buffer, copy)
+        if copy is not None:
+            copy.close()
+        if args.json:
+            print(json.dumps(result, indent=2))
+
+        if result['severity'] < args.min_severity:
+            return
+        if args.notify:
+            sys.exit(notify(args.notify, args.message, result, copy.name if copy is not None else None))
+        if not args.json:
+            print(f"{result['level']}: {', '.join(sorted(result['signatures']))}")
+            print(result['excerpt'])
+    finally:
+        if copy is not None:
+            copy.close()
+            os.unlink(copy.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -355,6 +355,7 @@ event = "Notification"
 time = "17:00"
 days = ["friday"]
 command = '''
+python scripts/git_activity.py sync-github
 python scripts/email-notify.py --template weekly_report
 '''
 
@@ -384,9 +385,20 @@ run_in_background = true
 [hooks.matcher]
 tool_name = "Bash"
 command = '''
-if echo "$CLAUDE_OUTPUT" | grep -qiE "(error|failed|exception|fatal|critical)"; then
-    python scripts/email-notify.py --template error_alert --error "$CLAUDE_OUTPUT" --immediate
-fi
+# Classify the output as a stream; only a short excerpt reaches the notifier
+printf '%s' "$CLAUDE_OUTPUT" | python scripts/classify-output.py --notify email "🚨 Error detected in command output"
+'''
+
+"""
+        
+        # Daily digest of everything queued without --immediate
+        if prefs.get('daily_digest'):
+            hooks_content += """[[hooks]]
+event = "Notification"
+[hooks.matcher]
+time = "18:00"
+command = '''
+python scripts/email-notify.py --send-digest
 '''
 
 """
@@ -425,15 +437,39 @@ from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+try:
+    import email_delivery
+except ImportError:
+    email_delivery = None
+try:
+    import git_activity
+except ImportError:
+    git_activity = None
+try:
+    import weekly_report
+except ImportError:
+    weekly_report = None
+
 def load_config():
     """Load email configuration"""
     config_path = Path(".claude/integrations/email.json")
     if not config_path.exists():
         print("Error: Email not configured. Run: python scripts/email-integration.py")
         sys.exit(1)
+    if email_delivery is not None:
+        return email_delivery.load_config()
         
-    with open(config_path) as f:
-        config = json.load(f)
+    # The validated config snapshot avoids re-parsing JSON on every notification
+    config = None
+    try:
+        from hook_config import load_integration
+        config = load_integration("email")
+    except ImportError:
+        pass
+    if config is None:
+        with open(config_path) as f:
+            config = json.load(f)
         
     # Load sensitive data from env file
     env_path = Path(".env.email")
@@ -447,33 +483,34 @@ def load_config():
                     
     return config
 
-def get_project_stats():
-    """Gather project statistics for reports"""
+def get_project_stats(activity=False):
+    """Gather project statistics for reports; git activity only when the template shows it"""
     stats = {
         "date": datetime.datetime.now().strftime("%Y-%m-%d"),
         "time": datetime.datetime.now().strftime("%H:%M"),
         "commits_today": "N/A",
         "files_changed": "N/A",
+        "lines_changed": "N/A",
         "todos_completed": "N/A"
     }
     
-    # Try to get git stats
-    try:
-        import subprocess
-        result = subprocess.run(
-            ["git", "log", "--since=midnight", "--oneline"],
-            capture_output=True, text=True
-        )
-        if result.returncode == 0:
-            stats["commits_today"] = len(result.stdout.strip().split('\\n')) if result.stdout.strip() else 0
-    except:
-        pass
+    # The activity store only reads commits made since its last refresh
+    if activity and git_activity is not None:
+        try:
+            store = git_activity.ActivityStore()
+            store.refresh()
+            today = store.day()
+            stats["commits_today"] = today['commits']
+            stats["files_changed"] = today['files_changed']
+            stats["lines_changed"] = f"+{today['lines_added']} -{today['lines_removed']}"
+        except Exception:
+            pass
         
     return stats
 
 def create_email_content(template, **kwargs):
     """Create email content based on template"""
-    stats = get_project_stats()
+    stats = get_project_stats(activity=template == "daily_summary")
     
     if template == "daily_summary":
         subject = f"Daily Project Summary - {stats['date']}"
@@ -487,6 +524,7 @@ Time: {stats['time']}
 Today's Activity:
 - Commits: {stats['commits_today']}
 - Files Changed: {stats['files_changed']}
+- Lines: {stats['lines_changed']}
 - Tasks Completed: {stats['todos_completed']}
 
 Have a great evening!
@@ -500,10 +538,7 @@ Weekly Project Report
 
 Week ending: {stats['date']}
 
-This week's highlights:
-- [Summary of major accomplishments]
-- [Key metrics and progress]
-- [Upcoming priorities]
+Activity details need scripts/git_activity.py and scripts/weekly_report.py.
 
 Generated automatically by Multi-Agent Squad
 """
@@ -539,26 +574,123 @@ Please investigate immediately.
         
     return subject, body
 
-def send_email(subject, body, immediate=False):
+def read_error_file(path, excerpt=None):
+    """Read an error log as a stream: a bounded excerpt for the body, the full log gzipped to attach"""
+    try:
+        stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    except OSError as e:
+        print(f"Error: cannot read {path}: {e}")
+        sys.exit(1)
+    try:
+        if email_delivery is None:
+            # Without the outbox there is nowhere to keep an attachment; send the start of the log
+            head = stream.read(2000).decode("utf-8", "replace")
+            while stream.read(65536):
+                pass
+            return excerpt or head, None
+        log = email_delivery.spool_log(stream, "output.log" if path == "-" else os.path.basename(path))
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+    note = f"Full log attached: {log['filename']} ({log['bytes']} bytes{', truncated' if log['truncated'] else ''})"
+    return f"{excerpt or log['excerpt']}\\n\\n{note}", log
+
+def discard(attachment):
+    """Remove a spooled log that will not be sent"""
+    if attachment:
+        Path(attachment['path']).unlink(missing_ok=True)
+
+def send_email(subject, body, immediate=False, template=None, severity="info", attachment=None):
     """Send email using configured service"""
     config = load_config()
     
     # Check preferences
-    if config['preferences'].get('daily_digest') and not immediate:
-        # Queue for daily digest (would implement queuing here)
+    if config['preferences'].get('daily_digest') and not immediate and email_delivery is not None:
+        # The digest carries the excerpt only
+        discard(attachment)
+        queue = email_delivery.DigestQueue()
+        depth = queue.append(template or "notification", severity, subject, body)
         print(f"Email queued for daily digest: {subject}")
+        threshold = config.get('digest_alert_threshold', email_delivery.DIGEST_ALERT_THRESHOLD)
+        if depth > threshold and queue.should_alert():
+            print(f"⚠️ Email digest backlog: {depth} notifications queued", file=sys.stderr)
+            dispatch(config, f"⚠️ Email digest backlog: {depth} notifications queued",
+                     f"{depth} notifications are waiting for the daily digest (alert threshold {threshold}).\\n\\n"
+                     "Check that the digest hook runs, or send it now with:\\n"
+                     "  python scripts/email-notify.py --send-digest\\n")
         return
         
-    # Send based on service type
+    # Storm protection for alerts: repeats and bursts are held back and reported in one summary.
+    # Scheduled mail (daily summaries, reports) is never held back by an alert storm
+    if (immediate or template == "error_alert") and template is not None and email_delivery is not None:
+        admitted, reason = email_delivery.AlertGuard(config).admit(template, subject, body)
+        if not admitted:
+            print(f"🔕 Email suppressed ({reason}): {subject}")
+            discard(attachment)
+            # The background sender emails the suppressed-alerts summary when the window ends
+            email_delivery.ensure_sender()
+            return
+        
+    if not dispatch(config, subject, body, wait=template is None, attachment=attachment):
+        sys.exit(1)
+
+def dispatch(config, subject, body, wait=False, html_body=None, attachment=None):
+    """Send based on service type; True when the message was handed to the provider"""
     if config['service'] in ['gmail', 'smtp']:
-        send_smtp_email(config, subject, body)
+        return send_smtp_email(config, subject, body, wait, html_body, attachment)
     elif config['service'] == 'sendgrid':
-        send_sendgrid_email(config, subject, body)
+        return send_sendgrid_email(config, subject, body, wait, html_body, attachment)
     elif config['service'] == 'aws_ses':
-        send_ses_email(config, subject, body)
-        
-def send_smtp_email(config, subject, body):
+        return send_ses_email(config, subject, body, wait, html_body, attachment)
+    discard(attachment)
+    return False
+
+def send_weekly_report():
+    """Render the weekly report once per recipient group and send each group its copy"""
+    config = load_config()
+    sent = True
+    for report in weekly_report.build_reports(config):
+        if not report['recipients']:
+            continue
+        group_config = {**config, 'recipients': report['recipients']}
+        sent = dispatch(group_config, report['subject'], report['text'], html_body=report['html']) and sent
+    if not sent:
+        sys.exit(1)
+
+def send_digest():
+    """Send everything queued for the daily digest as one email, grouped by severity and template"""
+    if email_delivery is None:
+        print("Error: scripts/email_delivery.py is missing; the digest queue is unavailable")
+        sys.exit(1)
+    config = load_config()
+    queue = email_delivery.DigestQueue()
+    digest = queue.claim()
+    if digest is None:
+        print("No queued notifications for the daily digest")
+        return
+    subject, body = email_delivery.render_digest(queue.groups(digest))
+    if not dispatch(config, subject, body, wait=True):
+        queue.release(digest)
+        sys.exit(1)
+    queue.purge(digest)
+        
+def send_via_outbox(config, subject, body, wait, html_body=None, attachment=None):
+    """Queue for the background sender, which pools SMTP sessions and batches recipients per API request"""
+    if email_delivery is None:
+        print("Error: scripts/email_delivery.py is missing; only SMTP can send without it")
+        return False
+    if email_delivery.deliver(config, subject, body, wait=wait, html_body=html_body, attachment=attachment):
+        print(f"✅ Email {'sent' if wait else 'queued'}: {subject}")
+        return True
+    print(f"❌ Failed to send email: {subject} (see .claude/cache/email-dead-letter.jsonl)")
+    return False
+
+def send_smtp_email(config, subject, body, wait=False, html_body=None, attachment=None):
     """Send email via SMTP"""
+    if email_delivery is not None:
+        return send_via_outbox(config, subject, body, wait, html_body, attachment)
+
+    # Without email_delivery.py: one direct smtplib session per email
     msg = MIMEMultipart()
     msg['From'] = config['from_email']
     msg['To'] = ', '.join(config['recipients'])
@@ -576,18 +708,18 @@ def send_smtp_email(config, subject, body):
             server.login(config['username'], config['password'])
             server.send_message(msg)
         print(f"✅ Email sent: {subject}")
+        return True
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
+        return False
 
-def send_sendgrid_email(config, subject, body):
-    """Send email via SendGrid"""
-    print(f"📧 SendGrid email: {subject}")
-    print("(SendGrid implementation would go here)")
+def send_sendgrid_email(config, subject, body, wait=False, html_body=None, attachment=None):
+    """Send email via the SendGrid v3 mail/send API"""
+    return send_via_outbox(config, subject, body, wait, html_body, attachment)
     
-def send_ses_email(config, subject, body):
-    """Send email via AWS SES"""
-    print(f"📧 AWS SES email: {subject}")
-    print("(AWS SES implementation would go here)")
+def send_ses_email(config, subject, body, wait=False, html_body=None, attachment=None):
+    """Send email via AWS SES SendBulkEmail (raw SendEmail when a log is attached)"""
+    return send_via_outbox(config, subject, body, wait, html_body, attachment)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -595,18 +727,35 @@ if __name__ == "__main__":
     parser.add_argument("--message", help="Custom message")
     parser.add_argument("--status", type=int, help="Status code")
     parser.add_argument("--error", help="Error details")
+    parser.add_argument("--error-file", metavar="PATH",
+                        help="Read error details from a file ('-' for stdin) and attach the full log gzipped")
     parser.add_argument("--immediate", action="store_true", help="Send immediately")
+    parser.add_argument("--severity", choices=["critical", "error", "warning", "info"],
+                        help="Digest grouping (default: from the template and status)")
+    parser.add_argument("--send-digest", action="store_true", help="Send the queued daily digest now")
     
     args = parser.parse_args()
     
-    if args.template:
+    if args.send_digest:
+        send_digest()
+    elif args.template == "weekly_report" and weekly_report is not None:
+        # A full report per recipient group; it is a digest itself, so it is never queued into one
+        send_weekly_report()
+    elif args.template:
+        error, attachment = args.error, None
+        if args.error_file:
+            # --error, when also given, stays the body's excerpt
+            error, attachment = read_error_file(args.error_file, args.error)
         subject, body = create_email_content(
             args.template,
             status=args.status,
-            error=args.error,
+            error=error,
             message=args.message
         )
-        send_email(subject, body, args.immediate)
+        severity = args.severity
+        if severity is None:
+            severity = email_delivery.severity_for(args.template, args.status) if email_delivery else "info"
+        send_email(subject, body, args.immediate, args.template, severity, attachment)
     else:
         # Test email
         send_email(
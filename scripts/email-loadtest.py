@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Email Delivery Benchmark for Multi-Agent Squad
+Drives the notifier that email-integration.py generates against an embedded SMTP sink and reports
+messages per second, SMTP connections and end-to-end latency for the immediate, digest and batched paths
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import shutil
+import signal
+import secrets
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# Modules the generated notifier imports inside the scratch project
+SUPPORT_SCRIPTS = ('email_delivery.py', 'hook_config.py', 'git_activity.py', 'weekly_report.py')
+PATHS = ('immediate', 'digest', 'batched')
+PASSWORD = "loadtest"
+
+DIGEST_COUNT_RE = re.compile(r'\((\d+) notifications?\)')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def load_script(name: str):
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_')[:-3], SCRIPTS_DIR / name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def prepare_project(root: Path, port: int, args) -> None:
+    """Set up a scratch project with the config and notifier email-integration.py generates"""
+    (root / "scripts").mkdir(parents=True, exist_ok=True)
+    for name in SUPPORT_SCRIPTS:
+        os.symlink(SCRIPTS_DIR / name, root / "scripts" / name)
+
+    integration = load_script("email-integration.py").EmailIntegration()
+    config = {"service": "smtp", "smtp_server": "127.0.0.1", "smtp_port": port, "use_tls": False,
+              "username": "loadtest@localhost", "password": PASSWORD, "from_email": "loadtest@localhost"}
+    recipients = [f"dev{i}@localhost" for i in range(args.recipients)]
+    prefs = {'html_emails': False, 'daily_digest': False, 'critical_only': False}
+    integration._create_email_config(config, recipients, ['error_alerts'], prefs)
+    integration._create_notification_script()
+
+    # Every benchmark notification must reach the sink, so storm protection never holds one back
+    configure(max_concurrency=args.concurrency, alert_burst=args.count * 2, alert_rate_per_hour=1e9,
+              suppression_window=0, circuit_threshold=10 ** 9)
+
+
+def configure(preferences: Optional[Dict] = None, **changes) -> None:
+    path = Path(".claude/integrations/email.json")
+    config = json.loads(path.read_text())
+    config.update(changes)
+    config['preferences'].update(preferences or {})
+    path.write_text(json.dumps(config, indent=2))
+
+
+def sender_running(lock_path: Path) -> bool:
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return False
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+
+
+class Sender:
+    """The project's background sender, owned by the benchmark so its CPU time can be measured.
+    Notifiers see its lock held and only queue"""
+
+    def __init__(self, idle_exit: float):
+        from email_delivery import SENDER_LOCK
+        SENDER_LOCK.parent.mkdir(parents=True, exist_ok=True)
+        self.process = subprocess.Popen([sys.executable, "scripts/email_delivery.py", "send",
+                                         "--idle-exit", str(idle_exit)],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while not sender_running(SENDER_LOCK) and self.process.poll() is None:
+            time.sleep(0.05)
+
+    def stop(self) -> float:
+        """Stop the sender and return the CPU seconds it used"""
+        if self.process.poll() is not None:
+            return 0.0
+        self.process.send_signal(signal.SIGTERM)
+        _, status, usage = os.wait4(self.process.pid, 0)
+        self.process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        return usage.ru_utime + usage.ru_stime
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Benchmark:
+    """Sends tagged notifications down one delivery path and matches what the sink received"""
+
+    def __init__(self, args, sink):
+        self.args = args
+        self.sink = sink
+        self.run_id = secrets.token_hex(3)
+        self.sent: Dict[str, float] = {}
+        self.calls: List[float] = []
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def tag(self, path: str, seq: int) -> str:
+        return f"bm-{self.run_id}-{path}-{seq:06d}"
+
+    def notify(self, tag: str, immediate: bool) -> None:
+        """One notifier process, as a hook would run it"""
+        command = [sys.executable, "scripts/email-notify.py", "--template", "notification",
+                   "--message", f"Benchmark notification {tag}"]
+        if immediate:
+            command.append("--immediate")
+        with self.lock:
+            self.sent[tag] = time.time()
+        start = time.perf_counter()
+        returncode = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+        with self.lock:
+            self.calls.append(time.perf_counter() - start)
+            self.failures += returncode != 0
+
+    def drive(self, path: str, immediate: bool) -> None:
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            for future in [pool.submit(self.notify, self.tag(path, seq), immediate)
+                           for seq in range(self.args.count)]:
+                future.result()
+
+    def wait_for(self, done, deadline: float) -> bool:
+        while time.monotonic() < deadline:
+            if done(self.sink.snapshot()[0]):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def run(self, path: str) -> Dict:
+        self.sent, self.calls, self.failures = {}, [], 0
+        self.sink.reset()
+        # The sender only exits when stopped, so its connections and CPU belong to this path
+        sender = Sender(self.args.settle + 60)
+        cpu_before = children_cpu()
+        start = time.time()
+        digest_started = None
+        try:
+            if path == 'immediate':
+                self.drive(path, immediate=True)
+                settled = self.wait_for(lambda messages: len(self.seen(messages)) >= len(self.sent),
+                                        time.monotonic() + self.args.settle)
+            elif path == 'digest':
+                configure(preferences={'daily_digest': True})
+                try:
+                    self.drive(path, immediate=False)
+                    digest_started = time.time()
+                    subprocess.run([sys.executable, "scripts/email-notify.py", "--send-digest"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                finally:
+                    configure(preferences={'daily_digest': False})
+                settled = self.wait_for(lambda messages: any(DIGEST_COUNT_RE.search(m['subject'])
+                                                             for m in messages),
+                                        time.monotonic() + self.args.settle)
+            else:
+                self.enqueue(path)
+                settled = self.wait_for(lambda messages: len(self.seen(messages)) >= len(self.sent),
+                                        time.monotonic() + self.args.settle)
+        finally:
+            notifier_cpu = children_cpu() - cpu_before
+            sender_cpu = sender.stop()
+        messages, stats = self.sink.snapshot()
+        return self.account(path, messages, stats, start, digest_started, notifier_cpu, sender_cpu, settled)
+
+    def enqueue(self, path: str) -> None:
+        """Queue a batch straight into the outbox, as a weekly report or an alert burst lands there"""
+        from email_delivery import Outbox, load_config
+        config = load_config()
+        outbox = Outbox()
+        for seq in range(self.args.count):
+            tag = self.tag(path, seq)
+            self.sent[tag] = time.time()
+            outbox.enqueue('smtp', config['from_email'], list(config['recipients']),
+                           f"Benchmark {tag}", f"Benchmark notification {tag}")
+
+    def seen(self, messages: List[Dict]) -> Dict[str, List[float]]:
+        """Receive times per tag"""
+        pattern = re.compile(rf'bm-{self.run_id}-\w+-\d{{6}}')
+        seen: Dict[str, List[float]] = {}
+        for message in messages:
+            for tag in set(pattern.findall(message['body'])):
+                seen.setdefault(tag, []).append(message['received'])
+        return seen
+
+    def account(self, path: str, messages: List[Dict], stats: Dict, start: float, digest_started: Optional[float],
+                notifier_cpu: float, sender_cpu: float, settled: bool) -> Dict:
+        seen = self.seen(messages)
+        latencies = []
+        digest = None
+        if path == 'digest':
+            # The digest collapses repeats, so count what its subject reports instead of matching tags
+            digest = next((m for m in messages if DIGEST_COUNT_RE.search(m['subject'])), None)
+            delivered = int(DIGEST_COUNT_RE.search(digest['subject']).group(1)) if digest else 0
+            duplicated = max(0, len(messages) - 1)
+            if digest:
+                latencies = [digest['received'] - sent for sent in self.sent.values()]
+            finished = digest['received'] if digest else time.time()
+        else:
+            delivered = sum(1 for tag in self.sent if tag in seen)
+            duplicated = sum(len(times) - 1 for times in seen.values())
+            latencies = [min(seen[tag]) - sent for tag, sent in self.sent.items() if tag in seen]
+            finished = max((m['received'] for m in messages), default=time.time())
+        elapsed = max(1e-6, finished - start)
+        return {
+            'path': path,
+            'sent': len(self.sent),
+            'delivered': delivered,
+            'lost': max(0, len(self.sent) - delivered),
+            'duplicated': duplicated,
+            'messages': len(messages),
+            'connections': stats.get('connections', 0),
+            'peak_sessions': stats.get('peak_sessions', 0),
+            'tempfail': stats.get('tempfail', 0),
+            'elapsed': elapsed,
+            'rate': delivered / elapsed,
+            'latencies': latencies,
+            'calls': list(self.calls),
+            'digest_send': digest['received'] - digest_started if digest else None,
+            'notifier_cpu': notifier_cpu,
+            'sender_cpu': sender_cpu,
+            'failures': self.failures,
+            'settled': settled,
+        }
+
+
+def report(result: Dict) -> None:
+    sent = max(1, result['sent'])
+    latencies = result['latencies']
+    print(f"\n📊 {result['path']}: {result['sent']} notifications ({result['elapsed']:.1f}s)")
+    print(f"  delivered:    {result['delivered']:>6}  in {result['messages']} messages over "
+          f"{result['connections']} connections (peak {result['peak_sessions']} at once)")
+    print(f"  lost:         {result['lost']:>6}")
+    print(f"  duplicated:   {result['duplicated']:>6}")
+    print(f"  throughput:   {result['rate']:.1f} notifications/s")
+    if latencies:
+        print(f"  latency:      p50 {percentile(latencies, 50) * 1000:.0f}ms  "
+              f"p90 {percentile(latencies, 90) * 1000:.0f}ms  p99 {percentile(latencies, 99) * 1000:.0f}ms  "
+              f"max {max(latencies) * 1000:.0f}ms")
+    if result['digest_send'] is not None:
+        print(f"  digest:       sent {result['digest_send'] * 1000:.0f}ms after --send-digest started")
+    if result['calls']:
+        print(f"  notifier:     p50 {percentile(result['calls'], 50) * 1000:.0f}ms  "
+              f"p90 {percentile(result['calls'], 90) * 1000:.0f}ms per call")
+    print(f"  cpu/message:  {(result['notifier_cpu'] + result['sender_cpu']) / sent * 1000:.1f}ms  "
+          f"(notifiers {result['notifier_cpu'] / sent * 1000:.1f}ms, "
+          f"sender {result['sender_cpu'] / sent * 1000:.1f}ms)")
+    if result['tempfail']:
+        print(f"  sink:         {result['tempfail']} messages answered 451 and retried")
+    if result['failures']:
+        print(f"⚠️  {result['failures']} notifier runs exited non-zero")
+    if not result['settled']:
+        print("⚠️  Not everything arrived before --settle; the rest counts as lost")
+
+
+def run(args) -> int:
+    sink_module = load_script("email-sink.py")
+    sink = sink_module.SmtpSink(args.latency / 1000, args.jitter / 1000, args.tempfail_rate, PASSWORD,
+                                seed=args.seed)
+    server = sink_module.serve("127.0.0.1", 0, sink)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = Path(args.workdir or tempfile.mkdtemp(prefix="email-loadtest-")).resolve()
+    cwd = os.getcwd()
+    results = []
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        os.chdir(root)
+        prepare_project(root, server.server_address[1], args)
+        sys.path.insert(0, str(root / "scripts"))
+
+        benchmark = Benchmark(args, sink)
+        print(f"🚀 {args.count} notifications per path to {args.recipients} recipient(s) → "
+              f"SMTP sink on port {server.server_address[1]}")
+        for path in args.paths:
+            results.append(benchmark.run(path))
+            report(results[-1])
+
+        print(f"\n{'path':<10} {'msg/s':>8} {'p50':>8} {'p99':>8} {'conns':>6} {'lost':>6}")
+        for result in results:
+            print(f"{result['path']:<10} {result['rate']:>8.1f} "
+                  f"{percentile(result['latencies'], 50) * 1000:>6.0f}ms "
+                  f"{percentile(result['latencies'], 99) * 1000:>6.0f}ms "
+                  f"{result['connections']:>6} {result['lost']:>6}")
+        if args.json:
+            print(json.dumps([{k: v for k, v in r.items() if k not in ('latencies', 'calls')} for r in results]))
+        return 1 if any(result['lost'] for result in results) else 0
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        server.server_close()
+        if not args.workdir and not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+        elif args.keep:
+            print(f"📁 Scratch project kept at {root}")
+
+
+def parse_paths(value: str) -> Tuple[str, ...]:
+    paths = tuple(p.strip() for p in value.split(',') if p.strip())
+    unknown = [p for p in paths if p not in PATHS]
+    if unknown or not paths:
+        raise argparse.ArgumentTypeError(f"paths must be a comma-separated subset of {', '.join(PATHS)}")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark email delivery paths against an embedded SMTP sink")
+    parser.add_argument("--paths", type=parse_paths, default=PATHS,
+                        help="Comma-separated paths to run: immediate, digest, batched (default: all)")
+    parser.add_argument("--count", type=int, default=100, help="Notifications per path")
+    parser.add_argument("--recipients", type=int, default=1, help="Recipients per message")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Notifier processes run at once, and the sender's max_concurrency")
+    parser.add_argument("--settle", type=float, default=60.0, help="Seconds to wait for delivery per path")
+    parser.add_argument("--latency", type=float, default=0.0, help="Sink: milliseconds before answering a message")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Sink: extra random milliseconds")
+    parser.add_argument("--tempfail-rate", type=float, default=0.0, help="Sink: fraction of messages answered 451")
+    parser.add_argument("--seed", type=int, help="Sink: random seed")
+    parser.add_argument("--workdir", help="Scratch project directory (default: a temporary one)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch project for inspection")
+    parser.add_argument("--json", action="store_true", help="Also print the results as JSON")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
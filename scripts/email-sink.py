@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Local SMTP Sink for Multi-Agent Squad
+Accepts, stores and counts SMTP deliveries so the email notifier can be tested without a mail server,
+optionally injecting latency and temporary 4xx failures
+"""
+
+import re
+import sys
+import time
+import email
+import base64
+import random
+import argparse
+import threading
+import socketserver
+from email.header import decode_header, make_header
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MAX_COMMAND = 4096
+MAX_MESSAGE = 50 * 1024 * 1024
+ADDRESS_RE = re.compile(r':\s*<?([^>\s]*)>?', re.IGNORECASE)
+
+
+class SmtpSink:
+    """In-memory record of every accepted message, shared by all session threads"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, tempfail_rate: float = 0.0,
+                 password: Optional[str] = None, maildir: Optional[str] = None, seed: Optional[int] = None,
+                 verbose: bool = False):
+        self.latency = latency
+        self.jitter = jitter
+        self.tempfail_rate = tempfail_rate
+        self.password = password
+        self.maildir = Path(maildir) if maildir else None
+        self.verbose = verbose
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.messages: List[Dict] = []
+        self.stats: Dict[str, int] = {}
+        self.open_sessions = 0
+        if self.maildir:
+            self.maildir.mkdir(parents=True, exist_ok=True)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + n
+
+    def session(self, delta: int) -> int:
+        """Track open sessions; `peak_sessions` shows how many connections a sender really used at once.
+        Returns the number of connections accepted so far"""
+        with self.lock:
+            self.open_sessions += delta
+            if delta > 0:
+                self.stats['connections'] = self.stats.get('connections', 0) + 1
+                self.stats['peak_sessions'] = max(self.stats.get('peak_sessions', 0), self.open_sessions)
+            return self.stats.get('connections', 0)
+
+    def delay(self) -> float:
+        with self.lock:
+            return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def tempfail(self) -> bool:
+        """Whether to answer this message with an injected 451"""
+        with self.lock:
+            if self.random.random() < self.tempfail_rate:
+                self.stats['tempfail'] = self.stats.get('tempfail', 0) + 1
+                return True
+            return False
+
+    def store(self, session: int, sender: str, recipients: List[str], data: bytes) -> int:
+        message = email.message_from_bytes(data)
+        text, attachments = '', []
+        for part in message.walk():
+            if part.get_filename():
+                attachments.append({'filename': part.get_filename(),
+                                    'bytes': len(part.get_payload(decode=True) or b'')})
+            elif part.get_content_maintype() == 'text' and not text:
+                payload = part.get_payload(decode=True) or b''
+                text = payload.decode(part.get_content_charset() or 'utf-8', 'replace')
+        subject = str(make_header(decode_header(message['Subject'] or '')))
+        with self.lock:
+            message_id = len(self.messages) + 1
+            self.messages.append({
+                'id': message_id,
+                'session': session,
+                'from': sender,
+                'to': recipients,
+                'subject': subject,
+                'body': text,
+                'attachments': attachments,
+                'bytes': len(data),
+                'received': time.time(),
+            })
+            self.stats['messages'] = self.stats.get('messages', 0) + 1
+            self.stats['recipients'] = self.stats.get('recipients', 0) + len(recipients)
+            self.stats['bytes'] = self.stats.get('bytes', 0) + len(data)
+        if self.maildir:
+            (self.maildir / f"{message_id:06d}.eml").write_bytes(data)
+        if self.verbose:
+            print(f"📨 #{message_id} {sender} → {', '.join(recipients)}: {subject}", flush=True)
+        return message_id
+
+    def reset(self) -> None:
+        with self.lock:
+            self.messages = []
+            self.stats = {}
+
+    def snapshot(self) -> Tuple[List[Dict], Dict[str, int]]:
+        with self.lock:
+            return list(self.messages), dict(self.stats)
+
+
+def make_handler(sink: SmtpSink):
+    class Handler(socketserver.StreamRequestHandler):
+        # Replies are small and sent one at a time; don't let Nagle hold them back
+        disable_nagle_algorithm = True
+
+        def reply(self, line: str) -> None:
+            self.wfile.write(line.encode() + b"\r\n")
+
+        def readline(self) -> Optional[str]:
+            line = self.rfile.readline(MAX_COMMAND + 2)
+            if not line:
+                return None
+            return line.decode('utf-8', 'replace').rstrip("\r\n")
+
+        def handle(self):
+            self.session_id = sink.session(1)
+            try:
+                self.reply("220 localhost ESMTP multi-agent-squad sink")
+                self.sender: Optional[str] = None
+                self.recipients: List[str] = []
+                self.authenticated = sink.password is None
+                while True:
+                    line = self.readline()
+                    if line is None:
+                        return
+                    sink.count('commands')
+                    verb, _, argument = line.partition(' ')
+                    verb = verb.upper()
+                    if verb == "QUIT":
+                        self.reply("221 2.0.0 Bye")
+                        return
+                    handler = getattr(self, f"smtp_{verb.lower()}", None) if verb.isalpha() else None
+                    if handler is None:
+                        self.reply("502 5.5.2 Command not recognized")
+                    elif handler(argument) is False:
+                        return
+            except ConnectionError:
+                pass
+            finally:
+                sink.session(-1)
+
+        def smtp_ehlo(self, argument: str) -> None:
+            self.wfile.write(b"250-localhost\r\n250-SIZE %d\r\n250-8BITMIME\r\n250-AUTH PLAIN LOGIN\r\n"
+                             b"250 ENHANCEDSTATUSCODES\r\n" % MAX_MESSAGE)
+
+        def smtp_helo(self, argument: str) -> None:
+            self.reply("250 localhost")
+
+        def smtp_starttls(self, argument: str) -> None:
+            self.reply("454 4.7.0 TLS not available (set EMAIL_USE_TLS=0)")
+
+        def smtp_auth(self, argument: str) -> Optional[bool]:
+            mechanism, _, initial = argument.partition(' ')
+            try:
+                if mechanism.upper() == "PLAIN":
+                    if not initial:
+                        self.reply("334 ")
+                        initial = self.readline() or ''
+                    password = base64.b64decode(initial).split(b"\0")[-1].decode()
+                elif mechanism.upper() == "LOGIN":
+                    # smtplib sends the username with the command; other clients wait to be asked
+                    if not initial:
+                        self.reply("334 VXNlcm5hbWU6")
+                        if self.readline() is None:
+                            return False
+                    self.reply("334 UGFzc3dvcmQ6")
+                    password = base64.b64decode(self.readline() or '').decode()
+                else:
+                    self.reply("504 5.5.4 Unrecognized authentication type")
+                    return None
+            except (ValueError, UnicodeDecodeError):
+                self.reply("501 5.5.2 Cannot decode response")
+                return None
+            sink.count('logins')
+            if sink.password is not None and password != sink.password:
+                self.reply("535 5.7.8 Authentication credentials invalid")
+                return None
+            self.authenticated = True
+            self.reply("235 2.7.0 Authentication successful")
+            return None
+
+        def smtp_mail(self, argument: str) -> None:
+            if not self.authenticated:
+                self.reply("530 5.7.0 Authentication required")
+                return
+            match = ADDRESS_RE.search(argument)
+            self.sender = match.group(1) if match else ''
+            self.recipients = []
+            self.reply("250 2.1.0 Ok")
+
+        def smtp_rcpt(self, argument: str) -> None:
+            if self.sender is None:
+                self.reply("503 5.5.1 MAIL first")
+                return
+            match = ADDRESS_RE.search(argument)
+            if not match or not match.group(1):
+                self.reply("501 5.1.3 Bad recipient address syntax")
+                return
+            self.recipients.append(match.group(1))
+            self.reply("250 2.1.5 Ok")
+
+        def smtp_data(self, argument: str) -> Optional[bool]:
+            if not self.recipients:
+                self.reply("503 5.5.1 RCPT first")
+                return None
+            self.reply("354 End data with <CR><LF>.<CR><LF>")
+            lines = []
+            size = 0
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                if line in (b".\r\n", b".\n"):
+                    break
+                if line.startswith(b"."):
+                    line = line[1:]
+                size += len(line)
+                if size <= MAX_MESSAGE:
+                    lines.append(line)
+            delay = sink.delay()
+            if delay:
+                time.sleep(delay)
+            if size > MAX_MESSAGE:
+                self.reply("552 5.3.4 Message too big")
+            elif sink.tempfail():
+                self.reply("451 4.3.0 Temporary failure (injected)")
+            else:
+                message_id = sink.store(self.session_id, self.sender, self.recipients, b"".join(lines))
+                self.reply(f"250 2.0.0 Ok: queued as {message_id}")
+            self.sender = None
+            self.recipients = []
+            return None
+
+        def smtp_rset(self, argument: str) -> None:
+            self.sender = None
+            self.recipients = []
+            self.reply("250 2.0.0 Ok")
+
+        def smtp_noop(self, argument: str) -> None:
+            self.reply("250 2.0.0 Ok")
+
+    return Handler
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve(host: str, port: int, sink: SmtpSink) -> SinkServer:
+    return SinkServer((host, port), make_handler(sink))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP server that accepts and counts every message")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency", type=float, default=0.0, help="Milliseconds before answering each message")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random milliseconds")
+    parser.add_argument("--tempfail-rate", type=float, default=0.0,
+                        help="Fraction of messages answered 451 (temporary failure)")
+    parser.add_argument("--password", help="Password AUTH must present (default: accept any)")
+    parser.add_argument("--maildir", help="Also write every message to this directory as .eml")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible fault injection")
+    parser.add_argument("--verbose", action="store_true", help="Print a line per accepted message")
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.latency / 1000, args.jitter / 1000, args.tempfail_rate, args.password, args.maildir,
+                    args.seed, args.verbose)
+    server = serve(args.host, args.port, sink)
+    print(f"🧪 SMTP sink listening on {args.host}:{server.server_address[1]}", flush=True)
+    print(f"   export EMAIL_SMTP_SERVER={args.host} EMAIL_SMTP_PORT={server.server_address[1]} EMAIL_USE_TLS=0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        _, stats = sink.snapshot()
+        print(f"\n📬 {stats.get('messages', 0)} messages to {stats.get('recipients', 0)} recipients "
+              f"over {stats.get('connections', 0)} connections, {stats.get('tempfail', 0)} answered 451")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Local Email API Stand-in for Multi-Agent Squad
+Accepts SendGrid v3 mail/send and SES v2 SendBulkEmail and raw SendEmail calls so email providers can be
+tested offline, optionally injecting latency, throttling and 5xx errors
+"""
+
+import re
+import sys
+import json
+import time
+import email
+import base64
+import binascii
+import random
+import argparse
+import threading
+from email.header import decode_header, make_header
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+SES_MAX_BULK_ENTRIES = 50
+SIGV4_AUTH = re.compile(r"AWS4-HMAC-SHA256 Credential=[^/]+/\d{8}/[\w-]+/ses/aws4_request, "
+                        r"SignedHeaders=[\w;-]+, Signature=[0-9a-f]{64}$")
+
+
+class EmailStub:
+    """In-memory record of every accepted email, shared by all handler threads"""
+
+    def __init__(self, api_key: Optional[str] = None, latency: float = 0.0, throttle_rate: float = 0.0,
+                 retry_after: float = 1.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.api_key = api_key
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.messages: List[Dict] = []
+        self.templates: Dict[str, Dict] = {}
+        self.stats: Dict[str, int] = {}
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + n
+
+    def fault(self) -> Optional[str]:
+        """Pick the injected fault for one request: 'throttle', 'error' or None"""
+        with self.lock:
+            self.stats['requests'] = self.stats.get('requests', 0) + 1
+            roll = self.random.random()
+            if roll < self.throttle_rate:
+                self.stats['throttle'] = self.stats.get('throttle', 0) + 1
+                return 'throttle'
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats['error'] = self.stats.get('error', 0) + 1
+                return 'error'
+            return None
+
+    def record(self, provider: str, sender: str, recipient: str, subject: str, body: str,
+               attachments: Optional[List[Dict]] = None) -> None:
+        with self.lock:
+            self.messages.append({
+                'provider': provider,
+                'from': sender,
+                'to': recipient,
+                'subject': subject,
+                'body': body,
+                'attachments': attachments or [],
+                'received': time.time(),
+            })
+
+    def reset(self) -> None:
+        with self.lock:
+            self.messages = []
+            self.stats = {}
+
+
+def render(template: str, data: Dict) -> str:
+    """Just enough Handlebars for SES templates: {{name}} and {{{name}}}"""
+    return re.sub(r"\{\{\{?\s*(\w+)\s*\}?\}\}", lambda m: str(data.get(m.group(1), '')), template)
+
+
+def make_handler(stub: EmailStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, body, headers: Optional[Dict[str, str]] = None) -> None:
+            data = b"" if body is None else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> Optional[Dict]:
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                return json.loads(raw or b"{}")
+            except json.JSONDecodeError:
+                return None
+
+        def do_GET(self):
+            if self.path == "/messages":
+                with stub.lock:
+                    self._reply(200, list(stub.messages))
+            elif self.path == "/stats":
+                with stub.lock:
+                    self._reply(200, {**stub.stats, 'messages': len(stub.messages)})
+            else:
+                self._reply(404, {"message": "not found"})
+
+        def do_POST(self):
+            body = self._body()
+            if self.path == "/reset":
+                stub.reset()
+                self._reply(200, {"ok": True})
+                return
+            routes = {
+                "/v3/mail/send": self._sendgrid,
+                "/v2/email/outbound-bulk-emails": self._ses_bulk,
+                "/v2/email/outbound-emails": self._ses_raw,
+                "/v2/email/templates": self._ses_template,
+            }
+            route = routes.get(self.path.split("?")[0])
+            if route is None:
+                self._reply(404, {"message": "not found"})
+                return
+
+            if stub.latency:
+                time.sleep(stub.latency)
+            fault = stub.fault()
+            if fault == 'throttle':
+                # SendGrid reports the reset time; SES clients back off on their own
+                reset = {"X-RateLimit-Reset": f"{int(time.time() + stub.retry_after)}"}
+                self._reply(429, {"message": "Too Many Requests"}, reset)
+                return
+            if fault == 'error':
+                self._reply(503, {"message": "Service Unavailable"})
+                return
+            if body is None:
+                self._reply(400, {"message": "invalid JSON"})
+                return
+            self._reply(*route(body))
+
+        def _sendgrid(self, body: Dict) -> Tuple[int, Optional[Dict]]:
+            auth = self.headers.get("Authorization", "")
+            if not auth.startswith("Bearer ") or (stub.api_key and auth[7:] != stub.api_key):
+                return 401, {"errors": [{"message": "The provided authorization grant is invalid"}]}
+            personalizations = body.get('personalizations') or []
+            if not personalizations or len(personalizations) > SENDGRID_MAX_PERSONALIZATIONS:
+                return 400, {"errors": [{"message": "personalizations must hold 1 to "
+                                                    f"{SENDGRID_MAX_PERSONALIZATIONS} items",
+                                         "field": "personalizations"}]}
+            sender = (body.get('from') or {}).get('email')
+            if not sender or not body.get('subject') or not body.get('content'):
+                return 400, {"errors": [{"message": "from, subject and content are required"}]}
+            text = body['content'][0].get('value', '')
+            attachments = []
+            for attachment in body.get('attachments') or []:
+                try:
+                    size = len(base64.b64decode(attachment.get('content', ''), validate=True))
+                except binascii.Error:
+                    return 400, {"errors": [{"message": "attachment content must be base64",
+                                             "field": "attachments.content"}]}
+                attachments.append({'filename': attachment.get('filename'), 'bytes': size})
+            for personalization in personalizations:
+                for recipient in personalization.get('to', []):
+                    stub.record("sendgrid", sender, recipient.get('email'), body['subject'], text, attachments)
+            stub.count('sendgrid_requests')
+            return 202, None
+
+        def _signed(self) -> bool:
+            return bool(SIGV4_AUTH.match(self.headers.get("Authorization", ""))) and \
+                bool(self.headers.get("X-Amz-Date"))
+
+        def _ses_template(self, body: Dict) -> Tuple[int, Dict]:
+            if not self._signed():
+                return 403, {"message": "The request signature we calculated does not match"}
+            name = body.get('TemplateName')
+            if not name or not isinstance(body.get('TemplateContent'), dict):
+                return 400, {"message": "TemplateName and TemplateContent are required"}
+            with stub.lock:
+                if name in stub.templates:
+                    return 409, {"message": f"Template {name} AlreadyExists"}
+                stub.templates[name] = body['TemplateContent']
+            return 200, {}
+
+        def _ses_bulk(self, body: Dict) -> Tuple[int, Dict]:
+            if not self._signed():
+                return 403, {"message": "The request signature we calculated does not match"}
+            entries = body.get('BulkEmailEntries') or []
+            if not entries or len(entries) > SES_MAX_BULK_ENTRIES:
+                return 400, {"message": f"BulkEmailEntries must hold 1 to {SES_MAX_BULK_ENTRIES} items"}
+            template = (body.get('DefaultContent') or {}).get('Template') or {}
+            with stub.lock:
+                content = stub.templates.get(template.get('TemplateName'))
+            try:
+                data = json.loads(template.get('TemplateData') or "{}")
+            except json.JSONDecodeError:
+                return 400, {"message": "TemplateData is not valid JSON"}
+            results = []
+            for entry in entries:
+                if content is None:
+                    results.append({"Status": "TEMPLATE_NOT_FOUND"})
+                    continue
+                for recipient in entry.get('Destination', {}).get('ToAddresses', []):
+                    stub.record("ses", body.get('FromEmailAddress'), recipient,
+                                render(content.get('Subject', ''), data), render(content.get('Text', ''), data))
+                results.append({"Status": "SUCCESS", "MessageId": f"stub-{time.time_ns()}"})
+            stub.count('ses_requests')
+            return 200, {"BulkEmailEntryResults": results}
+
+        def _ses_raw(self, body: Dict) -> Tuple[int, Dict]:
+            if not self._signed():
+                return 403, {"message": "The request signature we calculated does not match"}
+            recipients = (body.get('Destination') or {}).get('ToAddresses') or []
+            raw = ((body.get('Content') or {}).get('Raw') or {}).get('Data')
+            if not recipients or len(recipients) > SES_MAX_BULK_ENTRIES or not raw:
+                return 400, {"message": f"Destination must hold 1 to {SES_MAX_BULK_ENTRIES} addresses "
+                                        "and Content.Raw.Data is required"}
+            try:
+                message = email.message_from_bytes(base64.b64decode(raw, validate=True))
+            except binascii.Error:
+                return 400, {"message": "Content.Raw.Data must be base64"}
+            text, attachments = '', []
+            for part in message.walk():
+                if part.get_filename():
+                    attachments.append({'filename': part.get_filename(),
+                                        'bytes': len(part.get_payload(decode=True) or b'')})
+                elif part.get_content_type() == 'text/plain' and not text:
+                    text = part.get_payload(decode=True).decode(part.get_content_charset() or 'utf-8', 'replace')
+            subject = str(make_header(decode_header(message['Subject'] or '')))
+            for recipient in recipients:
+                stub.record("ses", body.get('FromEmailAddress'), recipient, subject, text,
+                            attachments)
+            stub.count('ses_requests')
+            return 200, {"MessageId": f"stub-{time.time_ns()}"}
+
+    return Handler
+
+
+def serve(host: str, port: int, stub: EmailStub) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the SendGrid and SES email APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--api-key", help="SendGrid API key requests must present")
+    parser.add_argument("--latency", type=float, default=0.0, help="Milliseconds added to every response")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Seconds until the rate limit resets")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 503")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible fault injection")
+    args = parser.parse_args()
+
+    stub = EmailStub(args.api_key, args.latency / 1000, args.throttle_rate, args.retry_after,
+                     args.error_rate, args.seed)
+    server = serve(args.host, args.port, stub)
+    base = f"http://{args.host}:{server.server_address[1]}"
+    print(f"🧪 Email API stub listening on {base}", flush=True)
+    print(f"   export EMAIL_SENDGRID_API={base} EMAIL_SES_ENDPOINT={base}")
+    print(f"   GET {base}/messages and {base}/stats to inspect what was sent")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1562 @@
+#!/usr/bin/env python3
+"""
+Email Delivery for Multi-Agent Squad
+Durable daily-digest queue and an outbox sent concurrently over pooled SMTP, SendGrid and SES
+connections, failing over between providers; large logs travel as gzip attachments streamed from disk
+"""
+
+import os
+import re
+import ssl
+import sys
+import hmac
+import html
+import json
+import time
+import gzip
+import uuid
+import fcntl
+import base64
+import itertools
+import asyncio
+import threading
+import hashlib
+import smtplib
+import sqlite3
+import argparse
+import subprocess
+import http.client
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from email import policy
+from email.mime.base import MIMEBase
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, quote, urlsplit
+
+DIGEST_PATH = Path(".claude/cache/email-digest.db")
+OUTBOX_PATH = Path(".claude/cache/email-outbox.db")
+DEAD_LETTER_PATH = Path(".claude/cache/email-dead-letter.jsonl")
+SENDER_LOCK = Path(".claude/cache/email-sender.lock")
+ALERTS_PATH = Path(".claude/cache/email-alerts.db")
+ATTACHMENTS_DIR = Path(".claude/cache/email-attachments")
+CONFIG_PATH = Path(".claude/integrations/email.json")
+ENV_PATH = Path(".env.email")
+
+SMTP_TIMEOUT = 30.0
+# Messages sent per pass over one connection, and per connection before reconnecting
+SMTP_BATCH = 50
+MAX_PER_CONNECTION = 100
+# Idle connections are kept alive with NOOP; most servers drop sessions idle for minutes
+NOOP_INTERVAL = 30.0
+IDLE_EXIT = 120.0
+POLL_INTERVAL = 0.2
+MAX_ATTEMPTS = 8
+MAX_BACKOFF = 600.0
+HTTP_TIMEOUT = 30.0
+# Sends in flight at once across providers, and concurrent SMTP sessions (servers cap these)
+MAX_CONCURRENCY = 8
+MAX_SMTP_SESSIONS = 4
+SMTP_MAX_RECIPIENTS = 50
+# Socket operations time out after this (failing over to the next provider), and a provider
+# whose average send takes longer is tried after the others
+LATENCY_BUDGET = 10.0
+# Provider health: moving-average weight, how fast old errors are forgiven, and the error
+# rate above which a provider is tried last
+STATS_ALPHA = 0.2
+STATS_HALF_LIFE = 300.0
+ERROR_STEER = 0.5
+PROVIDER_ORDER = ('smtp', 'sendgrid', 'ses')
+
+# Outbox provider per configured service
+PROVIDERS = {'gmail': 'smtp', 'smtp': 'smtp', 'sendgrid': 'sendgrid', 'aws_ses': 'ses'}
+SENDGRID_API = "https://api.sendgrid.com"
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+SES_MAX_BULK_ENTRIES = 50
+SES_TEMPLATE = "multi-agent-squad-notification"
+SES_RETRY_STATUSES = {'TRANSIENT_FAILURE', 'ACCOUNT_THROTTLED', 'ACCOUNT_DAILY_QUOTA_EXCEEDED',
+                      'ACCOUNT_SENDING_PAUSED'}
+
+# Queue depth that triggers a backlog alert, and how often that alert may repeat
+DIGEST_ALERT_THRESHOLD = 500
+DIGEST_ALERT_INTERVAL = 6 * 3600.0
+MAX_DIGEST_LINES = 5
+# A claimed digest not purged or released within this time is treated as abandoned
+CLAIM_TIMEOUT = 600.0
+
+# Immediate alerts: per-template burst and refill, the window in which a repeat is only counted,
+# and how many suppressed alerts open the circuit (holding all alerts) for how long
+ALERT_BURST = 5
+ALERT_RATE_PER_HOUR = 12.0
+SUPPRESSION_WINDOW = 600.0
+CIRCUIT_THRESHOLD = 20
+CIRCUIT_COOLDOWN = 1800.0
+EXCERPT_CHARS = 2000
+FINGERPRINT_CHARS = 4000
+# Volatile tokens (times, counts, hashes, addresses) removed before fingerprinting
+NORMALIZE_RE = re.compile(r'0x[0-9a-f]+|[0-9a-f]{8,}|\d+(?:[.:]\d+)*', re.IGNORECASE)
+
+# Logs are read and encoded in blocks of this size (a multiple of 57, one full base64 MIME line)
+ATTACHMENT_BLOCK = 57 * 1150
+# Compressed logs stop growing here, well under the SMTP, SendGrid and SES message limits
+MAX_ATTACHMENT_BYTES = 10 * 1024 * 1024
+# Stands in for the attachment while the rest of a message is rendered
+ATTACHMENT_MARKER = f"attachment-{uuid.uuid4().hex}"
+DOT_RE = re.compile(rb'^\.', re.MULTILINE)
+SMTP_POLICY = policy.compat32.clone(linesep='\r\n')
+
+SEVERITIES = ('critical', 'error', 'warning', 'info')
+SEVERITY_ICONS = {'critical': '🚨', 'error': '❌', 'warning': '⚠️', 'info': 'ℹ️'}
+
+
+def load_config() -> Dict:
+    """Email config from the config snapshot (or JSON) with secrets from .env.email"""
+    config = None
+    try:
+        from hook_config import load_integration
+        config = load_integration("email")
+    except ImportError:
+        pass
+    if config is None:
+        try:
+            with open(CONFIG_PATH) as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            config = {}
+    if ENV_PATH.exists():
+        with open(ENV_PATH) as f:
+            for line in f:
+                if line.startswith("EMAIL_PASSWORD="):
+                    config['password'] = line.split("=", 1)[1].strip()
+                elif line.startswith("EMAIL_API_KEY="):
+                    config['api_key'] = line.split("=", 1)[1].strip()
+    # Environment overrides make it easy to point at a local SMTP sink
+    if os.environ.get("EMAIL_SMTP_SERVER"):
+        config['smtp_server'] = os.environ["EMAIL_SMTP_SERVER"]
+    if os.environ.get("EMAIL_SMTP_PORT"):
+        config['smtp_port'] = int(os.environ["EMAIL_SMTP_PORT"])
+    if os.environ.get("EMAIL_USE_TLS"):
+        config['use_tls'] = os.environ["EMAIL_USE_TLS"].lower() in ('1', 'true', 'yes')
+    for key, env in (('sendgrid_api', "EMAIL_SENDGRID_API"), ('ses_endpoint', "EMAIL_SES_ENDPOINT")):
+        if os.environ.get(env):
+            config[key] = os.environ[env]
+    return config
+
+
+def severity_for(template: Optional[str], status: Optional[int] = None) -> str:
+    """Default severity of a notification when the caller does not give one"""
+    if template == "error_alert":
+        return 'critical'
+    if status:
+        return 'error'
+    return 'info'
+
+
+class DigestQueue:
+    """Notifications waiting for the daily digest; hooks append, the digest hook drains"""
+
+    def __init__(self, path: Path = DIGEST_PATH):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created REAL NOT NULL,
+                template TEXT NOT NULL,
+                severity TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                digest INTEGER
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+
+    def append(self, template: str, severity: str, subject: str, body: str) -> int:
+        """Queue one notification (a single INSERT) and return the queue depth"""
+        cursor = self.db.execute(
+            "INSERT INTO entries (created, template, severity, subject, body) VALUES (?, ?, ?, ?, ?)",
+            (time.time(), template, severity, subject, body))
+        # AUTOINCREMENT ids only grow, so this bounds the depth without a table scan
+        oldest = self.db.execute("SELECT MIN(id) FROM entries").fetchone()[0]
+        return cursor.lastrowid - oldest + 1
+
+    def pending(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def oldest(self) -> Optional[float]:
+        return self.db.execute("SELECT MIN(created) FROM entries").fetchone()[0]
+
+    def should_alert(self, interval: float = DIGEST_ALERT_INTERVAL) -> bool:
+        """True at most once per interval across all notifier processes"""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'alerted_at'").fetchone()
+            if row and now - row[0] < interval:
+                self.db.execute("COMMIT")
+                return False
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('alerted_at', ?)", (now,))
+            self.db.execute("COMMIT")
+            return True
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def claim(self, timeout: float = CLAIM_TIMEOUT) -> Optional[int]:
+        """Reserve everything queued so far for one digest; entries appended later wait for the next.
+        Returns None when the queue is empty or another digest run is still sending"""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'claimed_at'").fetchone()
+            claimed = self.db.execute("SELECT 1 FROM entries WHERE digest IS NOT NULL LIMIT 1").fetchone()
+            if claimed and row and now - row[0] < timeout:
+                self.db.execute("COMMIT")
+                return None
+            # A digest run that died before sending gives its entries back
+            self.db.execute("UPDATE entries SET digest = NULL WHERE digest IS NOT NULL")
+            top = self.db.execute("SELECT MAX(id) FROM entries").fetchone()[0]
+            if top is not None:
+                self.db.execute("UPDATE entries SET digest = ? WHERE id <= ?", (top, top))
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('claimed_at', ?)", (now,))
+            self.db.execute("COMMIT")
+            return top
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def groups(self, digest: int) -> List[Dict]:
+        """Claimed entries grouped by severity, template and subject, most severe first"""
+        rows = self.db.execute(
+            "SELECT severity, template, subject, COUNT(*), MIN(created), MAX(created), MAX(id) "
+            "FROM entries WHERE digest = ? GROUP BY severity, template, subject", (digest,)).fetchall()
+        groups = []
+        for severity, template, subject, count, first, last, latest in rows:
+            body = self.db.execute("SELECT body FROM entries WHERE id = ?", (latest,)).fetchone()[0]
+            groups.append({'severity': severity, 'template': template, 'subject': subject, 'count': count,
+                           'first': first, 'last': last, 'body': body})
+        rank = {name: i for i, name in enumerate(SEVERITIES)}
+        groups.sort(key=lambda g: (rank.get(g['severity'], len(SEVERITIES)), g['template'], g['first']))
+        return groups
+
+    def purge(self, digest: int) -> int:
+        """Drop entries once their digest was delivered"""
+        return self.db.execute("DELETE FROM entries WHERE digest = ?", (digest,)).rowcount
+
+    def release(self, digest: int) -> None:
+        self.db.execute("UPDATE entries SET digest = NULL WHERE digest = ?", (digest,))
+
+
+def render_digest(groups: List[Dict]) -> Tuple[str, str]:
+    """Subject and plain-text body of one digest"""
+    total = sum(g['count'] for g in groups)
+    date = time.strftime('%Y-%m-%d')
+    counts = {}
+    for group in groups:
+        counts[group['severity']] = counts.get(group['severity'], 0) + group['count']
+    summary = ', '.join(f"{counts[s]} {s}" for s in SEVERITIES if s in counts)
+    subject = f"Daily Digest - {date} ({total} notification{'s' if total != 1 else ''})"
+
+    lines = ["Daily Digest", "============", "", f"Date: {date}", f"Notifications: {total} ({summary})"]
+    current = None
+    for group in groups:
+        heading = (group['severity'], group['template'])
+        if heading != current:
+            current = heading
+            title = f"{SEVERITY_ICONS.get(group['severity'], '')} {group['severity'].title()} · {group['template']}"
+            lines += ["", title, "-" * len(title)]
+        first = time.strftime('%H:%M', time.localtime(group['first']))
+        if group['count'] > 1:
+            last = time.strftime('%H:%M', time.localtime(group['last']))
+            lines.append(f"- {group['subject']} ×{group['count']} ({first}–{last})")
+        else:
+            lines.append(f"- {first} {group['subject']}")
+        # The latest occurrence stands in for the rest of the group
+        detail = [line for line in group['body'].strip().splitlines()
+                  if line.strip() and line.strip('=- ')][:MAX_DIGEST_LINES]
+        lines.extend(f"    {line}" for line in detail)
+    lines += ["", "Generated automatically by Multi-Agent Squad"]
+    return subject, "\n".join(lines) + "\n"
+
+
+def alert_fingerprint(template: str, subject: str, body: str) -> str:
+    """Template + subject + body with volatile tokens (times, counts, ids) removed"""
+    parts = [template, NORMALIZE_RE.sub('#', subject.strip().lower()),
+             NORMALIZE_RE.sub('#', body.strip().lower())[:FINGERPRINT_CHARS]]
+    return hashlib.sha1('\0'.join(parts).encode()).hexdigest()
+
+
+class AlertGuard:
+    """Storm protection for immediate alerts, shared by every notifier process: a token bucket
+    per template, a suppression window per fingerprint, and a circuit breaker that holds every
+    alert once a storm is under way. Suppressed alerts are reported in one summary per window"""
+
+    def __init__(self, config: Optional[Dict] = None, path: Path = ALERTS_PATH):
+        config = config or {}
+        self.rate = float(config.get('alert_rate_per_hour', ALERT_RATE_PER_HOUR)) / 3600
+        self.burst = float(config.get('alert_burst', ALERT_BURST))
+        self.window = float(config.get('suppression_window', SUPPRESSION_WINDOW))
+        self.threshold = int(config.get('circuit_threshold', CIRCUIT_THRESHOLD))
+        self.cooldown = float(config.get('circuit_cooldown', CIRCUIT_COOLDOWN))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                template TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS alerts (
+                fingerprint TEXT PRIMARY KEY,
+                template TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                excerpt TEXT NOT NULL,
+                window_end REAL NOT NULL,
+                suppressed INTEGER NOT NULL DEFAULT 0,
+                first_suppressed REAL,
+                last_suppressed REAL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL);
+        """)
+
+    def admit(self, template: str, subject: str, body: str) -> Tuple[bool, str]:
+        """(True, '') when the alert may be sent now, else (False, why it was suppressed)"""
+        key = alert_fingerprint(template, subject, body)
+        excerpt = body.strip()[:EXCERPT_CHARS]
+        self.db.execute("BEGIN IMMEDIATE")
+        # Read the clock under the lock: a notifier that waited for it must not judge the
+        # window or the bucket by a time older than what the previous writer recorded
+        now = time.time()
+        try:
+            row = self.db.execute("SELECT window_end FROM alerts WHERE fingerprint = ?", (key,)).fetchone()
+            circuit = self.db.execute("SELECT value FROM meta WHERE key = 'circuit_until'").fetchone()
+            if circuit and circuit[0] > now:
+                reason = "circuit open"
+            elif row and row[0] > now:
+                reason = "repeat"
+            else:
+                bucket = self.db.execute("SELECT tokens, updated FROM buckets WHERE template = ?",
+                                         (template,)).fetchone()
+                tokens = self.burst if bucket is None else min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                reason = "rate limited" if tokens < 1 else ""
+                self.db.execute("INSERT OR REPLACE INTO buckets (template, tokens, updated) VALUES (?, ?, ?)",
+                                (template, tokens if reason else tokens - 1, now))
+            if not reason:
+                self.db.execute(
+                    "INSERT INTO alerts (fingerprint, template, subject, excerpt, window_end) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (fingerprint) DO UPDATE SET excerpt = excluded.excerpt, "
+                    "window_end = excluded.window_end", (key, template, subject, excerpt, now + self.window))
+                self.db.execute("COMMIT")
+                return True, ""
+            self.db.execute(
+                "INSERT INTO alerts (fingerprint, template, subject, excerpt, window_end, suppressed, "
+                "first_suppressed, last_suppressed) VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (fingerprint) DO UPDATE SET suppressed = suppressed + 1, excerpt = excluded.excerpt, "
+                "first_suppressed = COALESCE(first_suppressed, excluded.first_suppressed), "
+                "last_suppressed = excluded.last_suppressed",
+                (key, template, subject, excerpt, now + self.window, now, now))
+            total = self.db.execute("SELECT SUM(suppressed) FROM alerts").fetchone()[0]
+            if total >= self.threshold and reason != "circuit open":
+                # Enough is suppressed that single alerts carry no news; hold them all for a while
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('circuit_until', ?)",
+                                (now + self.cooldown,))
+            self.db.execute("COMMIT")
+            return False, reason
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def summary_due(self) -> Optional[float]:
+        """When the next suppressed-alerts summary is due, or None when nothing is suppressed"""
+        first = self.db.execute("SELECT MIN(first_suppressed) FROM alerts WHERE suppressed > 0").fetchone()[0]
+        return None if first is None else first + self.window
+
+    def take_summary(self, now: float) -> Optional[Tuple[str, str]]:
+        """Subject and body covering every suppressed alert, once its window has passed; resets the counts"""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.db.execute(
+                "SELECT template, subject, excerpt, suppressed, first_suppressed, last_suppressed FROM alerts "
+                "WHERE suppressed > 0 ORDER BY suppressed DESC").fetchall()
+            if not rows or min(r[4] for r in rows) + self.window > now:
+                self.db.execute("COMMIT")
+                return None
+            self.db.execute("UPDATE alerts SET suppressed = 0, first_suppressed = NULL, last_suppressed = NULL")
+            self.db.execute("DELETE FROM alerts WHERE window_end < ? AND suppressed = 0", (now,))
+            circuit = self.db.execute("SELECT value FROM meta WHERE key = 'circuit_until'").fetchone()
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return render_suppressed(rows, circuit[0] if circuit and circuit[0] > now else None)
+
+    def state(self) -> Tuple[int, Optional[float]]:
+        """Alerts suppressed since the last summary, and when the circuit closes if it is open"""
+        total = self.db.execute("SELECT COALESCE(SUM(suppressed), 0) FROM alerts").fetchone()[0]
+        circuit = self.db.execute("SELECT value FROM meta WHERE key = 'circuit_until'").fetchone()
+        return total, circuit[0] if circuit and circuit[0] > time.time() else None
+
+
+def render_suppressed(rows: List[Tuple], circuit_until: Optional[float]) -> Tuple[str, str]:
+    total = sum(r[3] for r in rows)
+    first = time.strftime('%H:%M', time.localtime(min(r[4] for r in rows)))
+    last = time.strftime('%H:%M', time.localtime(max(r[5] for r in rows)))
+    subject = f"🔕 {total} suppressed alert{'s' if total != 1 else ''} ({first}–{last})"
+    lines = ["Suppressed Alerts", "=================", "",
+             f"{total} alert{'s' if total != 1 else ''} were held back between {first} and {last} "
+             "to stop an alert storm."]
+    if circuit_until:
+        lines.append(f"All immediate alerts are paused until "
+                     f"{time.strftime('%H:%M', time.localtime(circuit_until))}.")
+    for template, subject_line, excerpt, count, first_seen, last_seen in rows:
+        lines += ["", f"- {subject_line} ×{count} [{template}] "
+                      f"({time.strftime('%H:%M', time.localtime(first_seen))}–"
+                      f"{time.strftime('%H:%M', time.localtime(last_seen))})"]
+        detail = [line for line in excerpt.splitlines() if line.strip() and line.strip('=- ')][:MAX_DIGEST_LINES]
+        lines.extend(f"    {line}" for line in detail)
+    lines += ["", "Generated automatically by Multi-Agent Squad"]
+    return subject, "\n".join(lines) + "\n"
+
+
+def html_part(row: Dict) -> Optional[str]:
+    """HTML version of an outbox message: pre-rendered, derived from the text, or none"""
+    if row.get('html_body'):
+        return row['html_body']
+    if row.get('html'):
+        return row['body'].replace('\n', '<br>')
+    return None
+
+
+def build_message(sender: str, recipients: List[str], subject: str, body: str,
+                  html: bool = False, html_body: Optional[str] = None,
+                  attachment: Optional[Dict] = None) -> MIMEMultipart:
+    """The message headers and text; an attachment is only a marker, see message_chunks()"""
+    # Reports rendered in both formats go out as alternatives; clients pick the richer one
+    msg = MIMEMultipart('alternative' if html_body and not attachment else 'mixed')
+    msg['From'] = sender
+    msg['To'] = ', '.join(recipients)
+    msg['Subject'] = subject
+    if html_body:
+        alternatives = msg if not attachment else MIMEMultipart('alternative')
+        alternatives.attach(MIMEText(body, 'plain'))
+        alternatives.attach(MIMEText(html_body, 'html'))
+        if alternatives is not msg:
+            msg.attach(alternatives)
+    elif html:
+        msg.attach(MIMEText(body.replace('\n', '<br>'), 'html'))
+    else:
+        msg.attach(MIMEText(body, 'plain'))
+    if attachment:
+        part = MIMEBase('application', 'gzip')
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header('Content-Disposition', 'attachment', filename=attachment['filename'])
+        part.set_payload(ATTACHMENT_MARKER)
+        msg.attach(part)
+    return msg
+
+
+def spool_log(stream, name: str = "error.log", directory: Path = ATTACHMENTS_DIR) -> Dict:
+    """Gzip a log from a binary stream to disk block by block, keeping only its head and tail in memory.
+    Returns the attachment (path, filename, sizes) and a bounded text excerpt for the email body"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}.gz"
+    keep = EXCERPT_CHARS // 2
+    head = tail = b''
+    size = 0
+    truncated = False
+    with open(path, 'wb') as raw, gzip.GzipFile(filename=name, mode='wb', fileobj=raw) as gz:
+        while True:
+            block = stream.read(ATTACHMENT_BLOCK)
+            if not block:
+                break
+            if len(head) < keep:
+                head += block[:keep - len(head)]
+            tail = (tail + block)[-keep:]
+            size += len(block)
+            if truncated:
+                continue
+            gz.write(block)
+            if raw.tell() >= MAX_ATTACHMENT_BYTES:
+                # Keep draining the stream so the writer is not blocked, but stop storing it
+                gz.write(f"\n... log truncated after {size} bytes ...\n".encode())
+                truncated = True
+        compressed = raw.tell()
+    if size <= 2 * keep:
+        excerpt = (head + tail[max(0, len(head) + len(tail) - size):]).decode('utf-8', 'replace')
+    else:
+        # Start the tail on a line boundary when there is one
+        newline = tail.find(b'\n')
+        tail = tail[newline + 1:] if 0 <= newline < len(tail) - 1 else tail
+        excerpt = (head.decode('utf-8', 'replace') + f"\n... {size - len(head) - len(tail)} bytes omitted ...\n"
+                   + tail.decode('utf-8', 'replace'))
+    return {'path': str(path), 'filename': f"{name}.gz", 'bytes': size, 'compressed': compressed,
+            'truncated': truncated, 'excerpt': excerpt}
+
+
+def read_blocks(path: Union[str, Path]) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(ATTACHMENT_BLOCK)
+            if not block:
+                return
+            yield block
+
+
+def base64_stream(chunks: Iterable[bytes], mime: bool = False) -> Iterator[bytes]:
+    """Base64-encode a byte stream incrementally; `mime` wraps it in 76-character CRLF lines"""
+    unit = 57 if mime else 3
+    carry = b''
+    for chunk in chunks:
+        data = carry + chunk
+        cut = len(data) - len(data) % unit
+        carry = data[cut:]
+        if cut:
+            yield base64.encodebytes(data[:cut]).replace(b'\n', b'\r\n') if mime else base64.b64encode(data[:cut])
+    if carry:
+        yield base64.encodebytes(carry).replace(b'\n', b'\r\n') if mime else base64.b64encode(carry)
+
+
+def message_chunks(message: MIMEMultipart, attachment: Optional[Dict]) -> Iterator[bytes]:
+    """The message with CRLF line endings, its attachment encoded from disk as it is sent"""
+    data = message.as_bytes(policy=SMTP_POLICY)
+    if not attachment:
+        yield data
+        return
+    head, tail = data.split(ATTACHMENT_MARKER.encode(), 1)
+    yield head
+    yield from base64_stream(read_blocks(attachment['path']), mime=True)
+    yield tail
+
+
+def spliced_json(payload: Dict, parts: Callable[[], Iterable[bytes]]) -> Callable[[], Iterator[bytes]]:
+    """A JSON request body whose ATTACHMENT_MARKER string is replaced by streamed (base64) bytes"""
+    head, tail = json.dumps(payload).encode().split(ATTACHMENT_MARKER.encode(), 1)
+    return lambda: itertools.chain([head], parts(), [tail])
+
+
+def measure(body: Callable[[], Iterable[bytes]]) -> Tuple[int, str]:
+    """Length and SHA-256 of a streamed body, read once without holding it"""
+    digest = hashlib.sha256()
+    length = 0
+    for chunk in body():
+        digest.update(chunk)
+        length += len(chunk)
+    return length, digest.hexdigest()
+
+
+def provider_for(service: Optional[str]) -> str:
+    return PROVIDERS.get(service or 'smtp', 'smtp')
+
+
+def configured_providers(config: Dict) -> List[str]:
+    """Providers this config can send through, the configured service first.
+    An explicit `providers` list (service or provider names) fixes the failover order"""
+    if config.get('providers'):
+        names = (PROVIDERS.get(name, name) for name in config['providers'])
+        return list(dict.fromkeys(name for name in names if name in PROVIDER_ORDER))
+    ready = {
+        'smtp': bool(config.get('smtp_server')),
+        'sendgrid': bool(config.get('api_key')),
+        'ses': bool(config.get('region') or config.get('ses_endpoint')) and aws_credentials() is not None,
+    }
+    primary = provider_for(config.get('service'))
+    return [primary] + [p for p in PROVIDER_ORDER if p != primary and ready[p]]
+
+
+class ProviderStats:
+    """Moving averages of send latency and error rate per provider, kept in the outbox database"""
+
+    def __init__(self, db: sqlite3.Connection, budget: float = LATENCY_BUDGET):
+        self.db = db
+        self.budget = budget
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS provider_stats (
+                provider TEXT PRIMARY KEY,
+                latency REAL NOT NULL,
+                errors REAL NOT NULL,
+                updated REAL NOT NULL,
+                sends INTEGER NOT NULL,
+                failures INTEGER NOT NULL
+            )""")
+        self.stats = {row[0]: {'latency': row[1], 'errors': row[2], 'updated': row[3], 'sends': row[4],
+                               'failures': row[5]}
+                      for row in self.db.execute("SELECT * FROM provider_stats")}
+
+    def errors(self, provider: str, now: float) -> float:
+        """Error rate, decayed so a provider that failed a while ago gets traffic again"""
+        stats = self.stats.get(provider)
+        if stats is None:
+            return 0.0
+        return stats['errors'] * 0.5 ** (max(0.0, now - stats['updated']) / STATS_HALF_LIFE)
+
+    def healthy(self, provider: str, now: float) -> bool:
+        stats = self.stats.get(provider)
+        if stats is None:
+            return True
+        slow = stats['latency'] > self.budget and now - stats['updated'] < STATS_HALF_LIFE
+        return self.errors(provider, now) < ERROR_STEER and not slow
+
+    def order(self, chain: List[str]) -> List[str]:
+        """Healthy providers first, otherwise keeping the configured order"""
+        now = time.time()
+        return sorted(chain, key=lambda provider: not self.healthy(provider, now))
+
+    def record(self, provider: str, latency: float, failed: bool) -> None:
+        now = time.time()
+        stats = self.stats.get(provider)
+        if stats is None:
+            stats = self.stats[provider] = {'latency': latency, 'errors': 0.0, 'updated': now, 'sends': 0,
+                                            'failures': 0}
+        stats['errors'] = self.errors(provider, now) * (1 - STATS_ALPHA) + STATS_ALPHA * failed
+        stats['latency'] = stats['latency'] * (1 - STATS_ALPHA) + STATS_ALPHA * latency
+        stats['updated'] = now
+        stats['sends'] += 1
+        stats['failures'] += int(failed)
+
+    def save(self) -> None:
+        self.db.executemany(
+            "INSERT OR REPLACE INTO provider_stats (provider, latency, errors, updated, sends, failures) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(provider, s['latency'], s['errors'], s['updated'], s['sends'], s['failures'])
+             for provider, s in self.stats.items()])
+
+
+class Outbox:
+    """Durable queue of outgoing emails; notifier processes append, one sender drains"""
+
+    def __init__(self, path: Path = OUTBOX_PATH):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created REAL NOT NULL,
+                next_attempt REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                provider TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                recipients TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                html INTEGER NOT NULL DEFAULT 0,
+                html_body TEXT,
+                attachment TEXT,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS messages_due ON messages (next_attempt);
+        """)
+
+    def enqueue(self, provider: str, sender: str, recipients: List[str], subject: str, body: str,
+                html: bool = False, html_body: Optional[str] = None, attachment: Optional[Dict] = None) -> int:
+        """`attachment` is a spool_log() file; the outbox owns it from here and removes it once sent"""
+        now = time.time()
+        stored = json.dumps({'path': attachment['path'], 'filename': attachment['filename']}) if attachment else None
+        cursor = self.db.execute(
+            "INSERT INTO messages (created, next_attempt, provider, sender, recipients, subject, body, html, "
+            "html_body, attachment) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (now, now, provider, sender, json.dumps(recipients), subject, body, int(html), html_body, stored))
+        return cursor.lastrowid
+
+    def due(self, now: float, limit: int = SMTP_BATCH) -> List[Dict]:
+        rows = self.db.execute(
+            "SELECT id, created, attempts, provider, sender, recipients, subject, body, html, html_body, "
+            "attachment FROM messages "
+            "WHERE next_attempt <= ? ORDER BY id LIMIT ?", (now, limit)).fetchall()
+        return [{'id': r[0], 'created': r[1], 'attempts': r[2], 'provider': r[3], 'sender': r[4],
+                 'recipients': json.loads(r[5]), 'subject': r[6], 'body': r[7], 'html': bool(r[8]),
+                 'html_body': r[9], 'attachment': self._attachment(r[10])}
+                for r in rows]
+
+    @staticmethod
+    def _attachment(stored: Optional[str]) -> Optional[Dict]:
+        attachment = json.loads(stored) if stored else None
+        # A log removed by hand is not worth failing the message over; the body still has its excerpt
+        return attachment if attachment and os.path.exists(attachment['path']) else None
+
+    def next_due(self) -> Optional[float]:
+        return self.db.execute("SELECT MIN(next_attempt) FROM messages").fetchone()[0]
+
+    def pending(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def queued(self, message_id: int) -> bool:
+        return self.db.execute("SELECT 1 FROM messages WHERE id = ?", (message_id,)).fetchone() is not None
+
+    def delete(self, ids: List[int]) -> None:
+        for i in ids:
+            row = self.db.execute("SELECT attachment FROM messages WHERE id = ?", (i,)).fetchone()
+            if row and row[0]:
+                Path(json.loads(row[0])['path']).unlink(missing_ok=True)
+        self.db.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in ids])
+
+    def defer(self, ids: List[int], until: float, error: str, count_attempt: bool = True) -> None:
+        self.db.executemany(
+            "UPDATE messages SET next_attempt = ?, last_error = ?, attempts = attempts + ? WHERE id = ?",
+            [(until, error, int(count_attempt), i) for i in ids])
+
+    def set_recipients(self, message_id: int, recipients: List[str]) -> None:
+        """Narrow a message to the recipients still waiting after a partial send"""
+        self.db.execute("UPDATE messages SET recipients = ? WHERE id = ?", (json.dumps(recipients), message_id))
+
+    def dead_letter(self, rows: List[Dict], reason: str, path: Path = DEAD_LETTER_PATH,
+                    delete: bool = True) -> None:
+        with open(path, 'a') as f:
+            for row in rows:
+                f.write(json.dumps({'ts': time.time(), 'id': row['id'], 'reason': reason,
+                                    'provider': row['provider'], 'sender': row['sender'],
+                                    'recipients': row['recipients'], 'subject': row['subject'],
+                                    'attempts': row['attempts'], 'body': row['body'],
+                                    'html': row['html'],
+                                    'attachment': (row.get('attachment') or {}).get('filename')}) + "\n")
+        if delete:
+            self.delete([row['id'] for row in rows])
+
+
+class TransportUnavailable(Exception):
+    """The provider cannot take any message right now (connection or authentication failure)"""
+
+
+def send_result(recipients: List[str]) -> Dict:
+    return {'ok': list(recipients), 'retry': [], 'rejected': [], 'error': None, 'retry_after': None}
+
+
+def retry_result(recipients: List[str], error: str) -> Dict:
+    return {'ok': [], 'retry': list(recipients), 'rejected': [], 'error': error, 'retry_after': None}
+
+
+def stream_sendmail(server: smtplib.SMTP, sender: str, recipients: List[str],
+                    chunks: Iterable[bytes]) -> Dict[str, Tuple[int, bytes]]:
+    """smtplib's sendmail, writing DATA chunk by chunk instead of from one bytes object.
+    Chunks must use CRLF line endings and start at line boundaries"""
+    server.ehlo_or_helo_if_needed()
+    code, response = server.mail(sender)
+    if code != 250:
+        _reset(server)
+        raise smtplib.SMTPSenderRefused(code, response, sender)
+    refused = {}
+    for recipient in recipients:
+        code, response = server.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, response)
+    if len(refused) == len(recipients):
+        _reset(server)
+        raise smtplib.SMTPRecipientsRefused(refused)
+    code, response = server.docmd("data")
+    if code != 354:
+        _reset(server)
+        raise smtplib.SMTPDataError(code, response)
+    ends_with_newline = True
+    for chunk in chunks:
+        if chunk:
+            server.send(DOT_RE.sub(b'..', chunk))
+            ends_with_newline = chunk.endswith(b"\r\n")
+    server.send(b".\r\n" if ends_with_newline else b"\r\n.\r\n")
+    code, response = server.getreply()
+    if code != 250:
+        _reset(server)
+        raise smtplib.SMTPDataError(code, response)
+    return refused
+
+
+def _reset(server: smtplib.SMTP) -> None:
+    try:
+        server.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+
+class SmtpConnection:
+    """One authenticated SMTP session, reused across messages and kept alive with NOOP"""
+
+    def __init__(self, config: Dict, timeout: float = SMTP_TIMEOUT):
+        self.config = config
+        self.timeout = timeout
+        self.server: Optional[smtplib.SMTP] = None
+        self.sent_on_connection = 0
+        self.last_used = 0.0
+        self.connections_opened = 0
+
+    def connect(self) -> None:
+        self.close()
+        host, port = self.config['smtp_server'], int(self.config.get('smtp_port', 587))
+        if port == 465:
+            server = smtplib.SMTP_SSL(host, port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            server = smtplib.SMTP(host, port, timeout=self.timeout)
+            if self.config.get('use_tls'):
+                server.starttls(context=ssl.create_default_context())
+        try:
+            if self.config.get('username') and self.config.get('password'):
+                server.login(self.config['username'], self.config['password'])
+        except BaseException:
+            server.close()
+            raise
+        self.server = server
+        self.sent_on_connection = 0
+        self.last_used = time.monotonic()
+        self.connections_opened += 1
+
+    def send(self, sender: str, recipients: List[str],
+             message: Union[bytes, Callable[[], Iterable[bytes]]]) -> Dict:
+        """Send one message, reconnecting once if the pooled session went away.
+        `message` is the whole message, or a function returning its chunks to stream"""
+        if self.server is None or self.sent_on_connection >= MAX_PER_CONNECTION:
+            self.connect()
+            fresh = True
+        else:
+            fresh = False
+        try:
+            refused = self._sendmail(sender, recipients, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            if fresh:
+                raise
+            # The server closed the idle session between our NOOPs
+            self.connect()
+            refused = self._sendmail(sender, recipients, message)
+        self.sent_on_connection += 1
+        self.last_used = time.monotonic()
+        return refused
+
+    def _sendmail(self, sender: str, recipients: List[str],
+                  message: Union[bytes, Callable[[], Iterable[bytes]]]) -> Dict:
+        if isinstance(message, bytes):
+            return self.server.sendmail(sender, recipients, message)
+        return stream_sendmail(self.server, sender, recipients, message())
+
+    def keepalive(self, interval: float = NOOP_INTERVAL) -> None:
+        if self.server is None or time.monotonic() - self.last_used < interval:
+            return
+        try:
+            code, _ = self.server.noop()
+            if code != 250:
+                raise smtplib.SMTPServerDisconnected(f"NOOP answered {code}")
+            self.last_used = time.monotonic()
+        except (smtplib.SMTPException, OSError):
+            # Reconnect lazily when the next message arrives
+            self.close()
+
+    def close(self) -> None:
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+        self.server = None
+
+
+class SmtpTransport:
+    """One MIME message per outbox row; each concurrent send checks out its own pooled session"""
+
+    chunk_size = SMTP_MAX_RECIPIENTS
+
+    def __init__(self, config: Dict, timeout: float = SMTP_TIMEOUT):
+        self.config = config
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.idle_connections: List[SmtpConnection] = []
+        self.opened: List[SmtpConnection] = []
+
+    @property
+    def connections_opened(self) -> int:
+        return sum(connection.connections_opened for connection in self.opened)
+
+    def send(self, row: Dict) -> Dict:
+        with self.lock:
+            connection = self.idle_connections.pop() if self.idle_connections else None
+        if connection is None:
+            connection = SmtpConnection(self.config, self.timeout)
+            with self.lock:
+                self.opened.append(connection)
+        try:
+            return self._send(connection, row)
+        finally:
+            with self.lock:
+                self.idle_connections.append(connection)
+
+    def _send(self, connection: SmtpConnection, row: Dict) -> Dict:
+        attachment = row.get('attachment')
+        message = build_message(row['sender'], row['recipients'], row['subject'], row['body'], row['html'],
+                                row['html_body'], attachment)
+        # Logs are encoded from disk while the DATA command is written, never held whole
+        payload = (lambda: message_chunks(message, attachment)) if attachment else message.as_bytes()
+        try:
+            refused = connection.send(row['sender'], row['recipients'], payload)
+        except smtplib.SMTPRecipientsRefused as e:
+            refused = e.recipients
+        except smtplib.SMTPAuthenticationError as e:
+            raise TransportUnavailable(f"authentication failed: {e.smtp_code}") from e
+        except smtplib.SMTPResponseException as e:
+            detail = e.smtp_error.decode('utf-8', 'replace') if isinstance(e.smtp_error, bytes) else e.smtp_error
+            error = f"{e.smtp_code} {detail}"
+            if 500 <= e.smtp_code < 600:
+                return {'ok': [], 'retry': [], 'rejected': list(row['recipients']), 'error': error,
+                        'retry_after': None}
+            return {'ok': [], 'retry': list(row['recipients']), 'rejected': [], 'error': error,
+                    'retry_after': None}
+        except (smtplib.SMTPException, OSError) as e:
+            connection.close()
+            raise TransportUnavailable(f"connection {e!r}") from e
+        result = send_result([r for r in row['recipients'] if r not in refused])
+        for recipient, (code, _) in refused.items():
+            result['rejected' if 500 <= code < 600 else 'retry'].append(recipient)
+        if refused:
+            result['error'] = f"recipients refused: {refused}"
+        return result
+
+    def idle(self) -> None:
+        with self.lock:
+            connections = list(self.idle_connections)
+        for connection in connections:
+            connection.keepalive()
+
+    def close(self) -> None:
+        with self.lock:
+            for connection in self.opened:
+                connection.close()
+
+
+class HttpPool:
+    """Keep-alive HTTP(S) connections per host for the API providers, shared by sender threads"""
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.idle: Dict[Tuple, List[http.client.HTTPConnection]] = {}
+        self.connections_opened = 0
+
+    def request(self, method: str, url: str, body: Union[bytes, Callable[[], Iterable[bytes]]],
+                headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """`body` may be a function returning chunks to stream; headers must then carry Content-Length"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path + (f"?{parts.query}" if parts.query else '')
+        for attempt in range(2):
+            with self.lock:
+                idle = self.idle.get(key)
+                connection = idle.pop() if idle else None
+                if connection is None:
+                    self.connections_opened += 1
+            reused = connection is not None
+            if connection is None:
+                if parts.scheme == 'https':
+                    connection = http.client.HTTPSConnection(parts.hostname, parts.port, timeout=self.timeout,
+                                                             context=ssl.create_default_context())
+                else:
+                    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=self.timeout)
+            try:
+                connection.request(method, path, body=body() if callable(body) else body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionError):
+                connection.close()
+                # A reused connection may have been closed by the server while idle
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                with self.lock:
+                    self.idle.setdefault(key, []).append(connection)
+            return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+        raise ConnectionError("unreachable")
+
+    def close(self) -> None:
+        with self.lock:
+            for connections in self.idle.values():
+                for connection in connections:
+                    connection.close()
+            self.idle.clear()
+
+
+def backoff_after(headers: Dict[str, str], attempts: int) -> float:
+    """Seconds to wait after a throttling answer: Retry-After, X-RateLimit-Reset, or exponential"""
+    try:
+        if 'retry-after' in headers:
+            return max(0.0, float(headers['retry-after']))
+        if 'x-ratelimit-reset' in headers:
+            return max(1.0, float(headers['x-ratelimit-reset']) - time.time())
+    except ValueError:
+        pass
+    return min(MAX_BACKOFF, 2.0 ** (attempts + 1))
+
+
+class SendGridTransport:
+    """SendGrid v3 mail/send with one personalization per recipient, up to 1000 per request"""
+
+    chunk_size = SENDGRID_MAX_PERSONALIZATIONS
+
+    def __init__(self, config: Dict, pool: HttpPool):
+        self.config = config
+        self.pool = pool
+        self.url = config.get('sendgrid_api', SENDGRID_API).rstrip('/') + "/v3/mail/send"
+
+    def send(self, row: Dict) -> Dict:
+        if not self.config.get('api_key'):
+            raise TransportUnavailable("no SendGrid API key (EMAIL_API_KEY in .env.email)")
+        content = [{"type": "text/plain", "value": row['body']}]
+        if html_part(row):
+            content.append({"type": "text/html", "value": html_part(row)})
+        headers = {"Authorization": f"Bearer {self.config['api_key']}", "Content-Type": "application/json"}
+        attachment = row.get('attachment')
+        result = send_result([])
+        recipients = row['recipients']
+        for start in range(0, len(recipients), SENDGRID_MAX_PERSONALIZATIONS):
+            chunk = recipients[start:start + SENDGRID_MAX_PERSONALIZATIONS]
+            if result['retry_after'] is not None:
+                result['retry'].extend(chunk)
+                continue
+            payload = {
+                "personalizations": [{"to": [{"email": r}]} for r in chunk],
+                "from": {"email": row['sender']},
+                "subject": row['subject'],
+                "content": content,
+            }
+            if attachment:
+                # The log is base64-encoded into the JSON as the request is written
+                payload["attachments"] = [{"content": ATTACHMENT_MARKER, "filename": attachment['filename'],
+                                           "type": "application/gzip", "disposition": "attachment"}]
+                body = spliced_json(payload, lambda: base64_stream(read_blocks(attachment['path'])))
+                headers["Content-Length"] = str(measure(body)[0])
+            else:
+                body = json.dumps(payload).encode()
+            try:
+                status, response_headers, data = self.pool.request("POST", self.url, body, headers)
+            except (OSError, http.client.HTTPException) as e:
+                raise TransportUnavailable(f"SendGrid {e!r}") from e
+            if status in (200, 202):
+                result['ok'].extend(chunk)
+            elif status == 429:
+                result['retry'].extend(chunk)
+                result['retry_after'] = backoff_after(response_headers, row['attempts'])
+                result['error'] = "SendGrid rate limited"
+            elif status in (401, 403):
+                raise TransportUnavailable(f"SendGrid {status} {data[:200].decode('utf-8', 'replace')}")
+            elif 400 <= status < 500:
+                result['rejected'].extend(chunk)
+                result['error'] = f"SendGrid {status} {data[:200].decode('utf-8', 'replace')}"
+            else:
+                result['retry'].extend(chunk)
+                result['error'] = f"SendGrid {status}"
+        return result
+
+    def idle(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def aws_credentials() -> Optional[Tuple[str, str, Optional[str]]]:
+    """Access key, secret and session token from the environment or ~/.aws/credentials"""
+    if os.environ.get("AWS_ACCESS_KEY_ID") and os.environ.get("AWS_SECRET_ACCESS_KEY"):
+        return (os.environ["AWS_ACCESS_KEY_ID"], os.environ["AWS_SECRET_ACCESS_KEY"],
+                os.environ.get("AWS_SESSION_TOKEN"))
+    path = Path(os.environ.get("AWS_SHARED_CREDENTIALS_FILE", Path.home() / ".aws" / "credentials"))
+    profile = os.environ.get("AWS_PROFILE", "default")
+    parser = configparser.ConfigParser()
+    if not parser.read(path) or not parser.has_option(profile, 'aws_access_key_id'):
+        return None
+    section = parser[profile]
+    return section['aws_access_key_id'], section['aws_secret_access_key'], section.get('aws_session_token')
+
+
+def sigv4_sign(method: str, url: str, headers: Dict[str, str], body: bytes, region: str, service: str,
+               access_key: str, secret_key: str, now: Optional[float] = None,
+               payload_hash: Optional[str] = None) -> Dict[str, str]:
+    """Add x-amz-date and an AWS Signature Version 4 Authorization header to `headers`.
+    A streamed body is signed by its precomputed `payload_hash`"""
+    parts = urlsplit(url)
+    amz_date = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(now))
+    date = amz_date[:8]
+    signed_headers = {k.lower(): str(v).strip() for k, v in headers.items()}
+    signed_headers['host'] = parts.netloc
+    signed_headers['x-amz-date'] = amz_date
+    names = ';'.join(sorted(signed_headers))
+    query = '&'.join(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+                     for k, v in sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    canonical = '\n'.join([
+        method, quote(parts.path or '/', safe='/-_.~'), query,
+        ''.join(f"{name}:{signed_headers[name]}\n" for name in sorted(signed_headers)),
+        names, payload_hash or hashlib.sha256(body).hexdigest(),
+    ])
+    scope = f"{date}/{region}/{service}/aws4_request"
+    to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+    key = ('AWS4' + secret_key).encode()
+    for part in (date, region, service, 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+    signed = dict(headers)
+    signed['X-Amz-Date'] = amz_date
+    signed['Authorization'] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+                               f"SignedHeaders={names}, Signature={signature}")
+    return signed
+
+
+class SesTransport:
+    """SES v2 SendBulkEmail with a stored template, one entry per recipient, 50 per request"""
+
+    chunk_size = SES_MAX_BULK_ENTRIES
+
+    def __init__(self, config: Dict, pool: HttpPool):
+        self.config = config
+        self.pool = pool
+        self.region = config.get('region', 'us-east-1')
+        self.endpoint = config.get('ses_endpoint', f"https://email.{self.region}.amazonaws.com").rstrip('/')
+        self.template = config.get('ses_template', SES_TEMPLATE)
+        self.template_ready = False
+
+    def _call(self, path: str, payload: Dict,
+              stream: Optional[Callable[[], Iterable[bytes]]] = None) -> Tuple[int, Dict[str, str], Dict]:
+        """POST to the SES v2 API; `stream` replaces ATTACHMENT_MARKER in the payload with streamed bytes"""
+        credentials = aws_credentials()
+        if credentials is None:
+            raise TransportUnavailable("no AWS credentials (AWS_ACCESS_KEY_ID or ~/.aws/credentials)")
+        access_key, secret_key, token = credentials
+        url = self.endpoint + path
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["X-Amz-Security-Token"] = token
+        if stream is None:
+            body = json.dumps(payload).encode()
+            headers = sigv4_sign("POST", url, headers, body, self.region, "ses", access_key, secret_key)
+        else:
+            body = spliced_json(payload, stream)
+            length, digest = measure(body)
+            headers = sigv4_sign("POST", url, headers, b'', self.region, "ses", access_key, secret_key,
+                                 payload_hash=digest)
+            headers["Content-Length"] = str(length)
+        try:
+            status, response_headers, data = self.pool.request("POST", url, body, headers)
+        except (OSError, http.client.HTTPException) as e:
+            raise TransportUnavailable(f"SES {e!r}") from e
+        try:
+            parsed = json.loads(data) if data else {}
+        except json.JSONDecodeError:
+            parsed = {'message': data[:200].decode('utf-8', 'replace')}
+        if status in (401, 403):
+            raise TransportUnavailable(f"SES {status} {parsed.get('message', '')}")
+        return status, response_headers, parsed
+
+    def _ensure_template(self) -> None:
+        status, _, parsed = self._call("/v2/email/templates", {
+            "TemplateName": self.template,
+            "TemplateContent": {"Subject": "{{subject}}", "Text": "{{{text}}}", "Html": "{{{html}}}"},
+        })
+        if status not in (200, 409) and 'AlreadyExists' not in str(parsed):
+            raise TransportUnavailable(f"SES could not create template {self.template}: {status} {parsed}")
+        self.template_ready = True
+
+    def send(self, row: Dict) -> Dict:
+        if row.get('attachment'):
+            return self._send_raw(row)
+        html_body = html_part(row) or html.escape(row['body']).replace('\n', '<br>')
+        data = json.dumps({"subject": row['subject'], "text": row['body'], "html": html_body})
+        result = send_result([])
+        pending = list(row['recipients'])
+        created = False
+        while pending:
+            chunk, pending = pending[:SES_MAX_BULK_ENTRIES], pending[SES_MAX_BULK_ENTRIES:]
+            if result['retry_after'] is not None:
+                result['retry'].extend(chunk)
+                continue
+            status, headers, parsed = self._call("/v2/email/outbound-bulk-emails", {
+                "FromEmailAddress": row['sender'],
+                "DefaultContent": {"Template": {"TemplateName": self.template, "TemplateData": data}},
+                "BulkEmailEntries": [{"Destination": {"ToAddresses": [r]}} for r in chunk],
+            })
+            if status == 429:
+                result['retry'].extend(chunk)
+                result['retry_after'] = backoff_after(headers, row['attempts'])
+                result['error'] = "SES throttled"
+                continue
+            if status >= 500:
+                result['retry'].extend(chunk)
+                result['error'] = f"SES {status}"
+                continue
+            if status != 200:
+                result['rejected'].extend(chunk)
+                result['error'] = f"SES {status} {parsed.get('message', '')}"
+                continue
+            missing_template = []
+            for recipient, entry in zip(chunk, parsed.get('BulkEmailEntryResults', [])):
+                outcome = entry.get('Status', 'FAILED')
+                if outcome == 'SUCCESS':
+                    result['ok'].append(recipient)
+                elif outcome == 'TEMPLATE_NOT_FOUND' and not created:
+                    missing_template.append(recipient)
+                elif outcome in SES_RETRY_STATUSES:
+                    result['retry'].append(recipient)
+                    result['error'] = f"SES {outcome}"
+                    if outcome in ('ACCOUNT_THROTTLED', 'ACCOUNT_DAILY_QUOTA_EXCEEDED'):
+                        result['retry_after'] = backoff_after({}, row['attempts'])
+                else:
+                    result['rejected'].append(recipient)
+                    result['error'] = f"SES {outcome} {entry.get('Error', '')}".strip()
+            if missing_template:
+                # First use on this account: store the template once, then resend those entries
+                self._ensure_template()
+                created = True
+                pending = missing_template + pending
+        return result
+
+    def _send_raw(self, row: Dict) -> Dict:
+        """Templates cannot carry attachments, so a message with a log goes out as raw MIME via SendEmail"""
+        result = send_result([])
+        message = build_message(row['sender'], row['recipients'], row['subject'], row['body'], row['html'],
+                                row['html_body'], row['attachment'])
+        for start in range(0, len(row['recipients']), SES_MAX_BULK_ENTRIES):
+            chunk = row['recipients'][start:start + SES_MAX_BULK_ENTRIES]
+            if result['retry_after'] is not None:
+                result['retry'].extend(chunk)
+                continue
+            status, headers, parsed = self._call("/v2/email/outbound-emails", {
+                "FromEmailAddress": row['sender'],
+                "Destination": {"ToAddresses": chunk},
+                "Content": {"Raw": {"Data": ATTACHMENT_MARKER}},
+            }, lambda: base64_stream(message_chunks(message, row['attachment'])))
+            if status == 200:
+                result['ok'].extend(chunk)
+            elif status == 429:
+                result['retry'].extend(chunk)
+                result['retry_after'] = backoff_after(headers, row['attempts'])
+                result['error'] = "SES throttled"
+            elif status >= 500:
+                result['retry'].extend(chunk)
+                result['error'] = f"SES {status}"
+            else:
+                result['rejected'].extend(chunk)
+                result['error'] = f"SES {status} {parsed.get('message', '')}"
+        return result
+
+    def idle(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class EmailSender:
+    """Drains the outbox concurrently over pooled SMTP sessions and HTTP connections, failing over
+    between the configured providers and steering traffic away from slow or failing ones"""
+
+    def __init__(self, outbox: Outbox, config: Optional[Dict] = None, idle_exit: float = IDLE_EXIT):
+        self.outbox = outbox
+        self.config = config if config is not None else load_config()
+        self.idle_exit = idle_exit
+        self.budget = float(self.config.get('latency_budget', LATENCY_BUDGET))
+        self.max_concurrency = int(self.config.get('max_concurrency', MAX_CONCURRENCY))
+        self.providers = configured_providers(self.config)
+        self.stats = ProviderStats(outbox.db, self.budget)
+        self.pool = HttpPool(self.budget)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="email-send")
+        self.transports: Dict[str, object] = {}
+        self.blocked_until: Dict[str, float] = {}
+        self.guard = AlertGuard(self.config)
+        self.delivered: List[int] = []
+        self.failed: List[int] = []
+
+    def transport(self, provider: str):
+        if provider not in self.transports:
+            if provider == 'sendgrid':
+                self.transports[provider] = SendGridTransport(self.config, self.pool)
+            elif provider == 'ses':
+                self.transports[provider] = SesTransport(self.config, self.pool)
+            else:
+                self.transports[provider] = SmtpTransport(self.config, self.budget)
+        return self.transports[provider]
+
+    def chain(self, row: Dict) -> List[str]:
+        """The row's own provider, then the others in failover order, healthiest first"""
+        return self.stats.order([row['provider']] + [p for p in self.providers if p != row['provider']])
+
+    def run(self, until_id: Optional[int] = None, deadline: Optional[float] = None) -> None:
+        """Send until idle for idle_exit seconds, or until message `until_id` is settled"""
+        idle_since = time.monotonic()
+        try:
+            while True:
+                if until_id is not None and (until_id in self.delivered or until_id in self.failed):
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    break
+                summary_due = self.guard.summary_due()
+                if summary_due is not None and summary_due <= time.time():
+                    self.enqueue_summary()
+                rows = self.outbox.due(time.time())
+                if rows:
+                    self.send_batch(rows)
+                    idle_since = time.monotonic()
+                    continue
+                # Stay up while suppressed alerts still need their summary
+                if until_id is None and summary_due is None and time.monotonic() - idle_since >= self.idle_exit:
+                    break
+                for transport in self.transports.values():
+                    transport.idle()
+                next_due = self.outbox.next_due()
+                wait = POLL_INTERVAL if next_due is None else min(POLL_INTERVAL, max(0.0, next_due - time.time()))
+                time.sleep(wait)
+        finally:
+            self.executor.shutdown()
+            for transport in self.transports.values():
+                transport.close()
+            self.pool.close()
+
+    def enqueue_summary(self) -> None:
+        summary = self.guard.take_summary(time.time())
+        if summary is None or not self.config.get('recipients'):
+            return
+        self.outbox.enqueue(provider_for(self.config.get('service')), self.config['from_email'],
+                            list(self.config['recipients']), *summary,
+                            bool(self.config.get('preferences', {}).get('html_emails')))
+
+    def send_batch(self, rows: List[Dict]) -> None:
+        results = asyncio.run(self._send_batch(rows))
+        for row, result in zip(rows, results):
+            self._settle(row, result)
+        self.stats.save()
+
+    async def _send_batch(self, rows: List[Dict]) -> List[Dict]:
+        limits = {provider: asyncio.Semaphore(MAX_SMTP_SESSIONS if provider == 'smtp' else self.max_concurrency)
+                  for provider in PROVIDER_ORDER}
+        limits['all'] = asyncio.Semaphore(self.max_concurrency)
+        unavailable: Dict[str, str] = {}
+        return await asyncio.gather(*(self._deliver(row, limits, unavailable) for row in rows))
+
+    async def _deliver(self, row: Dict, limits: Dict[str, asyncio.Semaphore], unavailable: Dict[str, str]) -> Dict:
+        """Send one row, handing recipients a provider could not take to the next one in its chain"""
+        outcome = send_result([])
+        pending = list(row['recipients'])
+        throttled_for: Optional[float] = None
+        failed = False
+        for provider in self.chain(row):
+            if not pending:
+                break
+            if provider in unavailable:
+                outcome['error'] = unavailable[provider]
+                failed = True
+                continue
+            blocked = self.blocked_until.get(provider, 0.0) - time.time()
+            if blocked > 0:
+                throttled_for = blocked if throttled_for is None else min(throttled_for, blocked)
+                outcome['error'] = outcome['error'] or f"{provider} throttled"
+                continue
+            size = self.transport(provider).chunk_size
+            results = await asyncio.gather(*(
+                self._attempt(provider, {**row, 'recipients': pending[start:start + size]}, limits, unavailable)
+                for start in range(0, len(pending), size)))
+            pending = []
+            for result in results:
+                outcome['ok'].extend(result['ok'])
+                outcome['rejected'].extend(result['rejected'])
+                pending.extend(result['retry'])
+                if result['error']:
+                    outcome['error'] = result['error']
+                if result['retry_after'] is not None:
+                    # Hold the provider's other messages until its rate limit resets
+                    self.blocked_until[provider] = max(self.blocked_until.get(provider, 0.0),
+                                                       time.time() + result['retry_after'])
+                    throttled_for = result['retry_after'] if throttled_for is None else \
+                        min(throttled_for, result['retry_after'])
+                elif result['retry']:
+                    failed = True
+        outcome['retry'] = pending
+        if pending and not failed:
+            # Every provider that could take the rest is rate limited
+            outcome['retry_after'] = throttled_for
+        return outcome
+
+    async def _attempt(self, provider: str, row: Dict, limits: Dict[str, asyncio.Semaphore],
+                       unavailable: Dict[str, str]) -> Dict:
+        async with limits[provider], limits['all']:
+            if provider in unavailable:
+                return retry_result(row['recipients'], unavailable[provider])
+            started = time.monotonic()
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.transport(provider).send, row)
+            except TransportUnavailable as e:
+                # Skip this provider for the rest of the batch
+                unavailable[provider] = str(e)
+                result = retry_result(row['recipients'], str(e))
+            self.stats.record(provider, time.monotonic() - started,
+                              bool(result['retry']) and result['retry_after'] is None)
+            return result
+
+    def _settle(self, row: Dict, result: Dict) -> None:
+        if result['rejected']:
+            self.outbox.dead_letter([{**row, 'recipients': result['rejected']}], result['error'] or "rejected",
+                                    delete=False)
+        if result['retry']:
+            self.outbox.set_recipients(row['id'], result['retry'])
+            row = {**row, 'recipients': result['retry']}
+            if result['retry_after'] is not None:
+                # Throttling is not the message's fault, so the attempt is not counted
+                self.outbox.defer([row['id']], time.time() + result['retry_after'], result['error'] or "throttled",
+                                  count_attempt=False)
+            else:
+                self._retry_later(row, result['error'] or "retry")
+            return
+        self.outbox.delete([row['id']])
+        if result['ok']:
+            self.delivered.append(row['id'])
+        else:
+            self.failed.append(row['id'])
+
+    def _retry_later(self, row: Dict, error: str) -> None:
+        if row['attempts'] + 1 >= MAX_ATTEMPTS:
+            self.outbox.dead_letter([row], f"gave up after {MAX_ATTEMPTS} attempts: {error}")
+            self.failed.append(row['id'])
+        else:
+            self.outbox.defer([row['id']], time.time() + min(MAX_BACKOFF, 2.0 ** (row['attempts'] + 1)), error)
+
+
+def _try_lock(path: Path = SENDER_LOCK) -> Optional[int]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+
+def run_sender(idle_exit: float = IDLE_EXIT) -> None:
+    """Send until idle; only one sender (and connection pool) runs per project"""
+    fd = _try_lock()
+    if fd is None:
+        return
+    outbox = Outbox()
+    while True:
+        EmailSender(outbox, idle_exit=idle_exit).run()
+        os.close(fd)
+        # A notifier may have queued after our last check while it saw the lock held
+        if not outbox.pending():
+            return
+        fd = _try_lock()
+        if fd is None:
+            return
+
+
+def ensure_sender() -> None:
+    """Start a background sender unless one is already running"""
+    fd = _try_lock()
+    if fd is None:
+        return
+    os.close(fd)
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), "send"],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+
+def _dead_lettered(message_id: int, path: Path = DEAD_LETTER_PATH) -> bool:
+    if not path.exists():
+        return False
+    with open(path) as f:
+        return any(json.loads(line).get('id') == message_id for line in f)
+
+
+def deliver(config: Dict, subject: str, body: str, wait: bool = False, html_body: Optional[str] = None,
+            attachment: Optional[Dict] = None) -> bool:
+    """Queue an email for the configured provider; with wait=True send it in-process and report the outcome.
+    `html_body` sends a pre-rendered HTML alternative alongside the text; `attachment` is a spool_log() file"""
+    outbox = Outbox()
+    message_id = outbox.enqueue(provider_for(config.get('service')), config['from_email'],
+                                list(config['recipients']), subject, body,
+                                bool(config.get('preferences', {}).get('html_emails')), html_body, attachment)
+    if not wait:
+        ensure_sender()
+        return True
+    deadline = time.monotonic() + 60
+    fd = _try_lock()
+    if fd is None:
+        # The background sender owns the connections; wait for it to settle the message
+        while outbox.queued(message_id) and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+        return not outbox.queued(message_id) and not _dead_lettered(message_id)
+    try:
+        sender = EmailSender(outbox, config, idle_exit=0)
+        sender.run(until_id=message_id, deadline=deadline)
+        return message_id in sender.delivered
+    finally:
+        os.close(fd)
+        if outbox.pending():
+            ensure_sender()
+
+
+def status() -> None:
+    queue = DigestQueue()
+    pending = queue.pending()
+    print(f"📬 Email digest: {pending} queued")
+    oldest = queue.oldest()
+    if oldest is not None:
+        print(f"   oldest queued {(time.time() - oldest) / 3600:.1f}h ago")
+    outbox = Outbox()
+    dead = 0
+    if DEAD_LETTER_PATH.exists():
+        with open(DEAD_LETTER_PATH) as f:
+            dead = sum(1 for _ in f)
+    print(f"📤 Email outbox: {outbox.pending()} pending, {dead} dead-lettered")
+    stats = ProviderStats(outbox.db)
+    now = time.time()
+    for provider, s in sorted(stats.stats.items()):
+        print(f"   {provider}: {s['latency'] * 1000:.0f}ms avg, {stats.errors(provider, now):.0%} errors, "
+              f"{s['sends']} sends" + ("" if stats.healthy(provider, now) else " (steered away)"))
+    suppressed, circuit_until = AlertGuard(load_config()).state()
+    if suppressed or circuit_until:
+        print(f"🔕 Alerts: {suppressed} suppressed since the last summary"
+              + (f", circuit open until {time.strftime('%H:%M', time.localtime(circuit_until))}"
+                 if circuit_until else ""))
+    running = _try_lock()
+    if running is None:
+        print("   sender running")
+    else:
+        os.close(running)
+
+
+def preview() -> None:
+    """Print the digest that would be sent now, without claiming anything"""
+    queue = DigestQueue()
+    top = queue.db.execute("SELECT MAX(id) FROM entries").fetchone()[0]
+    if top is None:
+        print("No queued notifications")
+        return
+    queue.db.execute("BEGIN")
+    try:
+        queue.db.execute("UPDATE entries SET digest = -1 WHERE digest IS NULL")
+        subject, body = render_digest(queue.groups(-1))
+    finally:
+        queue.db.execute("ROLLBACK")
+    print(f"Subject: {subject}\n\n{body}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Email digest queue and provider outbox")
+    parser.add_argument("action", choices=["send", "status", "preview"])
+    parser.add_argument("--idle-exit", type=float, default=IDLE_EXIT,
+                        help="Seconds the sender keeps its connections open waiting for messages")
+    args = parser.parse_args()
+    if args.action == "send":
+        run_sender(args.idle_exit)
+    elif args.action == "status":
+        status()
+    else:
+        preview()
+
+
+if __name__ == "__main__":
+    main()
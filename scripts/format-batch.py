@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Batched Formatter for Multi-Agent Squad
+Collects written files for a short window and formats them in one pass per formatter
+"""
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import socket
+import argparse
+import http.client
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from hook_runtime import event_file_paths
+
+CACHE_DIR = Path(".claude/cache")
+QUEUE_PATH = CACHE_DIR / "format-queue"
+QUEUE_LOCK_PATH = CACHE_DIR / "format-queue.lock"
+LOCK_PATH = CACHE_DIR / "format.lock"
+RESULTS_PATH = CACHE_DIR / "format-results.jsonl"
+
+DEFAULT_WINDOW = 0.3
+# How long a hook call whose files another process is formatting waits to print their results
+RESULT_WAIT = 30.0
+MAX_FILES_PER_RUN = 200
+BLACKD_HOST = os.environ.get("BLACKD_HOST", "localhost")
+BLACKD_PORT = int(os.environ.get("BLACKD_PORT", "45484"))
+
+FORMATTERS = {
+    '.py': 'black',
+    '.js': 'prettier',
+    '.jsx': 'prettier',
+    '.ts': 'prettier',
+    '.tsx': 'prettier',
+}
+
+
+def enqueue(paths: List[str]) -> None:
+    """Append paths to the shared queue with a single O_APPEND write"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    data = ''.join(f"{os.path.abspath(p)}\n" for p in paths).encode()
+    # The queue lock keeps drain() from claiming the file between our open and write
+    with open(QUEUE_LOCK_PATH, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        fd = os.open(QUEUE_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def drain() -> List[str]:
+    """Atomically take everything queued so far"""
+    claimed = QUEUE_PATH.with_name(f"format-queue.{os.getpid()}")
+    with open(QUEUE_LOCK_PATH, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            os.rename(QUEUE_PATH, claimed)
+        except FileNotFoundError:
+            return []
+    with open(claimed) as f:
+        paths = [line.strip() for line in f if line.strip()]
+    claimed.unlink()
+    # Keep first-seen order but format each file once
+    return [p for p in dict.fromkeys(paths) if os.path.isfile(p)]
+
+
+def queue_pending() -> bool:
+    try:
+        return QUEUE_PATH.stat().st_size > 0
+    except FileNotFoundError:
+        return False
+
+
+class BatchFormatter:
+    """Runs one formatter process per group, or a formatter daemon when available"""
+
+    def __init__(self):
+        self.blackd = self._blackd_available()
+        self.prettierd = shutil.which("prettierd")
+
+    @staticmethod
+    def _blackd_available() -> bool:
+        try:
+            with socket.create_connection((BLACKD_HOST, BLACKD_PORT), timeout=0.05):
+                return True
+        except OSError:
+            return False
+
+    def format(self, paths: List[str]) -> List[Dict]:
+        groups: Dict[str, List[str]] = {}
+        for path in paths:
+            formatter = FORMATTERS.get(Path(path).suffix)
+            if formatter:
+                groups.setdefault(formatter, []).append(path)
+
+        results = []
+        for formatter, files in groups.items():
+            if formatter == 'black':
+                results.extend(self._blackd(files) if self.blackd else self._black(files))
+            elif self.prettierd:
+                results.extend(self._prettierd(files))
+            else:
+                results.extend(self._prettier(files))
+        return results
+
+    @staticmethod
+    def _chunks(files: List[str]):
+        for i in range(0, len(files), MAX_FILES_PER_RUN):
+            yield files[i:i + MAX_FILES_PER_RUN]
+
+    @staticmethod
+    def _missing(files: List[str], formatter: str, hint: str) -> List[Dict]:
+        return [{'path': f, 'formatter': formatter, 'status': 'skipped', 'detail': hint} for f in files]
+
+    def _black(self, files: List[str]) -> List[Dict]:
+        if not shutil.which("black"):
+            return self._missing(files, 'black', "Install black for Python formatting")
+        results = []
+        for chunk in self._chunks(files):
+            proc = subprocess.run(["black", *chunk], capture_output=True, text=True)
+            reformatted, errors = set(), {}
+            for line in proc.stderr.splitlines():
+                if line.startswith("reformatted "):
+                    reformatted.add(os.path.abspath(line[len("reformatted "):].strip()))
+                elif line.startswith("error: "):
+                    # "error: cannot format <path>: ..." or "error: cannot parse: <path>:1:4"
+                    for f in chunk:
+                        if f in line:
+                            errors[f] = line[len("error: "):].replace(f, os.path.relpath(f))
+            for f in chunk:
+                status = 'error' if f in errors else 'reformatted' if f in reformatted else 'unchanged'
+                results.append({'path': f, 'formatter': 'black', 'status': status, 'detail': errors.get(f, '')})
+        return results
+
+    def _blackd(self, files: List[str]) -> List[Dict]:
+        """Send files to a running blackd over one keep-alive connection"""
+        results = []
+        conn = http.client.HTTPConnection(BLACKD_HOST, BLACKD_PORT, timeout=10)
+        try:
+            for f in files:
+                with open(f, 'rb') as fh:
+                    source = fh.read()
+                conn.request("POST", "/", body=source, headers={"X-Fast-Or-Safe": "safe"})
+                response = conn.getresponse()
+                body = response.read()
+                if response.status == 200:
+                    with open(f, 'wb') as fh:
+                        fh.write(body)
+                    status, detail = 'reformatted', ''
+                elif response.status == 204:
+                    status, detail = 'unchanged', ''
+                else:
+                    status, detail = 'error', body.decode(errors='replace').strip()
+                results.append({'path': f, 'formatter': 'blackd', 'status': status, 'detail': detail})
+        except (OSError, http.client.HTTPException):
+            done = {r['path'] for r in results}
+            results.extend(self._black([f for f in files if f not in done]))
+        finally:
+            conn.close()
+        return results
+
+    def _prettier(self, files: List[str]) -> List[Dict]:
+        command = ["prettier"] if shutil.which("prettier") else None
+        if command is None and shutil.which("npx"):
+            command = ["npx", "--no-install", "prettier"]
+        if command is None:
+            return self._missing(files, 'prettier', "Install prettier for JS/TS formatting")
+        results = []
+        for chunk in self._chunks(files):
+            proc = subprocess.run(command + ["--write", "--list-different", *chunk],
+                                  capture_output=True, text=True)
+            changed = {os.path.abspath(line.strip()) for line in proc.stdout.splitlines() if line.strip()}
+            errors = {}
+            for line in proc.stderr.splitlines():
+                if line.startswith("[error] ") and ": " in line:
+                    path, _, detail = line[len("[error] "):].partition(": ")
+                    errors[os.path.abspath(path)] = detail
+            for f in chunk:
+                status = 'error' if f in errors else 'reformatted' if f in changed else 'unchanged'
+                results.append({'path': f, 'formatter': 'prettier', 'status': status, 'detail': errors.get(f, '')})
+        return results
+
+    def _prettierd(self, files: List[str]) -> List[Dict]:
+        results = []
+        for f in files:
+            with open(f) as fh:
+                source = fh.read()
+            proc = subprocess.run([self.prettierd, f], input=source, capture_output=True, text=True)
+            if proc.returncode != 0:
+                results.append({'path': f, 'formatter': 'prettierd', 'status': 'error', 'detail': proc.stderr.strip()})
+                continue
+            if proc.stdout != source:
+                with open(f, 'w') as fh:
+                    fh.write(proc.stdout)
+                status = 'reformatted'
+            else:
+                status = 'unchanged'
+            results.append({'path': f, 'formatter': 'prettierd', 'status': status, 'detail': ''})
+        return results
+
+
+def print_result(result: Dict) -> None:
+    icons = {'reformatted': '🎨', 'unchanged': '✓', 'skipped': '⏭️', 'error': '❌'}
+    detail = f" ({result['detail']})" if result['detail'] else ''
+    print(f"{icons[result['status']]} {result['formatter']}: {result['path']} {result['status']}{detail}")
+
+
+def report(results: List[Dict]) -> Set[str]:
+    """Print per-file results and append them to the results log; returns the paths reported"""
+    now = round(time.time(), 3)
+    reported = set()
+    with open(RESULTS_PATH, 'a') as log:
+        for result in results:
+            result = {**result, 'path': os.path.relpath(result['path'])}
+            print_result(result)
+            log.write(json.dumps({**result, 'ts': now}) + "\n")
+            reported.add(result['path'])
+    return reported
+
+
+def results_since(offset: int) -> Tuple[List[Dict], int]:
+    """Complete result rows logged after `offset`, and the offset after them"""
+    try:
+        with open(RESULTS_PATH, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    end = data.rfind(b"\n") + 1
+    rows = []
+    for line in data[:end].splitlines():
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return rows, offset + end
+
+
+def wait_for_results(paths: Set[str], offset: int, window: float, timeout: float) -> None:
+    """Print the results another process logs for our paths, so every hook call shows its files"""
+    deadline = time.monotonic() + timeout
+    final = False
+    while paths:
+        rows, offset = results_since(offset)
+        for row in rows:
+            if row['path'] in paths:
+                paths.discard(row['path'])
+                print_result(row)
+        if final or not paths or time.monotonic() >= deadline:
+            break
+        # Take over if the leader exited after our enqueue; returns at once while one runs
+        led, reported = run_leader(window)
+        paths -= reported
+        # Having led until the queue was empty, every result for our paths is logged by now
+        final = led
+        if not led:
+            time.sleep(0.1)
+    if paths:
+        print(f"⏳ No result yet for {len(paths)} file(s); see {RESULTS_PATH}")
+
+
+def run_leader(window: float) -> Tuple[bool, Set[str]]:
+    """Format batches until the queue stays empty; exit at once if another leader runs.
+    Returns whether this process led, and the paths it reported"""
+    formatter: Optional[BatchFormatter] = None
+    led = False
+    reported: Set[str] = set()
+    while True:
+        with open(LOCK_PATH, 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return led, reported
+            led = True
+            while True:
+                time.sleep(window)
+                batch = drain()
+                if not batch:
+                    break
+                formatter = formatter or BatchFormatter()
+                reported |= report(formatter.format(batch))
+        # A path queued between the last drain and unlocking still needs a leader
+        if not queue_pending():
+            return led, reported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch formatter for the format-on-write hook")
+    parser.add_argument("paths", nargs="*", help="Files that were written")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW,
+                        help="Seconds to wait for more files before formatting")
+    parser.add_argument("--now", action="store_true", help="Format the given files immediately")
+    args = parser.parse_args()
+
+    # Batched watcher events list every changed file in CLAUDE_FILE_PATHS or CLAUDE_FILE_LIST
+    batch = event_file_paths()
+    paths = [p for p in dict.fromkeys(args.paths + batch) if p and Path(p).suffix in FORMATTERS]
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    if args.now:
+        report(BatchFormatter().format([os.path.abspath(p) for p in paths if os.path.isfile(p)]))
+        return
+
+    try:
+        offset = RESULTS_PATH.stat().st_size
+    except FileNotFoundError:
+        offset = 0
+    if paths:
+        enqueue(paths)
+    _, reported = run_leader(args.window)
+    # Files another leader formatted: wait for its results rather than exiting silently
+    mine = {os.path.relpath(os.path.abspath(p)) for p in paths if os.path.isfile(p)}
+    wait_for_results(mine - reported, offset, args.window, RESULT_WAIT)
+
+
+if __name__ == "__main__":
+    main()
@@ -49,7 +49,14 @@ class HookGenerator:
                     'tool_name': 'Write',
                     'file_paths': ['src/**/*', 'lib/**/*']
                 },
-                'command': 'echo "🧪 Running tests..." && npm test 2>/dev/null || pytest 2>/dev/null || echo "Configure test command in package.json or setup.py"',
+                'command': '''
+if [ -f scripts/test-impact.py ]; then
+    echo "🧪 Running affected tests..."
+    python scripts/hook-limits.py run --background --label tests -- python scripts/test-impact.py run "$CLAUDE_FILE_PATH"
+else
+    echo "🧪 Running tests..." && npm test 2>/dev/null || pytest 2>/dev/null || echo "Configure test command in package.json or setup.py"
+fi
+''',
                 'run_in_background': True
             })
         
@@ -62,7 +69,9 @@ class HookGenerator:
                     'file_paths': ['**/*.py', '**/*.js', '**/*.ts']
                 },
                 'command': '''
-if [[ $CLAUDE_FILE_PATH == *.py ]]; then
+if [ -f scripts/format-batch.py ]; then
+    python scripts/hook-limits.py run --background --label format -- python scripts/format-batch.py "$CLAUDE_FILE_PATH"
+elif [[ $CLAUDE_FILE_PATH == *.py ]]; then
     black $CLAUDE_FILE_PATH 2>/dev/null || echo "Install black for Python formatting"
 elif [[ $CLAUDE_FILE_PATH == *.js ]] || [[ $CLAUDE_FILE_PATH == *.ts ]]; then
     prettier --write $CLAUDE_FILE_PATH 2>/dev/null || echo "Install prettier for JS/TS formatting"
@@ -103,9 +112,13 @@ fi
             hooks.append({
                 'event': 'Stop',
                 'command': '''
-count=$(find . -name "*.md" -o -name "*.txt" | xargs wc -w | tail -1 | awk '{print $1}')
-echo "📝 Session word count: $count total words"
-echo "$(date): $count words" >> .writing-progress.log
+if [ -f scripts/word-count.py ]; then
+    python scripts/word-count.py
+else
+    count=$(find . -name "*.md" -o -name "*.txt" | xargs wc -w | tail -1 | awk '{print $1}')
+    echo "📝 Session word count: $count total words"
+    echo "$(date): $count words" >> .writing-progress.log
+fi
 '''
             })
         
@@ -160,7 +173,14 @@ echo "$(date): $count words" >> .writing-progress.log
                     'tool_name': 'Bash',
                     'args_regex': 'git commit'
                 },
-                'command': 'echo "🔒 Checking for secrets..." && git diff --cached | grep -iE "(password|secret|api_key|token)\\s*=" && echo "⚠️ WARNING: Possible secrets detected!" || echo "✅ No obvious secrets found"'
+                'command': '''
+echo "🔒 Checking for secrets..."
+if [ -f scripts/secret-scan.py ]; then
+    python scripts/secret-scan.py
+else
+    git diff --cached | grep -iE "(password|secret|api_key|token)\\s*=" && echo "⚠️ WARNING: Possible secrets detected!" || echo "✅ No obvious secrets found"
+fi
+'''
             })
         
         # Deadline reminders
@@ -209,19 +229,16 @@ echo "$(date): $count words" >> .writing-progress.log
                 if 'matcher' in hook:
                     f.write("[hooks.matcher]\n")
                     for key, value in hook['matcher'].items():
-                        if isinstance(value, list):
-                            f.write(f'{key} = {json.dumps(value)}\n')
-                        else:
-                            f.write(f'{key} = "{value}"\n')
+                        f.write(f'{key} = {json.dumps(value, ensure_ascii=False)}\n')
                 
-                # Format command nicely
+                # Format command nicely (literal strings keep shell quoting intact)
                 command = hook['command'].strip()
                 if '\n' in command:
-                    f.write('command = """\n')
+                    f.write("command = '''\n")
                     f.write(command)
-                    f.write('\n"""\n')
+                    f.write("\n'''\n")
                 else:
-                    f.write(f'command = "{command}"\n')
+                    f.write(f'command = {json.dumps(command, ensure_ascii=False)}\n')
                 
                 f.write("\n")
         
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Git Activity Store for Multi-Agent Squad
+Ingests new commits incrementally and keeps daily rollups per author and repo for reports,
+plus a local cache of closed issues and merged pull requests
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import datetime
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+ACTIVITY_PATH = Path(".claude/cache/git-activity.db")
+PROJECTS_DIR = Path(os.environ.get("PROJECTS_DIR", "projects"))
+
+# Heads ingested before; the next walk stops at any of them
+MAX_TIPS = 16
+INSERT_BATCH = 500
+# Record and field separators in the git log format
+RS, FS = "\x1e", "\x1f"
+LOG_FORMAT = f"--format={RS}%H{FS}%ct{FS}%aN"
+
+# First GitHub sync looks back this far; later syncs overlap the previous one by a day
+GITHUB_HISTORY_DAYS = 365
+GITHUB_LIMIT = 1000
+
+
+def git(path: Path, *args: str, stdin: Optional[str] = None) -> Optional[str]:
+    result = subprocess.run(["git", "-C", str(path), *args], input=stdin,
+                            capture_output=True, text=True, errors='replace')
+    return result.stdout if result.returncode == 0 else None
+
+
+def discover_repos(root: Path = Path("."), projects_dir: Path = PROJECTS_DIR) -> Dict[str, Path]:
+    """The project's own repository plus every repository under projects/, by name"""
+    repos = {}
+    toplevel = git(root, "rev-parse", "--show-toplevel")
+    if toplevel:
+        repos[Path(toplevel.strip()).name] = Path(toplevel.strip())
+    if projects_dir.is_dir():
+        for entry in sorted(projects_dir.iterdir()):
+            if (entry / ".git").exists():
+                repos[entry.name] = entry.resolve()
+    return repos
+
+
+def day_of(timestamp: int) -> str:
+    return datetime.date.fromtimestamp(timestamp).isoformat()
+
+
+def parse_log(lines: Iterator[str]) -> Iterator[Dict]:
+    """Commits from `git log --numstat` output in LOG_FORMAT"""
+    commit = None
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.startswith(RS):
+            if commit:
+                yield commit
+            sha, committed, author = line[1:].split(FS, 2)
+            commit = {'sha': sha, 'day': day_of(int(committed)), 'author': author, 'files': {}}
+        elif line and commit is not None:
+            added, removed, path = line.split("\t", 2)
+            # Binary files report "-" for both counts
+            previous = commit['files'].get(path, (0, 0))
+            commit['files'][path] = (previous[0] + (int(added) if added != '-' else 0),
+                                     previous[1] + (int(removed) if removed != '-' else 0))
+    if commit:
+        yield commit
+
+
+class ActivityStore:
+    """Commits seen so far plus rollups per (repo, day, author); reports never re-walk history"""
+
+    def __init__(self, path: Path = ACTIVITY_PATH):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS repos (
+                name TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                head TEXT,
+                tips TEXT NOT NULL DEFAULT '[]',
+                ingested REAL
+            );
+            CREATE TABLE IF NOT EXISTS commits (
+                repo TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                day TEXT NOT NULL,
+                author TEXT NOT NULL,
+                PRIMARY KEY (repo, sha)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS daily (
+                repo TEXT NOT NULL,
+                day TEXT NOT NULL,
+                author TEXT NOT NULL,
+                commits INTEGER NOT NULL DEFAULT 0,
+                files INTEGER NOT NULL DEFAULT 0,
+                added INTEGER NOT NULL DEFAULT 0,
+                removed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (repo, day, author)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS daily_day ON daily (day);
+            CREATE TABLE IF NOT EXISTS daily_files (
+                repo TEXT NOT NULL,
+                day TEXT NOT NULL,
+                author TEXT NOT NULL,
+                path TEXT NOT NULL,
+                PRIMARY KEY (day, repo, path, author)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS items (
+                repo TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                author TEXT NOT NULL,
+                day TEXT NOT NULL,
+                url TEXT,
+                PRIMARY KEY (repo, kind, number)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS items_day ON items (kind, day);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+
+    def refresh(self, repos: Optional[Dict[str, Path]] = None) -> int:
+        """Ingest commits added since the last refresh; returns how many were new"""
+        total = 0
+        for name, path in (repos if repos is not None else discover_repos()).items():
+            total += self.ingest(name, path)
+        return total
+
+    def ingest(self, name: str, path: Path) -> int:
+        head = git(path, "rev-parse", "--verify", "-q", "HEAD")
+        if not head:
+            return 0
+        head = head.strip()
+        row = self.db.execute("SELECT head, tips FROM repos WHERE name = ?", (name,)).fetchone()
+        if row and row[0] == head:
+            return 0
+        tips = json.loads(row[1]) if row else []
+        # Tips can disappear after a rebase and gc; walking from a missing one fails
+        if tips:
+            checked = git(path, "cat-file", "--batch-check", stdin="\n".join(tips) + "\n") or ""
+            tips = [fields[0] for fields in map(str.split, checked.splitlines())
+                    if len(fields) == 3 and fields[1] == 'commit']
+
+        process = subprocess.Popen(
+            ["git", "-C", str(path), "log", "--numstat", "--no-renames", LOG_FORMAT, head,
+             *(["--not", *tips] if tips else [])],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors='replace')
+        added = 0
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            batch = []
+            for commit in parse_log(process.stdout):
+                batch.append(commit)
+                if len(batch) >= INSERT_BATCH:
+                    added += self._add(name, batch)
+                    batch = []
+            added += self._add(name, batch)
+            if process.wait() != 0:
+                raise RuntimeError(f"git log failed in {path}")
+            tips = [head] + [tip for tip in tips if tip != head][:MAX_TIPS - 1]
+            self.db.execute(
+                "INSERT OR REPLACE INTO repos (name, path, head, tips, ingested) VALUES (?, ?, ?, ?, ?)",
+                (name, str(path), head, json.dumps(tips), time.time()))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            process.kill()
+            raise
+        return added
+
+    def _add(self, repo: str, commits: List[Dict]) -> int:
+        """Roll up commits not seen before; a branch switch can show the same commit twice"""
+        touched = set()
+        added = 0
+        for commit in commits:
+            cursor = self.db.execute("INSERT OR IGNORE INTO commits (repo, sha, day, author) VALUES (?, ?, ?, ?)",
+                                     (repo, commit['sha'], commit['day'], commit['author']))
+            if not cursor.rowcount:
+                continue
+            added += 1
+            key = (repo, commit['day'], commit['author'])
+            touched.add(key)
+            lines_added = sum(a for a, _ in commit['files'].values())
+            lines_removed = sum(r for _, r in commit['files'].values())
+            self.db.execute(
+                "INSERT INTO daily (repo, day, author, commits, added, removed) VALUES (?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (repo, day, author) DO UPDATE SET commits = commits + 1, "
+                "added = added + excluded.added, removed = removed + excluded.removed",
+                (*key, lines_added, lines_removed))
+            self.db.executemany("INSERT OR IGNORE INTO daily_files (repo, day, author, path) VALUES (?, ?, ?, ?)",
+                                [(*key, path) for path in commit['files']])
+        for repo, day, author in touched:
+            self.db.execute(
+                "UPDATE daily SET files = (SELECT COUNT(*) FROM daily_files "
+                "WHERE day = ? AND repo = ? AND author = ?) WHERE repo = ? AND day = ? AND author = ?",
+                (day, repo, author, repo, day, author))
+        return added
+
+    def summary(self, start: str, end: str, repos: Optional[Iterable[str]] = None) -> Dict:
+        """Totals for days start..end inclusive (ISO dates), with per-author, per-repo and per-day rollups"""
+        where, params = self._range(start, end, repos)
+        rows = self.db.execute(
+            f"SELECT repo, day, author, commits, added, removed FROM daily WHERE {where}", params).fetchall()
+        # Files are counted once per range even when touched on several days or by several authors
+        files = self.db.execute(
+            f"SELECT COUNT(*) FROM (SELECT DISTINCT repo, path FROM daily_files WHERE {where})", params).fetchone()[0]
+        summary = {'start': start, 'end': end, 'commits': 0, 'files_changed': files, 'lines_added': 0,
+                   'lines_removed': 0, 'authors': {}, 'repos': {}, 'days': {}}
+        for repo_name, day, author, commits, added, removed in rows:
+            summary['commits'] += commits
+            summary['lines_added'] += added
+            summary['lines_removed'] += removed
+            for key, bucket in ((author, summary['authors']), (repo_name, summary['repos']),
+                                (day, summary['days'])):
+                entry = bucket.setdefault(key, {'commits': 0, 'lines_added': 0, 'lines_removed': 0})
+                entry['commits'] += commits
+                entry['lines_added'] += added
+                entry['lines_removed'] += removed
+        return summary
+
+    def _range(self, start: str, end: str, repos: Optional[Iterable[str]]) -> Tuple[str, Tuple]:
+        repos = list(repos) if repos is not None else None
+        if repos is None:
+            return "day BETWEEN ? AND ?", (start, end)
+        return (f"day BETWEEN ? AND ? AND repo IN ({', '.join('?' * len(repos))})",
+                (start, end, *repos))
+
+    def record_items(self, repo: str, kind: str, items: List[Dict]) -> None:
+        """Cache closed issues (kind 'issue') or merged pull requests (kind 'pr') for one repo"""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO items (repo, kind, number, title, author, day, url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(repo, kind, item['number'], item['title'], item['author'], item['day'], item.get('url'))
+                 for item in items])
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def items(self, kind: str, start: str, end: str, repos: Optional[Iterable[str]] = None) -> List[Dict]:
+        where, params = self._range(start, end, repos)
+        rows = self.db.execute(
+            f"SELECT repo, number, title, author, day, url FROM items WHERE kind = ? AND {where} "
+            "ORDER BY day, repo, number", (kind, *params)).fetchall()
+        return [{'repo': r[0], 'number': r[1], 'title': r[2], 'author': r[3], 'day': r[4], 'url': r[5]}
+                for r in rows]
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def day(self, date: Optional[datetime.date] = None) -> Dict:
+        date = (date or datetime.date.today()).isoformat()
+        return self.summary(date, date)
+
+    def week(self, end: Optional[datetime.date] = None) -> Dict:
+        """The seven days ending on `end` (default today)"""
+        end = end or datetime.date.today()
+        return self.summary((end - datetime.timedelta(days=6)).isoformat(), end.isoformat())
+
+
+def local_day(timestamp: str) -> str:
+    """ISO date in local time of a GitHub timestamp such as 2025-08-01T10:00:00Z"""
+    return datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00")).astimezone().date().isoformat()
+
+
+def sync_github(store: ActivityStore, repos: Optional[Dict[str, Path]] = None) -> Optional[int]:
+    """Cache issues closed and pull requests merged since the last sync; None when gh is unavailable"""
+    total = 0
+    for name, path in (repos if repos is not None else discover_repos()).items():
+        key = f"github:{name}"
+        last = store.get_meta(key)
+        since = (datetime.date.fromisoformat(last) - datetime.timedelta(days=1) if last else
+                 datetime.date.today() - datetime.timedelta(days=GITHUB_HISTORY_DAYS))
+        for kind, command, field in (('issue', 'issue', 'closed'), ('pr', 'pr', 'merged')):
+            try:
+                result = subprocess.run(
+                    ["gh", command, "list", "--state", field, "--limit", str(GITHUB_LIMIT),
+                     "--search", f"{field}:>={since.isoformat()}",
+                     "--json", f"number,title,author,url,{field}At"],
+                    cwd=path, capture_output=True, text=True)
+            except FileNotFoundError:
+                return None
+            if result.returncode != 0:
+                # Not a GitHub repository, or gh is not authenticated for it
+                break
+            items = [{'number': item['number'], 'title': item['title'],
+                      'author': (item.get('author') or {}).get('login', 'unknown'),
+                      'day': local_day(item[f'{field}At']), 'url': item.get('url')}
+                     for item in json.loads(result.stdout or "[]") if item.get(f'{field}At')]
+            store.record_items(name, kind, items)
+            total += len(items)
+        else:
+            store.set_meta(key, datetime.date.today().isoformat())
+    return total
+
+
+def print_summary(title: str, summary: Dict) -> None:
+    print(f"📈 {title} ({summary['start']} – {summary['end']})")
+    print(f"   {summary['commits']} commits, {summary['files_changed']} files changed, "
+          f"+{summary['lines_added']} −{summary['lines_removed']}")
+    for author, entry in sorted(summary['authors'].items(), key=lambda item: -item[1]['commits']):
+        print(f"   {author}: {entry['commits']} commits, +{entry['lines_added']} −{entry['lines_removed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental git activity store for email reports")
+    parser.add_argument("action", choices=["refresh", "sync-github", "today", "week"])
+    parser.add_argument("--date", type=datetime.date.fromisoformat, help="Report day (default today)")
+    parser.add_argument("--repo", action="append", default=[], metavar="NAME=PATH",
+                        help="Repository to ingest (default: this one and every repo under projects/)")
+    args = parser.parse_args()
+
+    store = ActivityStore()
+    repos = dict((item.split("=", 1)[0], Path(item.split("=", 1)[1])) for item in args.repo) or None
+    start = time.perf_counter()
+    added = store.refresh(repos)
+    elapsed = (time.perf_counter() - start) * 1000
+    if args.action == "refresh":
+        print(f"📥 Ingested {added} new commits in {elapsed:.0f}ms")
+    elif args.action == "sync-github":
+        synced = sync_github(store, repos)
+        if synced is None:
+            print("⚠️  GitHub CLI (gh) not found; issues and pull requests were not synced", file=sys.stderr)
+            sys.exit(1)
+        print(f"📥 Ingested {added} new commits, cached {synced} closed issues and merged PRs")
+    elif args.action == "today":
+        print_summary("Today", store.day(args.date))
+    else:
+        print_summary("Last 7 days", store.week(args.date))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Resource-Limited Hook Runner for Multi-Agent Squad
+Runs hook commands under CPU, memory and nice limits and reports their resource usage
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+from hook_runtime import HookRegistry, HookExecutor, RUN_LOG
+
+
+def run(args) -> int:
+    """Run one command the way the hook runtime would, inheriting stdout/stderr"""
+    registry = HookRegistry()
+    executor = HookExecutor(limits=registry.limits)
+    overrides: Dict = {}
+    name = args.label or 'command'
+    background = args.background
+    if args.hook:
+        hook = next((h for h in registry.hooks if h.id == args.hook), None)
+        if hook is None:
+            print(f"❌ Unknown hook: {args.hook}", file=sys.stderr)
+            return 2
+        overrides.update(hook.limits)
+        background = background or hook.run_in_background
+        name = args.label or hook.id
+    for key, value in (('cpu_seconds', args.cpu), ('memory_mb', args.memory), ('nice', args.nice)):
+        if value is not None:
+            overrides[key] = value
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if not command:
+        print("❌ No command given", file=sys.stderr)
+        return 2
+    limits = executor.limits_for(overrides, background)
+    try:
+        result = executor.run_command(command, None, limits, background=background, capture=False)
+    except FileNotFoundError:
+        print(f"❌ Command not found: {command[0]}", file=sys.stderr)
+        return 127
+    executor.record(name, 'manual', background, result)
+    if result['limit_hit']:
+        print(f"⚠️  {name} stopped by its {result['limit_hit']} limit", file=sys.stderr)
+    return result['returncode'] if result['returncode'] >= 0 else 128 - result['returncode']
+
+
+def load_runs(path: Path) -> List[Dict]:
+    runs = []
+    if not path.exists():
+        return runs
+    with open(path) as f:
+        for line in f:
+            try:
+                runs.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return runs
+
+
+def report(args) -> int:
+    """Summarize recorded runs per hook"""
+    runs = load_runs(Path(args.log))[-args.last:]
+    if not runs:
+        print(f"No hook runs recorded in {args.log}")
+        return 0
+    per_hook: Dict[str, Dict] = {}
+    for entry in runs:
+        stats = per_hook.setdefault(entry['hook'], {
+            'runs': 0, 'failed': 0, 'limited': 0, 'time': 0.0, 'wait': 0.0, 'cpu': 0.0, 'memory': 0.0
+        })
+        stats['runs'] += 1
+        stats['failed'] += entry['returncode'] != 0
+        stats['limited'] += bool(entry.get('limit_hit'))
+        stats['time'] += entry['duration']
+        stats['wait'] += entry.get('wait', 0.0)
+        stats['cpu'] = max(stats['cpu'], entry.get('cpu', 0.0))
+        stats['memory'] = max(stats['memory'], entry.get('memory_peak_mb') or entry.get('max_rss_mb', 0.0))
+
+    print(f"\n📊 Hook resource usage (last {len(runs)} runs)")
+    print(f"  {'hook':<40} {'runs':>5} {'failed':>6} {'limited':>7} {'avg time':>9} "
+          f"{'avg wait':>9} {'max cpu':>8} {'peak mem':>9}")
+    ordered = sorted(per_hook.items(), key=lambda item: item[1]['memory'], reverse=True)
+    for name, stats in ordered:
+        print(f"  {name[:40]:<40} {stats['runs']:>5} {stats['failed']:>6} {stats['limited']:>7} "
+              f"{stats['time'] / stats['runs']:>8.2f}s {stats['wait'] / stats['runs']:>8.2f}s "
+              f"{stats['cpu']:>7.2f}s {stats['memory']:>6.0f} MB")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run hooks under resource limits")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    run_parser = sub.add_parser("run", help="Run a command under the configured limits")
+    run_parser.add_argument("--hook", help="Hook id (file.toml#index) whose [hooks.limits] apply")
+    run_parser.add_argument("--label", help="Name recorded in the run log")
+    run_parser.add_argument("--background", action="store_true",
+                            help="Take a background slot and apply the background nice level")
+    run_parser.add_argument("--cpu", type=int, help="CPU time limit in seconds")
+    run_parser.add_argument("--memory", type=int, help="Address space limit in MB")
+    run_parser.add_argument("--nice", type=int, help="Nice increment")
+    run_parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to run, after --")
+
+    report_parser = sub.add_parser("report", help="Summarize recorded hook runs")
+    report_parser.add_argument("--log", default=str(RUN_LOG), help="Run log path")
+    report_parser.add_argument("--last", type=int, default=1000, help="Only the most recent N runs")
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.action == "run" else report(args))
+
+
+if __name__ == "__main__":
+    main()
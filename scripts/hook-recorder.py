@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Hook Event Recorder for Multi-Agent Squad
+Records the raw hook event stream and replays it through the current hooks
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+from hook_runtime import HookRegistry, HookExecutor
+
+LOG_PATH = Path(".claude/recordings/session.jsonl")
+RECORDER_HOOKS = Path(".claude/hooks/event-recorder.toml")
+MAX_ARGS = 4096
+# Replayed outputs go into CLAUDE_OUTPUT; Linux rejects any environment string over 128 KiB
+MAX_REPLAY_OUTPUT = 64 * 1024
+
+# Set while replaying so recorder hooks do not record the replay itself
+REPLAY_ENV = "CLAUDE_HOOK_REPLAY"
+
+
+def read_event(event_name: str) -> Dict:
+    """Build an event from the hook payload on stdin or the CLAUDE_* environment"""
+    payload = {}
+    if not sys.stdin.isatty():
+        raw = sys.stdin.read()
+        if raw.strip():
+            try:
+                payload = json.loads(raw)
+            except json.JSONDecodeError:
+                payload = {}
+
+    tool_input = payload.get('tool_input') or {}
+    args = tool_input.get('command') or os.environ.get('CLAUDE_TOOL_ARGS', '')
+    file_path = tool_input.get('file_path') or os.environ.get('CLAUDE_FILE_PATH', '')
+    output = payload.get('tool_response') or os.environ.get('CLAUDE_OUTPUT', '')
+    if not isinstance(output, str):
+        output = json.dumps(output)
+
+    return {
+        'event': payload.get('hook_event_name') or event_name,
+        'tool_name': payload.get('tool_name') or os.environ.get('CLAUDE_TOOL_NAME', ''),
+        'args': args,
+        'file_paths': [file_path] if file_path else [],
+        'output_size': len(output.encode()),
+        'content': payload.get('prompt') or os.environ.get('CLAUDE_PROMPT', ''),
+    }
+
+
+def encode_event(event: Dict) -> str:
+    """Compact single-line encoding; empty fields are omitted"""
+    record = {
+        't': round(time.time(), 3),
+        'e': event['event'],
+        'n': event.get('tool_name'),
+        'a': event.get('args', '')[:MAX_ARGS],
+        'f': event.get('file_paths'),
+        'o': event.get('output_size'),
+        'c': event.get('content', '')[:MAX_ARGS],
+    }
+    return json.dumps({k: v for k, v in record.items() if v}, separators=(',', ':'), ensure_ascii=False)
+
+
+def decode_event(line: str) -> Dict:
+    record = json.loads(line)
+    return {
+        'ts': record['t'],
+        'event': record['e'],
+        'tool_name': record.get('n', ''),
+        'args': record.get('a', ''),
+        'file_paths': record.get('f', []),
+        'output_size': record.get('o', 0),
+        'content': record.get('c', ''),
+    }
+
+
+def record(event_name: str, log_path: Path) -> None:
+    """Append the current hook event to the session log"""
+    if os.environ.get(REPLAY_ENV):
+        return
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    line = encode_event(read_event(event_name)) + "\n"
+    # One O_APPEND write per event keeps concurrent hooks from interleaving
+    fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+    finally:
+        os.close(fd)
+
+
+def install(log_path: Path) -> None:
+    """Write a hooks file that records every tool and session event"""
+    RECORDER_HOOKS.parent.mkdir(parents=True, exist_ok=True)
+    content = "# Hook Event Recorder\n# Remove this file to stop recording\n\n"
+    for event in ["PreToolUse", "PostToolUse", "UserPromptSubmit", "Stop"]:
+        content += f"""[[hooks]]
+event = "{event}"
+command = "python scripts/hook-recorder.py record --event {event} --log {log_path}"
+
+"""
+    with open(RECORDER_HOOKS, 'w') as f:
+        f.write(content)
+    print(f"✅ Recorder installed: {RECORDER_HOOKS}")
+    print(f"📄 Events will be written to: {log_path}")
+
+
+def load_session(log_path: Path) -> List[Dict]:
+    events = []
+    with open(log_path) as f:
+        for line in f:
+            if line.strip():
+                events.append(decode_event(line))
+    return events
+
+
+def replay(log_path: Path, realtime: bool, speed: float, dry_run: bool, top: int) -> None:
+    """Push a recorded session through the current hooks and report the cost"""
+    if not log_path.exists():
+        print(f"❌ No recording found at {log_path}")
+        sys.exit(1)
+
+    registry = HookRegistry()
+    for error in registry.errors:
+        print(f"⚠️  Skipping {error}")
+    hooks = [h for h in registry.hooks if h.source != RECORDER_HOOKS.name]
+    executor = HookExecutor(limits=registry.limits)
+    events = load_session(log_path)
+    os.environ[REPLAY_ENV] = "1"
+
+    matcher_time = 0.0
+    blocking_time = 0.0
+    background_time = 0.0
+    per_hook: Dict[str, Dict] = {}
+    failures = 0
+    previous_ts = None
+    wall_start = time.perf_counter()
+
+    for event in events:
+        if realtime and previous_ts is not None:
+            time.sleep(max(0.0, event['ts'] - previous_ts) / speed)
+        previous_ts = event['ts']
+        # Recorded outputs only keep their size, so replay a payload of that size
+        event['output'] = 'x' * min(event['output_size'], MAX_REPLAY_OUTPUT)
+
+        start = time.perf_counter()
+        matched = [hook for hook in hooks if hook.matches(event)]
+        matcher_time += time.perf_counter() - start
+
+        for hook in matched:
+            stats = per_hook.setdefault(hook.id, {
+                'label': hook.describe(), 'runs': 0, 'total': 0.0, 'max': 0.0,
+                'background': hook.run_in_background
+            })
+            stats['runs'] += 1
+            if dry_run:
+                continue
+            result = executor.run(hook, event)
+            stats['total'] += result['duration']
+            stats['max'] = max(stats['max'], result['duration'])
+            if result['returncode'] != 0:
+                failures += 1
+            if hook.run_in_background:
+                background_time += result['duration']
+            else:
+                blocking_time += result['duration']
+
+    wall = time.perf_counter() - wall_start
+    evaluations = len(events) * len(hooks)
+
+    print("\n📊 Hook Replay Report")
+    print("━" * 50)
+    print(f"Events replayed:      {len(events)}")
+    print(f"Hooks configured:     {len(hooks)}")
+    print(f"Hook runs:            {sum(s['runs'] for s in per_hook.values())}")
+    print(f"Failed runs:          {failures}")
+    print(f"Replay wall time:     {wall:.3f}s")
+    print(f"Matcher evaluation:   {matcher_time * 1000:.2f}ms total, "
+          f"{matcher_time / max(evaluations, 1) * 1e6:.2f}µs per hook/event")
+    if not dry_run:
+        print(f"Blocking overhead:    {blocking_time:.3f}s "
+              f"({blocking_time / max(len(events), 1) * 1000:.1f}ms per event)")
+        print(f"Background work:      {background_time:.3f}s")
+        print(f"Total overhead:       {blocking_time + background_time + matcher_time:.3f}s")
+
+        slowest = sorted(per_hook.values(), key=lambda s: s['total'], reverse=True)[:top]
+        if slowest:
+            print(f"\n🐢 Slowest hooks (top {len(slowest)})")
+            for stats in slowest:
+                mode = "bg" if stats['background'] else "fg"
+                print(f"  {stats['total']:8.3f}s  max {stats['max']:.3f}s  "
+                      f"x{stats['runs']:<4} {mode}  {stats['label']}")
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--log", type=Path, default=LOG_PATH, help="Session log path")
+
+    parser = argparse.ArgumentParser(description="Record and replay hook events")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", parents=[common], help="Record the current hook event")
+    rec.add_argument("--event", default="PostToolUse", help="Hook event name")
+
+    sub.add_parser("install", parents=[common], help="Install hooks that record every event")
+
+    rep = sub.add_parser("replay", parents=[common], help="Replay a recording through current hooks")
+    rep.add_argument("--realtime", action="store_true", help="Keep the recorded pacing")
+    rep.add_argument("--speed", type=float, default=1.0, help="Speed factor for --realtime")
+    rep.add_argument("--dry-run", action="store_true", help="Only evaluate matchers")
+    rep.add_argument("--top", type=int, default=5, help="Number of slowest hooks to show")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.event, args.log)
+    elif args.command == "install":
+        install(args.log)
+    else:
+        replay(args.log, args.realtime, args.speed, args.dry_run, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Hook Scheduler for Multi-Agent Squad
+Runs time-based Notification hooks ("09:00", "every 2 hours") from a trigger heap
+"""
+
+import os
+import re
+import sys
+import time
+import heapq
+import ctypes
+import select
+import signal
+import argparse
+import datetime
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from hook_runtime import HookRegistry, HookExecutor, CompiledHook, HOOKS_DIR
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+CLOCK_RE = re.compile(r'^(\d{1,2}):(\d{2})$')
+INTERVAL_RE = re.compile(r'^every\s+(\d+)\s*(minute|min|hour|hr|day)s?$', re.IGNORECASE)
+INTERVAL_UNITS = {'minute': 60, 'min': 60, 'hour': 3600, 'hr': 3600, 'day': 86400}
+
+# Triggers overdue by more than this were missed (suspend, clock change)
+MISSED_GRACE = 60
+# Upper bound on one sleep when no wall-clock timer is available
+FALLBACK_MAX_SLEEP = 60
+
+
+class Trigger:
+    """One schedule parsed from a hook's time/days matcher"""
+
+    def __init__(self, hook: CompiledHook):
+        self.hook = hook
+        self.spec = str(hook.matcher.get('time', '')).strip()
+        self.days = {DAYS.index(d.lower()) for d in hook.matcher.get('days', [])}
+        self.interval: Optional[int] = None
+        self.clock: Optional[Tuple[int, int]] = None
+
+        interval = INTERVAL_RE.match(self.spec)
+        clock = CLOCK_RE.match(self.spec)
+        if interval:
+            self.interval = int(interval.group(1)) * INTERVAL_UNITS[interval.group(2).lower()]
+        elif clock and int(clock.group(1)) < 24 and int(clock.group(2)) < 60:
+            self.clock = (int(clock.group(1)), int(clock.group(2)))
+        else:
+            raise ValueError(f"{hook.id}: unsupported time matcher {self.spec!r}")
+        if self.interval is not None and self.interval <= 0:
+            raise ValueError(f"{hook.id}: interval must be positive")
+
+    def next_after(self, after: float) -> float:
+        """Next due epoch strictly after `after`, evaluated in local time"""
+        if self.interval is not None:
+            return after + self.interval
+        day = datetime.date.fromtimestamp(after)
+        for offset in range(8):
+            candidate = day + datetime.timedelta(days=offset)
+            if self.days and candidate.weekday() not in self.days:
+                continue
+            # Naive local times go through mktime: a time skipped by DST moves
+            # forward to the next valid instant, an ambiguous time fires once (fold=0)
+            due = datetime.datetime.combine(candidate, datetime.time(*self.clock)).timestamp()
+            if due > after:
+                return due
+        raise RuntimeError("unreachable: a weekly schedule always has a next day")
+
+
+class WallClockTimer:
+    """Sleeps until an absolute wall-clock time
+
+    On Linux a CLOCK_REALTIME timerfd fires correctly after a suspend and wakes
+    early when the system clock is changed. Elsewhere sleeps are capped instead.
+    """
+
+    CLOCK_REALTIME = 0
+    TFD_CLOEXEC = 0o2000000
+    TFD_TIMER_ABSTIME = 1
+    TFD_TIMER_CANCEL_ON_SET = 2
+
+    class _Itimerspec(ctypes.Structure):
+        # struct itimerspec: two struct timespec {tv_sec, tv_nsec}
+        _fields_ = [('it_interval', ctypes.c_long * 2), ('it_value', ctypes.c_long * 2)]
+
+    def __init__(self):
+        self.fd = None
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_w, False)
+        if sys.platform.startswith('linux'):
+            try:
+                self.libc = ctypes.CDLL(None, use_errno=True)
+                fd = self.libc.timerfd_create(self.CLOCK_REALTIME, self.TFD_CLOEXEC)
+                if fd >= 0:
+                    self.fd = fd
+            except (OSError, AttributeError):
+                self.fd = None
+
+    def wake(self) -> None:
+        """Interrupt a pending wait (used by signal handlers)"""
+        try:
+            os.write(self.wake_w, b'x')
+        except BlockingIOError:
+            pass
+
+    def wait_until(self, due: float) -> bool:
+        """Return True when the wait ended because the system clock was set"""
+        clock_set = False
+        if self.fd is None:
+            timeout = min(max(0.0, due - time.time()), FALLBACK_MAX_SLEEP)
+            ready, _, _ = select.select([self.wake_r], [], [], timeout)
+        else:
+            spec = self._Itimerspec()
+            spec.it_value[0] = int(due)
+            spec.it_value[1] = int((due - int(due)) * 1e9)
+            flags = self.TFD_TIMER_ABSTIME | self.TFD_TIMER_CANCEL_ON_SET
+            if self.libc.timerfd_settime(self.fd, flags, ctypes.byref(spec), None) != 0:
+                raise OSError(ctypes.get_errno(), "timerfd_settime failed")
+            ready, _, _ = select.select([self.fd, self.wake_r], [], [])
+            if self.fd in ready:
+                try:
+                    os.read(self.fd, 8)
+                except OSError:
+                    # ECANCELED: the clock was set; the caller recomputes due times
+                    clock_set = True
+        if self.wake_r in ready:
+            os.read(self.wake_r, 1024)
+        return clock_set
+
+
+class HookScheduler:
+    """Keeps every scheduled hook in a heap ordered by next due time"""
+
+    def __init__(self, hooks_dir: Path = HOOKS_DIR, catch_up: str = "once"):
+        self.hooks_dir = hooks_dir
+        self.catch_up = catch_up
+        self.timer = WallClockTimer()
+        self.heap: List[Tuple[float, int, Trigger]] = []
+        self.reload_requested = False
+        self.running = True
+        self.load()
+
+    def load(self) -> None:
+        registry = HookRegistry(self.hooks_dir)
+        for error in registry.errors:
+            print(f"⚠️  Skipping {error}")
+        self.executor = HookExecutor(limits=registry.limits)
+        now = time.time()
+        self.heap = []
+        for seq, hook in enumerate(registry.scheduled()):
+            try:
+                trigger = Trigger(hook)
+            except ValueError as e:
+                print(f"⚠️  {e}")
+                continue
+            heapq.heappush(self.heap, (trigger.next_after(now), seq, trigger))
+        print(f"🗓️  Scheduled {len(self.heap)} time-based hooks")
+
+    def reschedule(self) -> None:
+        """After the clock was set, recompute due times that now lie too far ahead (clock set
+        back). Times already passed (clock set forward) are kept so run_due catches them up"""
+        now = time.time()
+        self.heap = [(min(due, trigger.next_after(now)), seq, trigger) for due, seq, trigger in self.heap]
+        heapq.heapify(self.heap)
+
+    def upcoming(self) -> List[Tuple[float, Trigger]]:
+        return [(due, trigger) for due, _, trigger in sorted(self.heap)]
+
+    def fire(self, trigger: Trigger, missed: int) -> None:
+        hook = trigger.hook
+        label = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+        note = f" (caught up {missed} missed)" if missed else ""
+        print(f"⏰ {label} {hook.describe()}{note}")
+        event = {'event': hook.event, 'hook_id': hook.id, 'time': trigger.spec}
+
+        def run():
+            result = self.executor.run(hook, event)
+            if result['output'].strip():
+                print(result['output'].rstrip())
+            if result['returncode'] != 0:
+                print(f"❌ {hook.id} exited with {result['returncode']}")
+
+        threading.Thread(target=run).start()
+
+    def run_due(self) -> None:
+        """Fire every trigger that is due and reschedule it from the current time"""
+        now = time.time()
+        while self.heap and self.heap[0][0] <= now:
+            due, seq, trigger = heapq.heappop(self.heap)
+            missed = 0
+            if now - due > MISSED_GRACE:
+                # Count the occurrences that slipped by while we were not running
+                probe = due
+                while probe <= now:
+                    missed += 1
+                    probe = trigger.next_after(probe)
+                missed -= 1
+            if now - due <= MISSED_GRACE or self.catch_up == "once":
+                self.fire(trigger, missed)
+            else:
+                print(f"⏭️  Skipped {missed + 1} missed run(s) of {trigger.hook.id}")
+            heapq.heappush(self.heap, (trigger.next_after(now), seq, trigger))
+
+    def run_forever(self) -> None:
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        while self.running:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.load()
+            if not self.heap:
+                signal.pause()
+                continue
+            if self.timer.wait_until(self.heap[0][0]):
+                self.reschedule()
+            self.run_due()
+
+    def _request_reload(self, signum, frame) -> None:
+        self.reload_requested = True
+        self.timer.wake()
+
+    def _stop(self, signum, frame) -> None:
+        self.running = False
+        self.timer.wake()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run time-based Notification hooks")
+    parser.add_argument("--list", action="store_true", help="Show upcoming triggers and exit")
+    parser.add_argument("--catch-up", choices=["once", "skip"], default="once",
+                        help="Run missed triggers once after a suspend, or skip them")
+    args = parser.parse_args()
+
+    scheduler = HookScheduler(catch_up=args.catch_up)
+    if args.list:
+        for due, trigger in scheduler.upcoming():
+            when = datetime.datetime.fromtimestamp(due).strftime('%a %Y-%m-%d %H:%M')
+            print(f"  {when}  {trigger.spec:<16} {trigger.hook.describe()}")
+        return
+
+    print("Reload hooks with: kill -HUP", os.getpid())
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Filesystem Watch Trigger for Multi-Agent Squad
+Fires Write hooks for file changes made outside the agent (editors, git checkout)
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import ctypes
+import select
+import signal
+import struct
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from hook_runtime import HookRegistry, HookExecutor
+
+SKIP_DIRS = {'.git', 'node_modules', '.venv', 'venv', '__pycache__', '.claude', 'dist', 'build',
+             '.mypy_cache', '.pytest_cache', '.tox'}
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifySource:
+    """Recursive inotify watches on Linux, read through ctypes"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+        self.add_tree(str(root))
+
+    def add_tree(self, top: str) -> None:
+        for dirpath, dirnames, _ in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                if errno == 28:  # ENOSPC: fs.inotify.max_user_watches reached
+                    print("⚠️  Out of inotify watches; raise fs.inotify.max_user_watches")
+                    return
+                continue
+            self.watches[wd] = dirpath
+
+    def read(self, timeout: Optional[float]) -> List[str]:
+        """Block up to `timeout` seconds and return changed file paths"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                print("⚠️  inotify queue overflowed; some changes were coalesced away")
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in SKIP_DIRS:
+                    self.add_tree(path)
+                continue
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                paths.append(path)
+        return paths
+
+
+class PollingSource:
+    """Fallback for platforms without inotify: compares mtimes every interval"""
+
+    def __init__(self, root: Path, interval: float = 1.0):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, int]:
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    snapshot[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    pass
+        return snapshot
+
+    def read(self, timeout: Optional[float]) -> List[str]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._scan()
+        changed = [p for p, mtime in current.items() if self.snapshot.get(p) != mtime]
+        self.snapshot = current
+        return changed
+
+
+class HookWatcher:
+    """Coalesces file change bursts and dispatches them as Write hook events"""
+
+    def __init__(self, root: Path, quiet: float, max_delay: float, batch_threshold: int,
+                 cooldown: float = 1.0):
+        self.root = root.resolve()
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.batch_threshold = batch_threshold
+        self.cooldown = cooldown
+        self.registry = HookRegistry()
+        self.executor = HookExecutor(limits=self.registry.limits)
+        self.hooks = [h for h in self.registry.hooks
+                      if h.event == 'PostToolUse' and h.tool_name == 'Write' and not h.is_scheduled]
+        self.pending: Dict[str, float] = {}
+        self.first_change: Optional[float] = None
+        # Paths written by our own hooks (formatters) are ignored until this time
+        self.suppressed: Dict[str, float] = {}
+        self.suppressed_lock = threading.Lock()
+        self.busy = threading.Lock()
+        self.running = True
+        try:
+            self.source = InotifySource(self.root)
+            self.kind = f"inotify ({len(self.source.watches)} directories)"
+        except (OSError, AttributeError):
+            self.source = PollingSource(self.root)
+            self.kind = "polling"
+
+    def _relevant(self, rel: str) -> bool:
+        for hook in self.hooks:
+            if not hook.file_globs or hook._path_matches(rel):
+                return True
+        return False
+
+    def _collect(self, paths: List[str]) -> None:
+        now = time.monotonic()
+        for path in paths:
+            rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+            with self.suppressed_lock:
+                suppressed = self.suppressed.get(rel, 0) > now
+            if suppressed or not self._relevant(rel):
+                continue
+            if self.first_change is None:
+                self.first_change = now
+            self.pending[rel] = now
+
+    def _flush_due(self) -> bool:
+        if not self.pending:
+            return False
+        now = time.monotonic()
+        last_change = max(self.pending.values())
+        return now - last_change >= self.quiet or now - self.first_change >= self.max_delay
+
+    def _events(self, paths: List[str]) -> List[Dict]:
+        base = {'event': 'PostToolUse', 'tool_name': 'Write', 'source': 'fswatch'}
+        if len(paths) > self.batch_threshold:
+            return [{**base, 'file_paths': paths, 'batch': True}]
+        return [{**base, 'file_paths': [p]} for p in paths]
+
+    def _dispatch(self, paths: List[str]) -> None:
+        with self.busy:
+            events = self._events(paths)
+            label = f"{len(paths)} files (batched)" if len(events) == 1 and len(paths) > 1 else f"{len(paths)} file(s)"
+            print(f"👀 {time.strftime('%H:%M:%S')} change in {label}")
+            # Rewrites the hooks make while they run (formatters) must not queue this batch again
+            with self.suppressed_lock:
+                for path in paths:
+                    self.suppressed[path] = float('inf')
+            try:
+                for event in events:
+                    for hook in self.registry.matching(event):
+                        result = self.executor.run(hook, event)
+                        if result['output'].strip():
+                            print(result['output'].rstrip())
+                        if result['returncode'] != 0:
+                            print(f"❌ {hook.id} exited with {result['returncode']}")
+            finally:
+                until = time.monotonic() + self.cooldown
+                with self.suppressed_lock:
+                    for path in paths:
+                        self.suppressed[path] = until
+
+    def run(self) -> None:
+        if not self.hooks:
+            print("No PostToolUse Write hooks configured; nothing to watch for.")
+            return
+        print(f"👀 Watching {self.root} via {self.kind} for {len(self.hooks)} Write hooks")
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, 'running', False))
+        while self.running:
+            timeout = self.quiet if self.pending else None
+            try:
+                self._collect(self.source.read(timeout))
+            except KeyboardInterrupt:
+                break
+            if self._flush_due():
+                paths = sorted(self.pending)
+                self.pending = {}
+                self.first_change = None
+                # Hooks run off the read loop so inotify events keep draining
+                threading.Thread(target=self._dispatch, args=(paths,)).start()
+            now = time.monotonic()
+            with self.suppressed_lock:
+                self.suppressed = {p: t for p, t in self.suppressed.items() if t > now}
+
+
+def check_batch(count: int) -> bool:
+    """Regression check: a batch of `count` files reaches a hook intact, however long its path list"""
+    scripts = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix="hook-watcher-check-") as root:
+        os.chdir(root)
+        Path(".claude/hooks").mkdir(parents=True)
+        probe = (f"import sys; sys.path.insert(0, {scripts!r}); "
+                 f"from hook_runtime import event_file_paths; print(len(event_file_paths()))")
+        Path(".claude/hooks/check.toml").write_text(
+            f'[[hooks]]\nevent = "PostToolUse"\ncommand = {json.dumps(f"{sys.executable} -c {shlex.quote(probe)}")}\n'
+            f'[hooks.matcher]\ntool_name = "Write"\nfile_paths = ["src/**/*"]\n')
+        paths = [f"src/module_{i:05d}/generated_source_file_{i:05d}.py" for i in range(count)]
+        watcher = HookWatcher(Path("."), 0.3, 2.0, 20)
+        events = watcher._events(paths)
+        hooks = watcher.registry.matching(events[0])
+        if len(events) != 1 or len(hooks) != 1:
+            print(f"❌ Expected one batched event for one hook, got {len(events)} events, {len(hooks)} hooks")
+            return False
+        result = watcher.executor.run(hooks[0], events[0])
+        received = result['output'].strip()
+        leftover = list(Path(".claude/cache/file-lists").glob("*"))
+        ok = result['returncode'] == 0 and received == str(count) and not leftover
+        print(f"{'✅' if ok else '❌'} {count} paths in one batch: hook exited {result['returncode']}, "
+              f"received {received or 'nothing'}, {len(leftover)} path list file(s) left behind")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire Write hooks for filesystem changes")
+    parser.add_argument("--root", default=".", help="Directory to watch")
+    parser.add_argument("--quiet", type=float, default=0.3,
+                        help="Seconds without changes before a burst is dispatched")
+    parser.add_argument("--max-delay", type=float, default=2.0,
+                        help="Longest a change waits while a burst is still going")
+    parser.add_argument("--batch-threshold", type=int, default=20,
+                        help="Bursts larger than this become one batched event")
+    parser.add_argument("--check", type=int, nargs="?", const=5000, metavar="FILES",
+                        help="Check that a batch of this many files (default 5000) reaches a hook, then exit")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check_batch(args.check) else 1)
+    if not Path(args.root).is_dir():
+        print(f"Directory not found: {args.root}", file=sys.stderr)
+        sys.exit(1)
+    # Hooks, their scripts and the runtime's cache paths are all relative to the project root
+    os.chdir(args.root)
+    HookWatcher(Path("."), args.quiet, args.max_delay, args.batch_threshold).run()
+
+
+if __name__ == "__main__":
+    main()
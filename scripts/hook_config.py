@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Hook Config Snapshot for Multi-Agent Squad
+Compiles .claude/hooks and .claude/integrations into one validated, pre-parsed snapshot
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tomllib
+except ModuleNotFoundError:
+    # Python < 3.11: the same parser is on PyPI as `tomli`
+    import tomli as tomllib
+
+from hook_runtime import HOOKS_DIR, DEFAULT_LIMITS, normalize_hook
+
+INTEGRATIONS_DIR = Path(".claude/integrations")
+SNAPSHOT_PATH = Path(".claude/cache/config-snapshot.pickle")
+SNAPSHOT_VERSION = 1
+
+HOOK_EVENTS = {'PreToolUse', 'PostToolUse', 'Notification', 'Stop', 'SubagentStop',
+               'UserPromptSubmit', 'SessionStart', 'PreCompact'}
+HOOK_KEYS = {'event', 'command', 'run_in_background', 'matcher', 'limits'}
+MATCHER_KEYS = {'tool_name', 'args_regex', 'file_paths', 'content_regex', 'time', 'days'}
+WEEKDAYS = {'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'}
+EMAIL_SERVICES = {'gmail', 'sendgrid', 'aws_ses', 'smtp'}
+
+# Required keys and their types per integration file
+INTEGRATION_SCHEMAS = {
+    'slack': {'enabled_notifications': list, 'preferences': dict},
+    'email': {'service': str, 'recipients': list, 'enabled_notifications': list, 'preferences': dict},
+}
+
+
+def validate_hook(hook: Dict) -> List[str]:
+    """Return schema problems for one normalized hook"""
+    problems = []
+    for key in sorted(set(hook) - HOOK_KEYS):
+        problems.append(f"unknown key '{key}'")
+    if hook.get('event') not in HOOK_EVENTS:
+        problems.append(f"unknown event {hook.get('event')!r}")
+    command = hook.get('command')
+    if not isinstance(command, str) or not command.strip():
+        problems.append("missing command")
+    if not isinstance(hook.get('run_in_background', False), bool):
+        problems.append("run_in_background must be true or false")
+
+    matcher = hook.get('matcher', {})
+    for key in sorted(set(matcher) - MATCHER_KEYS):
+        problems.append(f"unknown matcher key '{key}'")
+    for key in ('args_regex', 'content_regex'):
+        if key in matcher:
+            try:
+                re.compile(matcher[key])
+            except (re.error, TypeError) as e:
+                problems.append(f"invalid {key}: {e}")
+    paths = matcher.get('file_paths', [])
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        problems.append("file_paths must be a list of globs")
+    if 'time' in matcher and not isinstance(matcher['time'], str):
+        problems.append("time must be a string")
+    days = matcher.get('days', [])
+    if not isinstance(days, list) or any(str(d).lower() not in WEEKDAYS for d in days):
+        problems.append(f"days must be weekday names, got {days!r}")
+
+    for key in sorted(set(hook.get('limits', {})) - set(DEFAULT_LIMITS)):
+        problems.append(f"unknown limit '{key}'")
+    return problems
+
+
+def validate_integration(name: str, config) -> List[str]:
+    if not isinstance(config, dict):
+        return ["top level must be an object"]
+    problems = []
+    for key, expected in INTEGRATION_SCHEMAS.get(name, {}).items():
+        if key not in config:
+            problems.append(f"missing '{key}'")
+        elif not isinstance(config[key], expected):
+            problems.append(f"'{key}' must be a {expected.__name__}")
+    if name == 'email' and config.get('service') not in EMAIL_SERVICES | {None}:
+        problems.append(f"unknown service {config.get('service')!r}")
+    return problems
+
+
+def _sources(hooks_dir: Path, integrations_dir: Path) -> List[Path]:
+    files = []
+    for directory, suffix in ((hooks_dir, '.toml'), (integrations_dir, '.json')):
+        try:
+            with os.scandir(directory) as entries:
+                files.extend(Path(e.path) for e in entries if e.name.endswith(suffix) and e.is_file())
+        except OSError:
+            continue
+    return sorted(files)
+
+
+def stamp(hooks_dir: Path, integrations_dir: Path) -> Tuple:
+    """Cheap fingerprint: directory mtimes plus (path, mtime, size) of every source file"""
+    parts = []
+    for directory in (hooks_dir, integrations_dir):
+        try:
+            parts.append((str(directory.resolve()), os.stat(directory).st_mtime_ns))
+        except OSError:
+            parts.append((str(directory), None))
+    for path in _sources(hooks_dir, integrations_dir):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        parts.append((path.name, st.st_mtime_ns, st.st_size))
+    return tuple(parts)
+
+
+def _hashes(files: List[Path]) -> Dict[str, str]:
+    hashes = {}
+    for path in files:
+        try:
+            hashes[str(path)] = hashlib.sha1(path.read_bytes()).hexdigest()
+        except OSError:
+            continue
+    return hashes
+
+
+def compile_snapshot(hooks_dir: Path = HOOKS_DIR, integrations_dir: Path = INTEGRATIONS_DIR) -> Dict:
+    """Parse and validate every config file"""
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'stamp': stamp(hooks_dir, integrations_dir),
+        'hooks': [],
+        'limits': dict(DEFAULT_LIMITS),
+        'integrations': {},
+        'hook_errors': [],
+        'integration_errors': [],
+    }
+    files = _sources(hooks_dir, integrations_dir)
+    snapshot['hashes'] = _hashes(files)
+
+    for path in files:
+        if path.suffix == '.toml':
+            try:
+                with open(path, 'rb') as f:
+                    data = tomllib.load(f)
+            except (OSError, tomllib.TOMLDecodeError) as e:
+                snapshot['hook_errors'].append(f"{path.name}: {e}")
+                continue
+            # A top-level [limits] table sets defaults for every hook
+            for key, value in data.get('limits', {}).items():
+                if key in DEFAULT_LIMITS:
+                    snapshot['limits'][key] = value
+                else:
+                    snapshot['hook_errors'].append(f"{path.name}: unknown limit '{key}'")
+            for index, hook in enumerate(data.get('hooks', [])):
+                hook = normalize_hook(hook)
+                problems = validate_hook(hook)
+                if problems:
+                    snapshot['hook_errors'].append(f"{path.name}#{index}: {'; '.join(problems)}")
+                    continue
+                snapshot['hooks'].append((path.name, index, hook))
+        else:
+            try:
+                with open(path) as f:
+                    config = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                snapshot['integration_errors'].append(f"{path.name}: {e}")
+                continue
+            problems = validate_integration(path.stem, config)
+            if problems:
+                snapshot['integration_errors'].append(f"{path.name}: {'; '.join(problems)}")
+                continue
+            snapshot['integrations'][path.stem] = config
+    return snapshot
+
+
+def _write(snapshot: Dict, snapshot_path: Path) -> None:
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except OSError:
+        pass
+
+
+def load_snapshot(hooks_dir: Path = HOOKS_DIR, integrations_dir: Path = INTEGRATIONS_DIR,
+                  snapshot_path: Path = SNAPSHOT_PATH) -> Dict:
+    """Return the cached snapshot, recompiling only when the config actually changed"""
+    current = stamp(hooks_dir, integrations_dir)
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        snapshot = None
+
+    if snapshot and snapshot.get('version') == SNAPSHOT_VERSION:
+        if snapshot['stamp'] == current:
+            return snapshot
+        # Touched but unchanged files (checkouts, editors saving) only refresh the stamp
+        files = _sources(hooks_dir, integrations_dir)
+        if _hashes(files) == snapshot.get('hashes'):
+            snapshot['stamp'] = current
+            _write(snapshot, snapshot_path)
+            return snapshot
+
+    snapshot = compile_snapshot(hooks_dir, integrations_dir)
+    _write(snapshot, snapshot_path)
+    return snapshot
+
+
+def load_integration(name: str) -> Optional[Dict]:
+    """Validated config for one integration (e.g. 'slack'), or None if missing or invalid"""
+    config = load_snapshot()['integrations'].get(name)
+    return dict(config) if config is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile and check the hook/integration config snapshot")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any config has schema errors")
+    parser.add_argument("--force", action="store_true", help="Recompile even if nothing changed")
+    args = parser.parse_args()
+
+    if args.force:
+        _write(compile_snapshot(), SNAPSHOT_PATH)
+    start = time.perf_counter()
+    snapshot = load_snapshot()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"📦 Config snapshot: {len(snapshot['hooks'])} hooks, "
+          f"{len(snapshot['integrations'])} integrations (loaded in {elapsed:.3f}ms)")
+    errors = snapshot['hook_errors'] + snapshot['integration_errors']
+    for error in errors:
+        print(f"⚠️  {error}", file=sys.stderr)
+    if args.check and errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Hook Runtime for Multi-Agent Squad
+Loads hooks from .claude/hooks, evaluates matchers and runs hook commands
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import signal
+import resource
+import tempfile
+import threading
+import contextlib
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+HOOKS_DIR = Path(".claude/hooks")
+RUN_LOG = Path(".claude/cache/hook-runs.jsonl")
+SLOT_DIR = Path(".claude/cache/hook-slots")
+# Set in a background hook's environment so commands it runs through the executor (e.g.
+# `hook-limits.py run --background`) neither wait for a second slot nor renice again
+SLOT_HELD_ENV = "HOOK_SLOT_HELD"
+# Batches whose path list would exceed this many bytes are passed in a file named by
+# CLAUDE_FILE_LIST: Linux rejects any single environment string over 128 KiB
+FILE_LIST_DIR = Path(".claude/cache/file-lists")
+MAX_ENV_PATHS = 32 * 1024
+
+# Defaults for the [limits] table; None means unlimited. `nice` only applies to
+# background hooks unless a hook sets it in its own [hooks.limits] table.
+DEFAULT_LIMITS = {
+    'cpu_seconds': None,
+    'memory_mb': None,
+    'nice': 10,
+    'max_background': 2,
+    'cgroup': None,
+}
+
+# Matcher keys that describe a schedule rather than a tool event
+TIME_KEYS = ('time', 'days')
+
+
+def exit_code(status: int) -> int:
+    """Decode a wait status like subprocess does: the exit code, or -signal if killed
+    (os.waitstatus_to_exitcode needs Python 3.9)"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def event_file_paths() -> List[str]:
+    """Files a hook was run for: read from CLAUDE_FILE_LIST for large batches,
+    otherwise from CLAUDE_FILE_PATHS"""
+    file_list = os.environ.get('CLAUDE_FILE_LIST')
+    if file_list:
+        try:
+            with open(file_list) as f:
+                return f.read().splitlines()
+        except OSError:
+            return []
+    return os.environ.get('CLAUDE_FILE_PATHS', '').splitlines()
+
+
+def glob_to_regex(pattern: str) -> "re.Pattern":
+    """Translate a hook file glob (supports **) into a compiled regex"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+            continue
+        if char == '*':
+            regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        else:
+            regex += re.escape(char)
+        i += 1
+    return re.compile(regex + r'\Z')
+
+
+class CompiledHook:
+    """A hook with its matcher pre-compiled for fast evaluation"""
+
+    def __init__(self, hook: Dict, source: str, index: int):
+        self.event = hook.get('event', '')
+        self.command = hook.get('command', '').strip()
+        self.run_in_background = bool(hook.get('run_in_background', False))
+        self.matcher = dict(hook.get('matcher', {}))
+        self.limits = dict(hook.get('limits', {}))
+        self.source = source
+        self.index = index
+        self.id = f"{source}#{index}"
+
+        self.tool_name = self.matcher.get('tool_name')
+        self.args_regex = self._compile(self.matcher.get('args_regex'))
+        self.content_regex = self._compile(self.matcher.get('content_regex'), re.IGNORECASE)
+        self.file_globs = [
+            (glob_to_regex(p), '/' not in p)
+            for p in self.matcher.get('file_paths', [])
+        ]
+        self.is_scheduled = any(key in self.matcher for key in TIME_KEYS)
+
+    @staticmethod
+    def _compile(pattern: Optional[str], flags: int = 0):
+        return re.compile(pattern, flags) if pattern else None
+
+    def describe(self) -> str:
+        """Short human readable label for reports"""
+        first_line = self.command.splitlines()[0] if self.command else ''
+        return f"{self.id} [{self.event}] {first_line[:60]}"
+
+    def matches(self, event: Dict) -> bool:
+        """Check whether a tool/session event triggers this hook"""
+        if event.get('event') != self.event:
+            return False
+        if self.is_scheduled:
+            # Time based hooks only fire from the scheduler
+            return event.get('hook_id') == self.id
+        if self.tool_name and event.get('tool_name') != self.tool_name:
+            return False
+        if self.args_regex and not self.args_regex.search(event.get('args', '')):
+            return False
+        if self.content_regex and not self.content_regex.search(event.get('content', '')):
+            return False
+        if self.file_globs:
+            paths = event.get('file_paths', [])
+            if not any(self._path_matches(path) for path in paths):
+                return False
+        return True
+
+    def _path_matches(self, path: str) -> bool:
+        path = path[2:] if path.startswith('./') else path
+        basename = path.rsplit('/', 1)[-1]
+        for regex, basename_only in self.file_globs:
+            if regex.match(basename if basename_only else path):
+                return True
+        return False
+
+
+class HookRegistry:
+    """All hooks configured for the project"""
+
+    def __init__(self, hooks_dir: Path = HOOKS_DIR):
+        self.hooks_dir = Path(hooks_dir)
+        self.hooks: List[CompiledHook] = []
+        self.errors: List[str] = []
+        self.limits: Dict = dict(DEFAULT_LIMITS)
+        self.load()
+
+    def load(self) -> None:
+        """Load hooks from the config snapshot, which re-parses TOML only after edits"""
+        # Imported here because hook_config builds on this module
+        from hook_config import load_snapshot
+        snapshot = load_snapshot(self.hooks_dir)
+        self.hooks = [CompiledHook(hook, source, index) for source, index, hook in snapshot['hooks']]
+        self.errors = list(snapshot['hook_errors'])
+        self.limits = dict(snapshot['limits'])
+
+    def matching(self, event: Dict) -> List[CompiledHook]:
+        """Return hooks triggered by an event, in configuration order"""
+        return [hook for hook in self.hooks if hook.matches(event)]
+
+    def scheduled(self) -> List[CompiledHook]:
+        """Return hooks driven by time matchers"""
+        return [hook for hook in self.hooks if hook.is_scheduled]
+
+
+def normalize_hook(hook: Dict) -> Dict:
+    """Fix up hooks whose keys were written after the [hooks.matcher] header"""
+    hook = dict(hook)
+    matcher = dict(hook.get('matcher', {}))
+    for key in ('command', 'run_in_background'):
+        if key in matcher and key not in hook:
+            hook[key] = matcher.pop(key)
+    hook['matcher'] = matcher
+    return hook
+
+
+class BackgroundSlots:
+    """Cross-process cap on concurrent background hooks: one flock per slot"""
+
+    def __init__(self, count: int, slot_dir: Path = SLOT_DIR):
+        self.count = max(1, int(count))
+        self.slot_dir = slot_dir
+
+    @contextlib.contextmanager
+    def hold(self, poll: float = 0.1):
+        self.slot_dir.mkdir(parents=True, exist_ok=True)
+        while True:
+            for i in range(self.count):
+                fd = os.open(self.slot_dir / f"slot-{i}", os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                try:
+                    yield i
+                finally:
+                    os.close(fd)
+                return
+            time.sleep(poll)
+
+
+class Cgroup:
+    """Per-run child of a delegated cgroup v2 directory (e.g. from systemd-run --user --scope)"""
+
+    def __init__(self, parent: str, name: str):
+        self.path = Path(parent) / name
+        self.path.mkdir()
+
+    @staticmethod
+    def usable(parent: Optional[str]) -> bool:
+        return bool(parent) and os.access(Path(parent) / "cgroup.procs", os.W_OK)
+
+    def set_memory(self, memory_mb: Optional[int]) -> None:
+        if memory_mb:
+            (self.path / "memory.max").write_text(str(int(memory_mb) * 1024 * 1024))
+
+    def read(self, name: str) -> str:
+        try:
+            return (self.path / name).read_text()
+        except OSError:
+            return ''
+
+    def peak_mb(self) -> Optional[float]:
+        value = self.read("memory.peak").strip()
+        return int(value) / (1024 * 1024) if value.isdigit() else None
+
+    def oom_killed(self) -> bool:
+        for line in self.read("memory.events").splitlines():
+            key, _, count = line.partition(' ')
+            if key == 'oom_kill' and count.strip() != '0':
+                return True
+        return False
+
+    def remove(self) -> None:
+        for _ in range(20):
+            try:
+                self.path.rmdir()
+                return
+            except OSError:
+                time.sleep(0.05)
+
+
+class HookExecutor:
+    """Runs hook commands with the CLAUDE_* environment populated and resource limits applied"""
+
+    def __init__(self, shell: str = "bash", timeout: Optional[float] = None,
+                 limits: Optional[Dict] = None, log_path: Optional[Path] = RUN_LOG):
+        self.shell = shell
+        self.timeout = timeout
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.slots = BackgroundSlots(self.limits['max_background'])
+        self.log_path = log_path
+
+    def build_env(self, event: Dict) -> Dict[str, str]:
+        env = dict(os.environ)
+        paths = event.get('file_paths', [])
+        joined = '\n'.join(paths)
+        file_list = ''
+        if len(joined) > MAX_ENV_PATHS:
+            FILE_LIST_DIR.mkdir(parents=True, exist_ok=True)
+            fd, file_list = tempfile.mkstemp(prefix="paths-", suffix=".txt", dir=FILE_LIST_DIR)
+            with os.fdopen(fd, 'w') as f:
+                f.write(joined + '\n')
+            joined = ''
+        env.update({
+            'CLAUDE_EVENT': event.get('event', ''),
+            'CLAUDE_TOOL_NAME': event.get('tool_name', ''),
+            'CLAUDE_TOOL_ARGS': event.get('args', ''),
+            'CLAUDE_FILE_PATH': paths[0] if paths else '',
+            'CLAUDE_FILE_PATHS': joined,
+            'CLAUDE_FILE_LIST': file_list,
+            'CLAUDE_OUTPUT': event.get('output', ''),
+            'CLAUDE_PROMPT': event.get('content', ''),
+            'CLAUDE_EVENT_SOURCE': event.get('source', 'tool'),
+        })
+        return env
+
+    def limits_for(self, overrides: Dict, background: bool) -> Dict:
+        limits = {**self.limits, **overrides}
+        if not background and 'nice' not in overrides:
+            limits['nice'] = 0
+        return limits
+
+    def run(self, hook: CompiledHook, event: Dict, capture: bool = True) -> Dict:
+        """Run one hook and report its exit status, duration and resource usage"""
+        limits = self.limits_for(hook.limits, hook.run_in_background)
+        env = self.build_env(event)
+        try:
+            result = self.run_command([self.shell, "-c", hook.command], env,
+                                      limits, background=hook.run_in_background, capture=capture)
+        except OSError as e:
+            # E.g. E2BIG from an oversized CLAUDE_* value: a failed run, not a crashed runner
+            result = {'returncode': 126, 'duration': 0.0, 'limit_hit': None,
+                      'output': f"Hook could not start: {e}"}
+        finally:
+            if env['CLAUDE_FILE_LIST']:
+                Path(env['CLAUDE_FILE_LIST']).unlink(missing_ok=True)
+        result['hook'] = hook.id
+        self.record(hook.id, event.get('event', ''), hook.run_in_background, result)
+        return result
+
+    def run_command(self, argv: List[str], env: Optional[Dict[str, str]], limits: Dict,
+                    background: bool = False, capture: bool = True) -> Dict:
+        """Run a command under rlimits (and a cgroup when configured), measuring it with wait4"""
+        queued = time.perf_counter()
+        # Nested inside a background hook: its slot and nice level already cover this run
+        if background and os.environ.get(SLOT_HELD_ENV) == "1":
+            background = False
+            limits = {**limits, 'nice': 0}
+        elif background:
+            env = {**(os.environ if env is None else env), SLOT_HELD_ENV: "1"}
+        slot = self.slots.hold() if background else contextlib.nullcontext()
+        with slot:
+            start = time.perf_counter()
+            cgroup = None
+            if Cgroup.usable(limits.get('cgroup')):
+                try:
+                    cgroup = Cgroup(limits['cgroup'], f"hook-{os.getpid()}-{threading.get_ident()}")
+                    cgroup.set_memory(limits.get('memory_mb'))
+                except OSError:
+                    cgroup = None
+
+            try:
+                proc = subprocess.Popen(
+                    argv, env=env, text=True, errors='replace',
+                    stdout=subprocess.PIPE if capture else None,
+                    stderr=subprocess.STDOUT if capture else None,
+                    preexec_fn=self._preexec(limits, cgroup, new_group=bool(self.timeout))
+                )
+            except OSError:
+                if cgroup:
+                    cgroup.remove()
+                raise
+            chunks: List[str] = []
+            reader = None
+            if capture:
+                reader = threading.Thread(target=lambda: chunks.append(proc.stdout.read()), daemon=True)
+                reader.start()
+            timed_out = threading.Event()
+            timer = None
+            if self.timeout:
+                def expire():
+                    timed_out.set()
+                    with contextlib.suppress(ProcessLookupError):
+                        os.killpg(proc.pid, signal.SIGKILL)
+                timer = threading.Timer(self.timeout, expire)
+                timer.start()
+
+            # wait4 reaps the hook and returns the rusage of it and its descendants
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = exit_code(status)
+            if timer:
+                timer.cancel()
+            if reader:
+                reader.join()
+                proc.stdout.close()
+            duration = time.perf_counter() - start
+
+            rss_unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+            result = {
+                'returncode': proc.returncode,
+                'duration': duration,
+                'wait': start - queued,
+                'cpu': usage.ru_utime + usage.ru_stime,
+                'max_rss_mb': usage.ru_maxrss / rss_unit,
+                'limit_hit': self._limit_hit(proc.returncode, usage, limits, cgroup),
+                'output': ''.join(chunks),
+            }
+            if cgroup:
+                result['memory_peak_mb'] = cgroup.peak_mb()
+                cgroup.remove()
+        if timed_out.is_set():
+            result['returncode'] = -1
+            result['output'] = f"Hook timed out after {self.timeout}s"
+            result['limit_hit'] = 'timeout'
+        return result
+
+    @staticmethod
+    def _preexec(limits: Dict, cgroup: Optional[Cgroup], new_group: bool):
+        cpu = limits.get('cpu_seconds')
+        memory = limits.get('memory_mb')
+        nice = int(limits.get('nice') or 0)
+        procs = os.fsencode(cgroup.path / "cgroup.procs") if cgroup else None
+
+        def apply():
+            # Runs in the forked child: keep to plain syscalls
+            if new_group:
+                # Own process group so a timeout can kill the whole pipeline
+                os.setpgid(0, 0)
+            if procs:
+                fd = os.open(procs, os.O_WRONLY)
+                os.write(fd, b"0")
+                os.close(fd)
+            if cpu:
+                # The soft limit sends SIGXCPU, the hard limit a few seconds later SIGKILL
+                resource.setrlimit(resource.RLIMIT_CPU, (int(cpu), int(cpu) + 5))
+            if memory:
+                size = int(memory) * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (size, size))
+            if nice:
+                os.nice(nice)
+        return apply
+
+    @staticmethod
+    def _limit_hit(returncode: int, usage, limits: Dict, cgroup: Optional[Cgroup]) -> Optional[str]:
+        cpu = limits.get('cpu_seconds')
+        if returncode == -signal.SIGXCPU or (
+                cpu and returncode == -signal.SIGKILL and usage.ru_utime + usage.ru_stime >= cpu):
+            return 'cpu'
+        if cgroup and cgroup.oom_killed():
+            return 'memory'
+        return None
+
+    def record(self, name: str, event: str, background: bool, result: Dict) -> None:
+        """Append one run to the hook run log with a single O_APPEND write"""
+        if not self.log_path:
+            return
+        entry = {
+            'ts': round(time.time(), 3),
+            'hook': name,
+            'event': event,
+            'background': background,
+            'returncode': result['returncode'],
+            'duration': round(result['duration'], 4),
+            'wait': round(result.get('wait', 0.0), 4),
+            'cpu': round(result.get('cpu', 0.0), 4),
+            'max_rss_mb': round(result.get('max_rss_mb', 0.0), 1),
+        }
+        if result.get('memory_peak_mb') is not None:
+            entry['memory_peak_mb'] = round(result['memory_peak_mb'], 1)
+        if result.get('limit_hit'):
+            entry['limit_hit'] = result['limit_hit']
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (json.dumps(entry) + '\n').encode())
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def main():
+    """List configured hooks and any configuration errors"""
+    registry = HookRegistry()
+    for hook in registry.hooks:
+        print(hook.describe())
+    for error in registry.errors:
+        print(f"⚠️  {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Pre-commit Engine for Multi-Agent Squad
+Runs staged-file checks in parallel and caches passing results per blob hash
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PY_TYPES = ('.py',)
+JS_TYPES = ('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs')
+MAX_FILE_SIZE = 5 * 1024 * 1024
+FILES_PER_TASK = 100
+MAX_CACHE_ENTRIES = 50000
+
+# name, file types (None = all files), command, whether a failure blocks the commit
+CHECKS = [
+    {'name': 'flake8', 'types': PY_TYPES, 'command': ['flake8'], 'blocking': False},
+    {'name': 'black', 'types': PY_TYPES, 'command': ['black', '--check'], 'blocking': False},
+    {'name': 'eslint', 'types': JS_TYPES, 'command': ['eslint'], 'blocking': False},
+    {'name': 'prettier', 'types': JS_TYPES, 'command': ['prettier', '--check'], 'blocking': False},
+    {'name': 'secrets', 'types': None, 'command': [sys.executable, 'scripts/secret-scan.py'], 'blocking': True},
+    {'name': 'file-size', 'types': None, 'command': None, 'blocking': True},
+    {'name': 'tests', 'types': PY_TYPES + JS_TYPES, 'command': None, 'blocking': True},
+]
+
+
+def git(*args: str) -> str:
+    return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout
+
+
+class StagedFiles:
+    """The staged file set, computed once per commit"""
+
+    def __init__(self):
+        raw = git("diff", "--cached", "--raw", "-z", "--no-abbrev", "--no-renames", "--diff-filter=ACM")
+        fields = raw.split('\0')
+        self.blobs: Dict[str, str] = {}
+        for meta, path in zip(fields[0::2], fields[1::2]):
+            if meta.startswith(':'):
+                self.blobs[path] = meta.split()[3]
+        # Files whose working copy differs from the index are checked but never cached
+        unstaged = git("diff", "--name-only", "-z").split('\0')
+        self.dirty = {p for p in unstaged if p}
+
+    def matching(self, types: Optional[Tuple[str, ...]]) -> List[str]:
+        return [p for p in self.blobs if types is None or p.endswith(types)]
+
+    def fingerprint(self, paths: List[str]) -> str:
+        """Stable key for checks whose result depends on the whole change set"""
+        tree = git("rev-parse", "HEAD^{tree}").strip() if self._has_head() else ""
+        digest = hashlib.sha1(tree.encode())
+        for path in sorted(paths):
+            digest.update(f"{path}\0{self.blobs[path]}\0".encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _has_head() -> bool:
+        return subprocess.run(["git", "rev-parse", "--verify", "-q", "HEAD"],
+                              capture_output=True).returncode == 0
+
+
+class PassCache:
+    """Set of (check, blob) pairs that already passed"""
+
+    def __init__(self):
+        git_dir = Path(git("rev-parse", "--git-common-dir").strip())
+        self.path = git_dir / "precommit-cache.json"
+        try:
+            with open(self.path) as f:
+                self.entries: Dict[str, float] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.entries = {}
+
+    def passed(self, check: str, key: str) -> bool:
+        return f"{check}:{key}" in self.entries
+
+    def add(self, check: str, key: str) -> None:
+        self.entries[f"{check}:{key}"] = time.time()
+
+    def save(self) -> None:
+        if len(self.entries) > MAX_CACHE_ENTRIES:
+            newest = sorted(self.entries.items(), key=lambda item: item[1])[-MAX_CACHE_ENTRIES:]
+            self.entries = dict(newest)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+
+class PrecommitEngine:
+    """Dispatches checks, grouped by file type, to a worker pool"""
+
+    def __init__(self, strict: bool = False, use_cache: bool = True, workers: Optional[int] = None):
+        self.strict = strict
+        self.use_cache = use_cache
+        self.workers = workers or min(8, os.cpu_count() or 2)
+        self.staged = StagedFiles()
+        self.cache = PassCache()
+        self.summary: Dict[str, Dict] = {}
+
+    def _tasks(self):
+        """Yield (check, files, cache key or None) work items"""
+        for check in CHECKS:
+            files = self.staged.matching(check['types'])
+            stats = self.summary.setdefault(check['name'], {
+                'files': len(files), 'cached': 0, 'time': 0.0, 'status': 'passed', 'output': ''
+            })
+            if not files:
+                stats['status'] = 'no files'
+                continue
+            if check['name'] == 'tests':
+                key = self.staged.fingerprint(files)
+                if self.use_cache and self.cache.passed('tests', key):
+                    stats['cached'] = len(files)
+                    stats['status'] = 'cached'
+                    continue
+                yield check, files, key
+                continue
+
+            pending = [f for f in files
+                       if not (self.use_cache and self.cache.passed(check['name'], self.staged.blobs[f]))]
+            stats['cached'] = len(files) - len(pending)
+            if not pending:
+                stats['status'] = 'cached'
+            for i in range(0, len(pending), FILES_PER_TASK):
+                yield check, pending[i:i + FILES_PER_TASK], None
+
+    def _run(self, check: Dict, files: List[str]) -> Tuple[str, str]:
+        """Run one check over a group of files; returns (status, output)"""
+        name = check['name']
+        if name == 'file-size':
+            too_big = [f for f in files if int(git("cat-file", "-s", self.staged.blobs[f])) > MAX_FILE_SIZE]
+            if too_big:
+                return 'failed', '\n'.join(f"❌ {f} is larger than 5MB" for f in too_big)
+            return 'passed', ''
+        if name == 'tests':
+            command = self._test_command(files)
+            if command is None:
+                return 'skipped', 'No test runner found'
+        else:
+            script = next((arg for arg in check['command'] if arg.endswith('.py')), None)
+            if script and not os.path.exists(script):
+                return 'skipped', f"{script} not found"
+            if not shutil.which(check['command'][0]):
+                return 'skipped', f"{check['command'][0]} not installed"
+            command = check['command'] + files
+        proc = subprocess.run(command, capture_output=True, text=True)
+        return ('passed' if proc.returncode == 0 else 'failed'), (proc.stdout + proc.stderr).strip()
+
+    @staticmethod
+    def _test_command(files: List[str]) -> Optional[List[str]]:
+        if os.path.exists("scripts/test-impact.py"):
+            return [sys.executable, "scripts/test-impact.py", "run", *files]
+        if shutil.which("pytest") and os.path.isdir("tests") and any(f.endswith(PY_TYPES) for f in files):
+            return ["pytest", "tests/", "-q", "--tb=short"]
+        return None
+
+    def run(self) -> int:
+        tasks = list(self._tasks())
+        start = time.perf_counter()
+
+        def execute(task):
+            check, files, key = task
+            began = time.perf_counter()
+            status, output = self._run(check, files)
+            return check, files, key, status, output, time.perf_counter() - began
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for check, files, key, status, output, elapsed in pool.map(execute, tasks):
+                stats = self.summary[check['name']]
+                stats['time'] += elapsed
+                if output:
+                    stats['output'] += output + "\n"
+                if status == 'failed' or (status == 'skipped' and stats['status'] != 'failed'):
+                    stats['status'] = status
+                if status != 'passed':
+                    continue
+                for f in files:
+                    if f in self.staged.dirty:
+                        continue
+                    self.cache.add(check['name'], key or self.staged.blobs[f])
+
+        if self.use_cache:
+            self.cache.save()
+        return self._report(time.perf_counter() - start)
+
+    def _report(self, wall: float) -> int:
+        icons = {'passed': '✅', 'cached': '⚡', 'failed': '❌', 'skipped': '⏭️', 'no files': '·'}
+        blocked = False
+        for check in CHECKS:
+            stats = self.summary[check['name']]
+            if stats['status'] == 'failed':
+                print(f"\n── {check['name']} ──\n{stats['output'].rstrip()}")
+                if check['blocking'] or self.strict:
+                    blocked = True
+
+        print("\n⏱️  Pre-commit summary")
+        print(f"  {'check':<10} {'files':>5} {'cached':>6} {'time':>8}  status")
+        for check in CHECKS:
+            stats = self.summary[check['name']]
+            print(f"  {check['name']:<10} {stats['files']:>5} {stats['cached']:>6} "
+                  f"{stats['time']:>7.2f}s  {icons[stats['status']]} {stats['status']}")
+        print(f"  total wall time {wall:.2f}s across {self.workers} workers")
+
+        if blocked:
+            print("\n❌ Pre-commit checks failed")
+            return 1
+        print("\n✅ Pre-commit checks passed!")
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel pre-commit checks for staged files")
+    parser.add_argument("--strict", action="store_true", help="Lint and format failures also block")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached pass results")
+    parser.add_argument("--workers", type=int, help="Worker pool size")
+    args = parser.parse_args()
+
+    print("🔍 Running pre-commit checks...")
+    engine = PrecommitEngine(strict=args.strict, use_cache=not args.no_cache, workers=args.workers)
+    sys.exit(engine.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Secret Scanner for Multi-Agent Squad
+Scans the added lines of staged files for credentials before a commit
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import hashlib
+import argparse
+import subprocess
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+ENTROPY_THRESHOLD = 3.0
+MIN_SECRET_LENGTH = 8
+ALLOW_MARKERS = ('pragma: allowlist secret', 'secret-scan: ignore')
+PLACEHOLDER_RE = re.compile(
+    r'^(\$\{?|<|%\(|\{\{)|(example|changeme|your[_-]|xxx|\*\*\*|dummy|placeholder|redacted)',
+    re.IGNORECASE
+)
+ASSIGNMENT_RE = re.compile(
+    r'(?P<key>[\w.-]*(?:password|passwd|pwd|secret|api[_-]?key|token|access[_-]?key|private[_-]?key)[\w.-]*)'
+    r'["\']?\s*(?:[:=]|:=|=>)\s*(?P<quote>["\']?)(?P<value>[^\s"\'`,;)]+)',
+    re.IGNORECASE
+)
+
+# (rule name, trigger keywords, validating regex); keywords are matched case-insensitively
+RULES: List[Tuple[str, List[str], Optional[str]]] = [
+    ("aws-access-key", ["akia", "asia"], r'\b(?:AKIA|ASIA)[0-9A-Z]{16}\b'),
+    ("aws-secret-key", ["aws_secret"], r'aws_secret(?:_access)?_key["\']?\s*[:=]\s*["\']?[A-Za-z0-9/+=]{40}'),
+    ("github-token", ["ghp_", "gho_", "ghu_", "ghs_", "ghr_"], r'\bgh[pousr]_[A-Za-z0-9]{36,}'),
+    ("github-pat", ["github_pat_"], r'github_pat_[A-Za-z0-9_]{22,}'),
+    ("slack-token", ["xoxb-", "xoxp-", "xoxa-", "xoxr-", "xoxs-"], r'xox[baprs]-[A-Za-z0-9-]{10,}'),
+    ("slack-webhook", ["hooks.slack.com/services/"], r'hooks\.slack\.com/services/T[A-Z0-9]+/B[A-Z0-9]+/[A-Za-z0-9]+'),
+    ("stripe-key", ["sk_live_", "rk_live_"], r'[sr]k_live_[0-9a-zA-Z]{24,}'),
+    ("google-api-key", ["aiza"], r'AIza[0-9A-Za-z_-]{35}'),
+    ("sendgrid-key", ["sg."], r'\bSG\.[A-Za-z0-9_-]{22}\.[A-Za-z0-9_-]{43}'),
+    ("openai-anthropic-key", ["sk-"], r'\bsk-(?:ant-|proj-)?[A-Za-z0-9_-]{32,}'),
+    ("npm-token", ["npm_"], r'\bnpm_[A-Za-z0-9]{36}\b'),
+    ("private-key", ["-----begin"], r'-----BEGIN (?:[A-Z]+ )?PRIVATE KEY( BLOCK)?-----'),
+    ("jwt", ["eyj"], r'\beyJ[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}'),
+    ("url-credentials", ["://"], r'\b[a-z][a-z0-9+.-]*://[^\s:/@"\']+:[^\s:/@"\']{3,}@[^\s/"\']+'),
+    # Generic assignments are validated by entropy instead of a fixed format
+    ("high-entropy-assignment",
+     ["password", "passwd", "pwd", "secret", "api_key", "apikey", "api-key", "token", "access_key", "private_key"],
+     None),
+]
+
+RULES_VERSION = hashlib.sha1(
+    json.dumps([RULES, ENTROPY_THRESHOLD, MIN_SECRET_LENGTH]).encode()
+).hexdigest()[:12]
+
+
+class AhoCorasick:
+    """Multi-pattern automaton: one pass per line finds every trigger keyword"""
+
+    def __init__(self, keywords: Dict[str, Set[int]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Set[int]] = [set()]
+        for keyword, rule_ids in keywords.items():
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.out[state] |= rule_ids
+
+        # Breadth-first: depth-1 states fail to the root, deeper ones follow their parent
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self.goto[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                candidate = self.goto[fallback].get(char, 0)
+                self.fail[target] = candidate if candidate != target else 0
+                self.out[target] |= self.out[self.fail[target]]
+
+    def search(self, text: str) -> Set[int]:
+        """Return the ids of rules whose keywords occur in text (already lowercased)"""
+        state = 0
+        found: Set[int] = set()
+        goto, fail, out = self.goto, self.fail, self.out
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+def shannon_entropy(value: str) -> float:
+    counts = Counter(value)
+    length = len(value)
+    return -sum(c / length * math.log2(c / length) for c in counts.values())
+
+
+class SecretScanner:
+    """Keyword automaton prefilter followed by per-rule validation"""
+
+    def __init__(self):
+        keywords: Dict[str, Set[int]] = {}
+        for rule_id, (_, words, _) in enumerate(RULES):
+            for word in words:
+                keywords.setdefault(word.lower(), set()).add(rule_id)
+        self.automaton = AhoCorasick(keywords)
+        self.patterns = [re.compile(p) if p else None for _, _, p in RULES]
+
+    def scan_line(self, line: str) -> List[Tuple[str, int, str]]:
+        """Return (rule, column, matched text) findings for one line"""
+        if any(marker in line for marker in ALLOW_MARKERS):
+            return []
+        findings = []
+        for rule_id in sorted(self.automaton.search(line.lower())):
+            name = RULES[rule_id][0]
+            pattern = self.patterns[rule_id]
+            if pattern is not None:
+                for match in pattern.finditer(line):
+                    findings.append((name, match.start() + 1, match.group(0)))
+                continue
+            for match in ASSIGNMENT_RE.finditer(line):
+                value = match.group('value')
+                if len(value) < MIN_SECRET_LENGTH or PLACEHOLDER_RE.search(value):
+                    continue
+                # Unquoted values are usually code (variables, calls), not literals
+                if not match.group('quote') and not re.search(r'\d', value):
+                    continue
+                column = match.start('value') + 1
+                # Skip values a format-specific rule has already reported
+                if any(col == column for _, col, _ in findings):
+                    continue
+                if shannon_entropy(value) >= ENTROPY_THRESHOLD:
+                    findings.append((name, column, value))
+        return findings
+
+
+def redact(value: str) -> str:
+    return value[:4] + '…' + value[-2:] if len(value) > 8 else '****'
+
+
+def git(*args: str) -> str:
+    return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout
+
+
+def staged_blobs(paths: List[str]) -> List[Tuple[str, str]]:
+    """(path, staged blob sha) for added, copied and modified files"""
+    raw = git("diff", "--cached", "--raw", "-z", "--no-abbrev", "--no-renames",
+              "--diff-filter=ACM", "--", *paths)
+    fields = raw.split('\0')
+    blobs = []
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        if meta.startswith(':'):
+            blobs.append((path, meta.split()[3]))
+    return blobs
+
+
+def added_lines(path: str) -> Iterator[Tuple[int, str]]:
+    """Stream (line number, text) for lines added to a staged file"""
+    proc = subprocess.Popen(
+        ["git", "diff", "--cached", "-U0", "--no-color", "--no-ext-diff", "--", path],
+        stdout=subprocess.PIPE, text=True, errors='replace'
+    )
+    line_no = 0
+    try:
+        for line in proc.stdout:
+            if line.startswith('@@'):
+                # @@ -a,b +c,d @@
+                new_range = line.split('+', 1)[1].split(' ', 1)[0]
+                line_no = int(new_range.split(',')[0])
+            elif line.startswith('+') and not line.startswith('+++'):
+                yield line_no, line[1:].rstrip('\n')
+                line_no += 1
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+class BlobCache:
+    """Blob hashes already scanned clean with the current rule set"""
+
+    def __init__(self):
+        git_dir = Path(git("rev-parse", "--git-common-dir").strip())
+        self.path = git_dir / "secret-scan-cache.json"
+        self.clean: Set[str] = set()
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get('rules') == RULES_VERSION:
+                self.clean = set(data['blobs'])
+        except (OSError, json.JSONDecodeError, KeyError):
+            pass
+
+    def save(self) -> None:
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'rules': RULES_VERSION, 'blobs': sorted(self.clean)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def scan_staged(paths: List[str], use_cache: bool = True) -> Tuple[List[Dict], int, int]:
+    """Scan staged changes; returns (findings, files scanned, files skipped)"""
+    scanner = SecretScanner()
+    cache = BlobCache()
+    blobs = staged_blobs(paths)
+    pending = [(p, sha) for p, sha in blobs if not (use_cache and sha in cache.clean)]
+
+    def scan_file(item: Tuple[str, str]) -> Tuple[str, List[Dict]]:
+        path, sha = item
+        results = []
+        for line_no, text in added_lines(path):
+            for rule, column, value in scanner.scan_line(text):
+                results.append({'file': path, 'line': line_no, 'column': column,
+                                'rule': rule, 'match': redact(value)})
+        return sha, results
+
+    findings = []
+    with ThreadPoolExecutor(max_workers=min(8, (os.cpu_count() or 2))) as pool:
+        for sha, results in pool.map(scan_file, pending):
+            if results:
+                findings.extend(results)
+            else:
+                cache.clean.add(sha)
+    if use_cache:
+        cache.save()
+    return findings, len(pending), len(blobs) - len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan staged changes for secrets")
+    parser.add_argument("paths", nargs="*", help="Limit the scan to these paths")
+    parser.add_argument("--no-cache", action="store_true", help="Rescan blobs already seen")
+    parser.add_argument("--json", action="store_true", help="Print findings as JSON")
+    args = parser.parse_args()
+
+    try:
+        findings, scanned, skipped = scan_staged(args.paths, use_cache=not args.no_cache)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ git failed: {e.stderr.strip()}", file=sys.stderr)
+        sys.exit(2)
+
+    if args.json:
+        print(json.dumps(findings, indent=2))
+    elif findings:
+        print(f"⚠️  WARNING: {len(findings)} possible secret(s) detected!")
+        for f in findings:
+            print(f"  {f['file']}:{f['line']}:{f['column']}  {f['rule']}  {f['match']}")
+        print("Mark false positives with a 'pragma: allowlist secret' comment.")
+    else:
+        print(f"✅ No secrets found ({scanned} files scanned, {skipped} unchanged blobs skipped)")
+    sys.exit(1 if findings else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,11 @@ cat > "$HOOKS_DIR/pre-commit" << 'EOF'
 #!/bin/bash
 # Pre-commit hook: Enforce code quality before commit
 
+# Parallel engine with per-blob result caching, when available
+if [ -f scripts/precommit-engine.py ] && command -v python3 &> /dev/null; then
+    exec python3 scripts/precommit-engine.py
+fi
+
 echo "🔍 Running pre-commit checks..."
 
 # Check for Python files
@@ -62,12 +62,21 @@ class SlackIntegration:
         
         prefs = self._get_notification_preferences()
         
+        bot_token, channel = None, None
+        if prefs['thread_messages']:
+            print("\nThreaded replies need a bot token (webhooks cannot reply in threads).")
+            print("Create a Slack app with the chat:write scope and invite it to your channel.")
+            bot_token = input("Bot token (xoxb-..., Enter to skip): ").strip() or None
+            if bot_token:
+                channel = input("Channel ID (e.g. C0123456789): ").strip() or None
+        
         # Show summary and ask for confirmation
         print("\n📋 Configuration Summary")
         print("━" * 50)
         print(f"Webhook URL: {webhook_url[:50]}...")
         print(f"Notifications: {', '.join(notifications)}")
-        print(f"Thread messages: {'Yes' if prefs['thread_messages'] else 'No'}")
+        print(f"Thread messages: {'Yes' if prefs['thread_messages'] else 'No'}"
+              f"{' (bot token)' if bot_token and channel else ''}")
         print(f"Include user mentions: {'Yes' if prefs['include_mentions'] else 'No'}")
         print(f"Error notifications only: {'Yes' if prefs['errors_only'] else 'No'}")
         
@@ -82,7 +91,7 @@ class SlackIntegration:
             return False
             
         # Create configuration
-        self._create_slack_config(webhook_url, notifications, prefs)
+        self._create_slack_config(webhook_url, notifications, prefs, bot_token, channel)
         
         # Generate hooks
         self._generate_slack_hooks(notifications, prefs)
@@ -168,7 +177,8 @@ class SlackIntegration:
         
         return prefs
         
-    def _create_slack_config(self, webhook_url: str, notifications: List[str], prefs: Dict[str, bool]) -> None:
+    def _create_slack_config(self, webhook_url: str, notifications: List[str], prefs: Dict[str, bool],
+                             bot_token: Optional[str] = None, channel: Optional[str] = None) -> None:
         """Create Slack configuration file"""
         config = {
             "webhook_url": webhook_url,
@@ -176,6 +186,8 @@ class SlackIntegration:
             "preferences": prefs,
             "created_at": "2025-08-01T10:00:00Z"
         }
+        if bot_token and channel:
+            config["channel"] = channel
         
         config_path = self.config_dir / "slack.json"
         with open(config_path, 'w') as f:
@@ -185,6 +197,8 @@ class SlackIntegration:
         env_path = Path(".env.slack")
         with open(env_path, 'w') as f:
             f.write(f"SLACK_WEBHOOK_URL={webhook_url}\n")
+            if bot_token and channel:
+                f.write(f"SLACK_BOT_TOKEN={bot_token}\n")
             
         # Add to .gitignore
         gitignore_path = Path(".gitignore")
@@ -270,10 +284,8 @@ run_in_background = true
 [hooks.matcher]
 tool_name = "Bash"
 command = '''
-# Check for common error patterns in output
-if echo "$CLAUDE_OUTPUT" | grep -qiE "(error|failed|exception|fatal)"; then
-    python scripts/slack-notify.py "⚠️ Error detected in command output" --error "$CLAUDE_OUTPUT"
-fi
+# Classify the output as a stream; only a short excerpt reaches the notifier
+printf '%s' "$CLAUDE_OUTPUT" | python scripts/classify-output.py --notify slack "⚠️ Error detected in command output"
 '''
 
 """
@@ -293,10 +305,15 @@ fi
 import os
 import sys
 import json
-import requests
 import argparse
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+try:
+    import slack_delivery
+except ImportError:
+    slack_delivery = None
+
 def load_config():
     """Load Slack configuration"""
     config_path = Path(".claude/integrations/slack.json")
@@ -304,8 +321,16 @@ def load_config():
         print("Error: Slack not configured. Run: python scripts/slack-integration.py")
         sys.exit(1)
         
-    with open(config_path) as f:
-        config = json.load(f)
+    # The validated config snapshot avoids re-parsing JSON on every notification
+    config = None
+    try:
+        from hook_config import load_integration
+        config = load_integration("slack")
+    except ImportError:
+        pass
+    if config is None:
+        with open(config_path) as f:
+            config = json.load(f)
         
     # Load webhook from env file
     env_path = Path(".env.slack")
@@ -317,7 +342,7 @@ def load_config():
                     
     return config
 
-def send_message(message, mention=False, template=None, error=None):
+def send_message(message, mention=False, template=None, error=None, now=False, thread=None):
     """Send message to Slack"""
     config = load_config()
     
@@ -361,7 +386,17 @@ def send_message(message, mention=False, template=None, error=None):
             }
         ]
     
-    # Send to Slack
+    # Spool the message; a background flusher handles rate limits and retries
+    if slack_delivery is not None:
+        if thread is None and config['preferences'].get('thread_messages'):
+            thread = slack_delivery.default_thread_key()
+        if not slack_delivery.deliver(payload, wait=now, template=template, error=error,
+                                      thread_key=thread):
+            print("Failed to send Slack notification (see .claude/cache/slack-dead-letter.jsonl)")
+            sys.exit(1)
+        return
+
+    import requests
     response = requests.post(config['webhook_url'], json=payload)
     if response.status_code != 200:
         print(f"Failed to send Slack notification: {response.text}")
@@ -373,9 +408,11 @@ if __name__ == "__main__":
     parser.add_argument("--mention", action="store_true", help="Include @here mention")
     parser.add_argument("--template", help="Use message template")
     parser.add_argument("--error", help="Error details to include")
+    parser.add_argument("--now", action="store_true", help="Deliver before exiting instead of spooling")
+    parser.add_argument("--thread", help="Feature, PR or branch key to thread replies under (bot token mode)")
     
     args = parser.parse_args()
-    send_message(args.message, args.mention, args.template, args.error)
+    send_message(args.message, args.mention, args.template, args.error, args.now, args.thread)
 '''
         
         script_path = Path("scripts/slack-notify.py")
@@ -390,7 +427,7 @@ if __name__ == "__main__":
         try:
             import subprocess
             result = subprocess.run(
-                ["python", "scripts/slack-notify.py", "🎉 Slack integration test successful!"],
+                ["python", "scripts/slack-notify.py", "🎉 Slack integration test successful!", "--now"],
                 capture_output=True,
                 text=True
             )
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Slack Notification Load Test for Multi-Agent Squad
+Drives notification bursts through the generated Slack hooks against the local stub and
+reports delivered, lost and duplicated messages, end-to-end latency and CPU per message
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import shutil
+import signal
+import secrets
+import threading
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# Modules the generated hooks and notifier need inside the scratch project
+SUPPORT_SCRIPTS = ('slack_delivery.py', 'hook_config.py', 'hook_runtime.py', 'classify-output.py')
+
+SUMMARY_RE = re.compile(r'Repeated (\d+)× more')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def fetch(url: str):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def start_stub(args) -> subprocess.Popen:
+    command = [sys.executable, "-u", str(SCRIPTS_DIR / "slack-stub.py"), "--port", "0",
+               "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--throttle-rate", str(args.throttle_rate), "--retry-after", str(args.retry_after),
+               "--error-rate", str(args.error_rate), "--drop-rate", str(args.drop_rate)]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+
+
+def prepare_project(root: Path, webhook_url: str, args) -> None:
+    """Set up a scratch project with the hooks and notifier slack-integration.py generates"""
+    (root / "scripts").mkdir(parents=True, exist_ok=True)
+    for name in SUPPORT_SCRIPTS:
+        os.symlink(SCRIPTS_DIR / name, root / "scripts" / name)
+
+    spec = importlib.util.spec_from_file_location("slack_integration", SCRIPTS_DIR / "slack-integration.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    prefs = {'thread_messages': False, 'include_mentions': False, 'errors_only': False}
+    integration = module.SlackIntegration()
+    integration._create_slack_config(webhook_url, ['error_alerts'], prefs)
+    integration._generate_slack_hooks(['error_alerts'], prefs)
+
+    config_path = root / ".claude/integrations/slack.json"
+    config = json.loads(config_path.read_text())
+    config.update({'aggregation_window': args.window, 'rate_per_second': args.rate, 'burst': args.burst})
+    config_path.write_text(json.dumps(config, indent=2))
+    if args.slots:
+        (root / ".claude/hooks/loadtest-limits.toml").write_text(f"[limits]\nmax_background = {args.slots}\n")
+
+
+def flusher_running(lock_path: Path) -> bool:
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return False
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+
+
+class LoadTest:
+    """Fires synthetic failing Bash events through the hook runtime and tracks every message id"""
+
+    def __init__(self, args):
+        from hook_runtime import HookRegistry, HookExecutor
+        self.args = args
+        self.run_id = secrets.token_hex(3)
+        self.registry = HookRegistry()
+        self.executor = HookExecutor(limits=self.registry.limits)
+        self.sent: Dict[str, float] = {}
+        self.hook_cpu = 0.0
+        self.hook_runs = 0
+        self.hook_failures = 0
+        self.lock = threading.Lock()
+
+    def tag(self, seq: int) -> str:
+        return f"lt-{self.run_id}-{seq:06d}"
+
+    def fire(self, seq: int) -> None:
+        tag = self.tag(seq)
+        event = {
+            'event': 'PostToolUse',
+            'tool_name': 'Bash',
+            'args': self.args.command,
+            'output': f"running step {seq}\nError: load test failure {tag}\n",
+        }
+        hooks = self.registry.matching(event)
+        self.sent[tag] = time.time()
+        for hook in hooks:
+            result = self.executor.run(hook, event)
+            with self.lock:
+                self.hook_cpu += result['cpu']
+                self.hook_runs += 1
+                self.hook_failures += result['returncode'] != 0
+
+    def drive(self) -> None:
+        seq = 0
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            for burst in range(self.args.bursts):
+                if burst:
+                    time.sleep(self.args.interval)
+                futures = [pool.submit(self.fire, seq + i) for i in range(self.args.burst_size)]
+                seq += self.args.burst_size
+                for future in futures:
+                    future.result()
+
+
+def settle(deadline: float) -> bool:
+    """Wait for the spool and aggregation windows to drain"""
+    from slack_delivery import SlackSpool
+    spool = SlackSpool()
+    while time.monotonic() < deadline:
+        if not spool.pending() and not spool.open_windows()[0]:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def account(test: LoadTest, messages: List[Dict]) -> Dict:
+    """Match stub posts back to the tags that were sent"""
+    pattern = re.compile(rf'lt-{test.run_id}-\d{{6}}')
+    seen: Dict[str, int] = {}
+    latencies = []
+    aggregated = 0
+    for message in messages:
+        for part in message.get('parts', [message.get('text', '')]):
+            repeats = SUMMARY_RE.search(part)
+            if repeats:
+                # A summary quotes one sample error; the repeats it counts were not posted themselves
+                aggregated += int(repeats.group(1))
+                continue
+            # The excerpt and the tail of the output can both quote the same tag
+            for tag in set(pattern.findall(part)):
+                seen[tag] = seen.get(tag, 0) + 1
+                if seen[tag] == 1 and tag in test.sent:
+                    latencies.append(message['received'] - test.sent[tag])
+
+    dead = 0
+    dead_path = Path(".claude/cache/slack-dead-letter.jsonl")
+    if dead_path.exists():
+        with open(dead_path) as f:
+            dead = sum(len(pattern.findall(line)) for line in f)
+    delivered = sum(1 for tag in test.sent if tag in seen)
+    return {
+        'sent': len(test.sent),
+        'delivered': delivered,
+        'aggregated': aggregated,
+        'lost': max(0, len(test.sent) - delivered - aggregated),
+        'dead_lettered': dead,
+        'duplicated': sum(count - 1 for count in seen.values()),
+        'posts': len(messages),
+        'latencies': latencies,
+    }
+
+
+def report(test: LoadTest, result: Dict, stub_stats: Dict, flusher_cpu: float, elapsed: float,
+           settled: bool) -> None:
+    sent = max(1, result['sent'])
+    latencies = result['latencies']
+    print(f"\n📊 Slack load test: {result['sent']} notifications in {test.args.bursts} bursts "
+          f"of {test.args.burst_size} ({elapsed:.1f}s)")
+    print(f"  delivered:    {result['delivered']:>6}  in {result['posts']} posts")
+    if result['aggregated']:
+        print(f"  aggregated:   {result['aggregated']:>6}  (counted in repeat summaries)")
+    print(f"  lost:         {result['lost']:>6}  ({result['dead_lettered']} dead-lettered)")
+    print(f"  duplicated:   {result['duplicated']:>6}")
+    if latencies:
+        print(f"  latency:      p50 {percentile(latencies, 50) * 1000:.0f}ms  "
+              f"p90 {percentile(latencies, 90) * 1000:.0f}ms  p99 {percentile(latencies, 99) * 1000:.0f}ms  "
+              f"max {max(latencies) * 1000:.0f}ms")
+    print(f"  cpu/message:  {(test.hook_cpu + flusher_cpu) / sent * 1000:.1f}ms  "
+          f"(hooks {test.hook_cpu / sent * 1000:.1f}ms, flusher {flusher_cpu / sent * 1000:.1f}ms)")
+    faults = ', '.join(f"{stub_stats.get(k, 0)} {label}" for k, label in
+                       (('throttle', '429'), ('error', '503'), ('drop', 'dropped')))
+    print(f"  stub:         {stub_stats.get('requests', 0)} requests, {faults}")
+    if test.hook_failures:
+        print(f"⚠️  {test.hook_failures} of {test.hook_runs} hook runs exited non-zero")
+    if not settled:
+        print("⚠️  Spool did not drain before --settle; remaining messages count as lost")
+
+
+def run(args) -> int:
+    stub = start_stub(args) if args.url is None else None
+    base = args.url or stub.stdout.readline().split()[-1]
+    root = Path(args.workdir or tempfile.mkdtemp(prefix="slack-loadtest-")).resolve()
+    cwd = os.getcwd()
+    flusher = None
+    try:
+        reset = urllib.request.Request(f"{base}/reset", data=b"{}", method="POST")
+        urllib.request.urlopen(reset, timeout=10).close()
+        root.mkdir(parents=True, exist_ok=True)
+        os.chdir(root)
+        prepare_project(root, f"{base}/services/T000/B000/LOADTEST", args)
+
+        # Own the flusher so its CPU time can be measured; notifiers see the lock and only spool
+        from slack_delivery import FLUSHER_LOCK
+        FLUSHER_LOCK.parent.mkdir(parents=True, exist_ok=True)
+        flusher = subprocess.Popen([sys.executable, "scripts/slack_delivery.py", "flush",
+                                    "--idle-exit", str(args.settle + 60)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while not flusher_running(FLUSHER_LOCK) and flusher.poll() is None:
+            time.sleep(0.05)
+
+        test = LoadTest(args)
+        print(f"🚀 {args.bursts}×{args.burst_size} notifications through "
+              f"{len(test.registry.matching({'event': 'PostToolUse', 'tool_name': 'Bash', 'args': args.command}))}"
+              f" hook(s) → {base}")
+        start = time.perf_counter()
+        test.drive()
+        settled = settle(time.monotonic() + args.settle)
+        elapsed = time.perf_counter() - start
+
+        flusher_cpu = 0.0
+        if flusher.poll() is None:
+            flusher.send_signal(signal.SIGTERM)
+            _, status, usage = os.wait4(flusher.pid, 0)
+            flusher.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            flusher_cpu = usage.ru_utime + usage.ru_stime
+
+        result = account(test, fetch(f"{base}/messages"))
+        report(test, result, fetch(f"{base}/stats"), flusher_cpu, elapsed, settled)
+        if args.json:
+            print(json.dumps({k: v for k, v in result.items() if k != 'latencies'}))
+        return 1 if result['lost'] else 0
+    finally:
+        os.chdir(cwd)
+        if flusher and flusher.poll() is None:
+            flusher.kill()
+            flusher.wait()
+        if stub:
+            stub.terminate()
+            stub.wait()
+        if not args.workdir and not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+        elif args.keep:
+            print(f"📁 Scratch project kept at {root}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Slack notification hooks against a local stub")
+    parser.add_argument("--url", help="Running slack-stub.py base URL (default: start one with the fault options)")
+    parser.add_argument("--bursts", type=int, default=5, help="Number of bursts")
+    parser.add_argument("--burst-size", type=int, default=20, help="Notifications per burst")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between bursts")
+    parser.add_argument("--concurrency", type=int, default=8, help="Hook events fired at once")
+    parser.add_argument("--command", default="./scripts/build.sh",
+                        help="Bash command the synthetic events report (selects the matching hooks)")
+    parser.add_argument("--slots", type=int, help="Override max_background for the hook runtime")
+    parser.add_argument("--window", type=float, default=0.0,
+                        help="Aggregation window in seconds (0 sends every notification)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Flusher posts per second per webhook")
+    parser.add_argument("--burst", type=int, default=5, help="Flusher token bucket burst")
+    parser.add_argument("--settle", type=float, default=60.0, help="Seconds to wait for the spool to drain")
+    parser.add_argument("--latency", type=float, default=20.0, help="Stub: milliseconds per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Stub: extra random milliseconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Stub: fraction answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Stub: Retry-After seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub: fraction answered 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Stub: fraction accepted without a response")
+    parser.add_argument("--seed", type=int, help="Stub: random seed")
+    parser.add_argument("--workdir", help="Scratch project directory (default: a temporary one)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch project for inspection")
+    parser.add_argument("--json", action="store_true", help="Also print the counts as JSON")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Local Slack Stand-in for Multi-Agent Squad
+Accepts incoming-webhook posts and chat.postMessage calls so notifications can be tested offline,
+optionally injecting latency, 429 rate limits, 5xx errors and dropped responses
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+class SlackStub:
+    """In-memory record of everything posted, shared by all handler threads"""
+
+    def __init__(self, token: Optional[str] = None, latency: float = 0.0, jitter: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, error_rate: float = 0.0,
+                 drop_rate: float = 0.0, seed: Optional[int] = None):
+        self.token = token
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.messages: List[Dict] = []
+        self.stats: Dict[str, int] = {}
+        self.next_ts = int(time.time()) * 1000000
+
+    def delay(self) -> float:
+        with self.lock:
+            return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def fault(self) -> Optional[str]:
+        """Pick the injected fault for one post: 'throttle', 'error', 'drop' or None"""
+        with self.lock:
+            self.stats['requests'] = self.stats.get('requests', 0) + 1
+            roll = self.random.random()
+            for name, rate in (('throttle', self.throttle_rate), ('error', self.error_rate),
+                               ('drop', self.drop_rate)):
+                if roll < rate:
+                    self.stats[name] = self.stats.get(name, 0) + 1
+                    return name
+                roll -= rate
+            return None
+
+    def post(self, kind: str, body: Dict, channel: str = "webhook") -> str:
+        with self.lock:
+            self.next_ts += 1
+            ts = f"{self.next_ts // 1000000}.{self.next_ts % 1000000:06d}"
+            self.messages.append({
+                'kind': kind,
+                'channel': channel,
+                'ts': ts,
+                'thread_ts': body.get('thread_ts'),
+                'text': body.get('text', ''),
+                'blocks': len(body.get('blocks', [])),
+                'parts': body_parts(body),
+                'received': time.time(),
+            })
+            return ts
+
+    def threads(self) -> Dict[str, int]:
+        """Replies per parent ts"""
+        with self.lock:
+            counts: Dict[str, int] = {}
+            for message in self.messages:
+                if message['thread_ts']:
+                    counts[message['thread_ts']] = counts.get(message['thread_ts'], 0) + 1
+            return counts
+
+    def reset(self) -> None:
+        with self.lock:
+            self.messages = []
+            self.stats = {}
+
+
+def body_parts(body: Dict) -> List[str]:
+    """Text of each message a post carries; merged posts separate their messages with dividers"""
+    blocks = body.get('blocks') or []
+    if not blocks:
+        parts = [body.get('text', '')]
+        parts.extend(a.get('text', '') for a in body.get('attachments', []) if isinstance(a, dict))
+        return ['\n'.join(p for p in parts if p)]
+    messages = [[]]
+    for block in blocks:
+        if block.get('type') == 'divider':
+            messages.append([])
+        elif isinstance(block.get('text'), dict):
+            messages[-1].append(block['text'].get('text', ''))
+    messages[-1].extend(a.get('text', '') for a in body.get('attachments', []) if isinstance(a, dict))
+    return ['\n'.join(m) for m in messages]
+
+
+def make_handler(stub: SlackStub):
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 so clients can keep connections alive; without TCP_NODELAY the separate
+        # header and body writes stall on delayed ACKs for reused connections
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, body, content_type: str = "application/json",
+                   headers: Optional[Dict[str, str]] = None) -> None:
+            data = body if isinstance(body, bytes) else (
+                json.dumps(body) if not isinstance(body, str) else body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> Optional[Dict]:
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                return json.loads(raw or b"{}")
+            except json.JSONDecodeError:
+                return None
+
+        def do_GET(self):
+            if self.path == "/messages":
+                with stub.lock:
+                    self._reply(200, list(stub.messages))
+            elif self.path == "/threads":
+                self._reply(200, stub.threads())
+            elif self.path == "/stats":
+                with stub.lock:
+                    self._reply(200, {**stub.stats, 'messages': len(stub.messages)})
+            else:
+                self._reply(404, "not found", "text/plain")
+
+        def do_POST(self):
+            body = self._body()
+            if self.path == "/reset":
+                stub.reset()
+                self._reply(200, {"ok": True})
+                return
+            webhook = self.path.startswith("/services/") or self.path.startswith("/hook")
+            if not webhook and not self.path.startswith("/api/chat.postMessage"):
+                self._reply(404, "not found", "text/plain")
+                return
+
+            delay = stub.delay()
+            if delay:
+                time.sleep(delay)
+            fault = stub.fault()
+            if fault == 'throttle':
+                self._reply(429, "rate_limited", "text/plain",
+                            {"Retry-After": f"{stub.retry_after:g}"})
+                return
+            if fault == 'error':
+                self._reply(503, "service_unavailable", "text/plain")
+                return
+
+            if webhook:
+                # Incoming webhooks answer with plain-text "ok" or an error string
+                if body is None or not (body.get('text') or body.get('blocks')):
+                    self._reply(400, "invalid_payload", "text/plain")
+                    return
+                stub.post("webhook", body)
+                reply = (200, "ok", "text/plain")
+            else:
+                reply = self._chat_post_message(body)
+            if fault == 'drop':
+                # Accepted but the response never arrives, like a timeout after Slack posted
+                self.close_connection = True
+                return
+            self._reply(*reply)
+
+        def _chat_post_message(self, body: Optional[Dict]) -> Tuple[int, Dict]:
+            auth = self.headers.get("Authorization", "")
+            if not auth.startswith("Bearer ") or (stub.token and auth[7:] != stub.token):
+                return 200, {"ok": False, "error": "invalid_auth"}
+            if body is None:
+                return 200, {"ok": False, "error": "invalid_json"}
+            if not body.get('channel'):
+                return 200, {"ok": False, "error": "channel_not_found"}
+            if not (body.get('text') or body.get('blocks')):
+                return 200, {"ok": False, "error": "no_text"}
+            ts = stub.post("chat", body, body['channel'])
+            return 200, {"ok": True, "channel": body['channel'], "ts": ts}
+
+    return Handler
+
+
+def serve(host: str, port: int, stub: SlackStub) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for Slack webhooks and chat.postMessage")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", help="Bot token chat.postMessage must present")
+    parser.add_argument("--latency", type=float, default=0.0, help="Milliseconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra random milliseconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of posts answered 429 with Retry-After")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of posts answered 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="Fraction of posts accepted but closed without a response")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible fault injection")
+    args = parser.parse_args()
+
+    stub = SlackStub(args.token, args.latency / 1000, args.jitter / 1000, args.throttle_rate,
+                     args.retry_after, args.error_rate, args.drop_rate, args.seed)
+    server = serve(args.host, args.port, stub)
+    base = f"http://{args.host}:{server.server_address[1]}"
+    print(f"🧪 Slack stub listening on {base}", flush=True)
+    print(f"   export SLACK_WEBHOOK_URL={base}/services/T000/B000/XXXX")
+    print(f"   export SLACK_API_BASE={base}/api SLACK_BOT_TOKEN={args.token or 'xoxb-test'} SLACK_CHANNEL=C0TEST")
+    print(f"   GET {base}/messages, {base}/threads and {base}/stats to inspect what was posted")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,857 @@
+#!/usr/bin/env python3
+"""
+Slack Delivery Queue for Multi-Agent Squad
+Spools notifications in SQLite and flushes them with rate limiting, retries and merging
+"""
+
+import os
+import re
+import ssl
+import sys
+import json
+import time
+import fcntl
+import asyncio
+import hashlib
+import sqlite3
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+SPOOL_PATH = Path(".claude/cache/slack-spool.db")
+DEAD_LETTER_PATH = Path(".claude/cache/slack-dead-letter.jsonl")
+FLUSHER_LOCK = Path(".claude/cache/slack-flusher.lock")
+CONFIG_PATH = Path(".claude/integrations/slack.json")
+ENV_PATH = Path(".env.slack")
+
+# Incoming webhooks allow roughly one message per second
+RATE = 1.0
+BURST = 1
+MAX_ATTEMPTS = 8
+MAX_BACKOFF = 300.0
+MAX_BLOCKS = 50          # Slack's per-message block limit
+MAX_SECTION_CHARS = 3000  # Slack's per-section text limit
+MAX_MERGE = 20
+IDLE_EXIT = 30.0
+POLL_INTERVAL = 0.2
+HTTP_TIMEOUT = 10.0
+# Requests in flight across all targets, and pooled keep-alive connections per host
+MAX_IN_FLIGHT = 8
+MAX_PER_HOST = 4
+# Repeats of the same notification within this many seconds are folded into one summary
+AGGREGATION_WINDOW = 300.0
+# Bot-token mode: feature/PR/branch -> thread_ts entries unused for this long are evicted
+THREAD_TTL = 7 * 24 * 3600.0
+API_BASE = "https://slack.com/api"
+# Branches that get no thread of their own
+SHARED_BRANCHES = {'main', 'master', 'develop', 'HEAD'}
+
+# chat.postMessage errors that retrying cannot fix
+BOT_CONFIG_ERRORS = {'channel_not_found', 'not_in_channel', 'is_archived', 'invalid_auth',
+                     'not_authed', 'account_inactive', 'token_revoked', 'missing_scope'}
+BOT_RETRY_ERRORS = {'internal_error', 'fatal_error', 'service_unavailable', 'request_timeout'}
+
+# Volatile tokens (counts, durations, hashes, addresses) removed before fingerprinting
+NORMALIZE_RE = re.compile(r'0x[0-9a-f]+|[0-9a-f]{8,}|\d+(?:[.:]\d+)*', re.IGNORECASE)
+ERROR_LINE_RE = re.compile(r'\b\w*(?:Error|Exception)\b.*|\b(?:FAILED|failed|fatal)\b.*')
+
+
+def load_config() -> Dict:
+    """Slack config from the config snapshot (or JSON) with the webhook from .env.slack"""
+    config = None
+    try:
+        from hook_config import load_integration
+        config = load_integration("slack")
+    except ImportError:
+        pass
+    if config is None:
+        try:
+            with open(CONFIG_PATH) as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            config = {}
+    if ENV_PATH.exists():
+        with open(ENV_PATH) as f:
+            for line in f:
+                if line.startswith("SLACK_WEBHOOK_URL="):
+                    config['webhook_url'] = line.split("=", 1)[1].strip()
+                elif line.startswith("SLACK_BOT_TOKEN="):
+                    config['bot_token'] = line.split("=", 1)[1].strip()
+    # Environment overrides make it easy to point at a local stub
+    for key, env in (('webhook_url', "SLACK_WEBHOOK_URL"), ('bot_token', "SLACK_BOT_TOKEN"),
+                     ('api_base', "SLACK_API_BASE"), ('channel', "SLACK_CHANNEL")):
+        if os.environ.get(env):
+            config[key] = os.environ[env]
+    return config
+
+
+def default_thread_key() -> Optional[str]:
+    """Thread per feature branch; CLAUDE_THREAD_KEY (e.g. pr-123) takes precedence"""
+    if os.environ.get("CLAUDE_THREAD_KEY"):
+        return os.environ["CLAUDE_THREAD_KEY"]
+    try:
+        branch = subprocess.run(["git", "rev-parse", "--abbrev-ref", "HEAD"], capture_output=True,
+                                text=True, timeout=2).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return f"branch:{branch}" if branch and branch not in SHARED_BRANCHES else None
+
+
+class SlackSpool:
+    """Durable FIFO of pending payloads; every notifier process appends, one flusher drains"""
+
+    def __init__(self, path: Path = SPOOL_PATH):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                target TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL,
+                next_attempt REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                solo INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                thread_key TEXT
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS messages_due ON messages (next_attempt)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS aggregates (
+                fingerprint TEXT PRIMARY KEY,
+                target TEXT NOT NULL,
+                text TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                window_end REAL NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                sample_error TEXT,
+                thread_key TEXT
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS threads (
+                key TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                thread_ts TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (key, channel)
+            )""")
+
+    def enqueue(self, payload: Dict, target: str = "default", thread_key: Optional[str] = None) -> int:
+        now = time.time()
+        cursor = self.db.execute(
+            "INSERT INTO messages (target, payload, created, next_attempt, thread_key) VALUES (?, ?, ?, ?, ?)",
+            (target, json.dumps(payload), now, now, thread_key))
+        return cursor.lastrowid
+
+    def aggregate(self, fingerprint: str, target: str, text: str, error: Optional[str],
+                  window: float, thread_key: Optional[str] = None) -> bool:
+        """Count a repeat inside an open window; returns False when the message should be sent"""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT window_end FROM aggregates WHERE fingerprint = ?",
+                                  (fingerprint,)).fetchone()
+            if row and row[0] > now:
+                self.db.execute(
+                    "UPDATE aggregates SET count = count + 1, last_seen = ?, "
+                    "sample_error = COALESCE(?, sample_error) WHERE fingerprint = ?",
+                    (now, error, fingerprint))
+                self.db.execute("COMMIT")
+                return True
+            if row:
+                self._close_window(fingerprint, now, window)
+                if self.db.execute("SELECT 1 FROM aggregates WHERE fingerprint = ?", (fingerprint,)).fetchone():
+                    # The expired window had repeats, so this one is already inside the next window
+                    self.db.execute(
+                        "UPDATE aggregates SET count = 1, first_seen = ?, last_seen = ?, sample_error = ? "
+                        "WHERE fingerprint = ?", (now, now, error, fingerprint))
+                    self.db.execute("COMMIT")
+                    return True
+            self.db.execute(
+                "INSERT INTO aggregates (fingerprint, target, text, first_seen, last_seen, window_end, "
+                "sample_error, thread_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint, target, text, now, now, now + window, error, thread_key))
+            self.db.execute("COMMIT")
+            return False
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def close_windows(self, now: float, window: float) -> None:
+        """Turn every expired window with repeats into a summary message"""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            expired = self.db.execute("SELECT fingerprint FROM aggregates WHERE window_end <= ?",
+                                      (now,)).fetchall()
+            for (fingerprint,) in expired:
+                self._close_window(fingerprint, now, window)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def _close_window(self, fingerprint: str, now: float, window: float) -> None:
+        target, text, first_seen, last_seen, count, error, thread_key = self.db.execute(
+            "SELECT target, text, first_seen, last_seen, count, sample_error, thread_key FROM aggregates "
+            "WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        if not count:
+            self.db.execute("DELETE FROM aggregates WHERE fingerprint = ?", (fingerprint,))
+            return
+        self.enqueue(summary_payload(text, count, first_seen, last_seen, error), target, thread_key)
+        # Keep aggregating while the incident lasts: one summary per window
+        self.db.execute(
+            "UPDATE aggregates SET count = 0, first_seen = ?, last_seen = ?, window_end = ?, "
+            "sample_error = NULL WHERE fingerprint = ?", (now, now, now + window, fingerprint))
+
+    def open_windows(self) -> Tuple[int, Optional[float]]:
+        """Windows holding repeats that still need a summary, and the earliest to close"""
+        return self.db.execute("SELECT COUNT(*), MIN(window_end) FROM aggregates WHERE count > 0").fetchone()
+
+    def due(self, now: float, limit: int = 500) -> List[Dict]:
+        rows = self.db.execute(
+            "SELECT id, target, payload, created, attempts, solo, thread_key FROM messages "
+            "WHERE next_attempt <= ? ORDER BY id LIMIT ?", (now, limit)).fetchall()
+        return [{'id': r[0], 'target': r[1], 'payload': json.loads(r[2]), 'created': r[3],
+                 'attempts': r[4], 'solo': bool(r[5]), 'thread_key': r[6]} for r in rows]
+
+    def next_due(self) -> Optional[float]:
+        return self.db.execute("SELECT MIN(next_attempt) FROM messages").fetchone()[0]
+
+    def pending(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def queued(self, message_id: int) -> bool:
+        return self.db.execute("SELECT 1 FROM messages WHERE id = ?", (message_id,)).fetchone() is not None
+
+    def delete(self, ids: List[int]) -> None:
+        self.db.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in ids])
+
+    def defer(self, ids: List[int], until: float, error: str, count_attempt: bool = True) -> None:
+        self.db.executemany(
+            "UPDATE messages SET next_attempt = ?, last_error = ?, attempts = attempts + ? WHERE id = ?",
+            [(until, error, int(count_attempt), i) for i in ids])
+
+    def mark_solo(self, ids: List[int]) -> None:
+        """Send these one at a time next round to find the message Slack rejects"""
+        self.db.executemany("UPDATE messages SET solo = 1 WHERE id = ?", [(i,) for i in ids])
+
+    def dead_letter(self, rows: List[Dict], reason: str, path: Path = DEAD_LETTER_PATH) -> None:
+        with open(path, 'a') as f:
+            for row in rows:
+                f.write(json.dumps({'ts': time.time(), 'id': row['id'], 'reason': reason, 'target': row['target'],
+                                    'thread_key': row.get('thread_key'), 'attempts': row['attempts'],
+                                    'payload': row['payload']}) + "\n")
+        self.delete([row['id'] for row in rows])
+
+    def thread_ts(self, key: str, channel: str, ttl: float) -> Optional[str]:
+        """Primary-key lookup of the thread for a feature; stale entries count as missing"""
+        row = self.db.execute("SELECT thread_ts, last_used FROM threads WHERE key = ? AND channel = ?",
+                              (key, channel)).fetchone()
+        if row is None:
+            return None
+        if row[1] < time.time() - ttl:
+            self.db.execute("DELETE FROM threads WHERE key = ? AND channel = ?", (key, channel))
+            return None
+        return row[0]
+
+    def remember_thread(self, key: str, channel: str, thread_ts: str) -> None:
+        self.db.execute(
+            "INSERT INTO threads (key, channel, thread_ts, last_used) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key, channel) DO UPDATE SET thread_ts = excluded.thread_ts, "
+            "last_used = excluded.last_used", (key, channel, thread_ts, time.time()))
+
+    def touch_thread(self, key: str, channel: str) -> None:
+        self.db.execute("UPDATE threads SET last_used = ? WHERE key = ? AND channel = ?",
+                        (time.time(), key, channel))
+
+    def evict_threads(self, ttl: float) -> int:
+        return self.db.execute("DELETE FROM threads WHERE last_used < ?", (time.time() - ttl,)).rowcount
+
+
+class TokenBucket:
+    """Classic token bucket; `block` empties it for a server-supplied Retry-After"""
+
+    def __init__(self, rate: float = RATE, burst: int = BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        self._refill()
+        wait = max(0.0, self.blocked_until - time.monotonic())
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = time.monotonic() + seconds
+        self.tokens = 0.0
+
+
+def fingerprint(template: Optional[str], text: str, error: Optional[str],
+                thread_key: Optional[str] = None) -> str:
+    """Template + normalized text + error signature (first error-looking line), per thread"""
+    signature = ''
+    if error:
+        match = ERROR_LINE_RE.search(error)
+        signature = match.group(0) if match else error.strip().splitlines()[0] if error.strip() else ''
+    parts = [thread_key or '', template or '', NORMALIZE_RE.sub('#', text.strip().lower()),
+             NORMALIZE_RE.sub('#', signature.strip().lower())]
+    return hashlib.sha1('\0'.join(parts).encode()).hexdigest()
+
+
+def summary_payload(text: str, count: int, first_seen: float, last_seen: float,
+                    error: Optional[str]) -> Dict:
+    first = time.strftime('%H:%M:%S', time.localtime(first_seen))
+    last = time.strftime('%H:%M:%S', time.localtime(last_seen))
+    payload = {
+        "text": f"🔁 Repeated {count}× more: {text}",
+        "blocks": [
+            {"type": "section", "text": {"type": "mrkdwn", "text": f"🔁 *Repeated {count}× more:* {text}"[:MAX_SECTION_CHARS]}},
+            {"type": "context", "elements": [{"type": "mrkdwn", "text": f"first seen {first} · last seen {last}"}]},
+        ],
+    }
+    if error:
+        payload['attachments'] = [{"color": "danger", "text": f"```{error[:500]}```"}]
+    return payload
+
+
+def payload_blocks(payload: Dict) -> List[Dict]:
+    """Express a single payload (text, blocks, error attachments) as blocks"""
+    blocks = list(payload.get('blocks') or [])
+    if not blocks and payload.get('text'):
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": payload['text'][:MAX_SECTION_CHARS]}})
+    for attachment in payload.get('attachments', []):
+        text = attachment.get('text')
+        if text:
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": text[:MAX_SECTION_CHARS]}})
+    return blocks
+
+
+def merge_payloads(payloads: List[Dict]) -> Dict:
+    """Combine queued messages into one multi-block message"""
+    if len(payloads) == 1:
+        return payloads[0]
+    blocks: List[Dict] = []
+    for payload in payloads:
+        if blocks:
+            blocks.append({"type": "divider"})
+        blocks.extend(payload_blocks(payload))
+    first = payloads[0].get('text', '')
+    return {"text": f"{first} (+{len(payloads) - 1} more)", "blocks": blocks[:MAX_BLOCKS]}
+
+
+def select_batch(rows: List[Dict]) -> List[Dict]:
+    """Take leading rows whose blocks (plus dividers) fit in one message"""
+    if rows[0]['solo']:
+        return rows[:1]
+    batch, blocks = [], 0
+    for row in rows[:MAX_MERGE]:
+        # Messages for different threads cannot share a post
+        if row['solo'] or row['thread_key'] != rows[0]['thread_key']:
+            break
+        size = len(payload_blocks(row['payload'])) + (1 if batch else 0)
+        if batch and blocks + size > MAX_BLOCKS:
+            break
+        batch.append(row)
+        blocks += size
+    return batch
+
+
+class AsyncHttpClient:
+    """Minimal HTTP/1.1 client over asyncio streams with pooled keep-alive connections per host"""
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT, max_in_flight: int = MAX_IN_FLIGHT,
+                 max_per_host: int = MAX_PER_HOST):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.window = asyncio.Semaphore(max_in_flight)
+        self.host_slots: Dict[Tuple, asyncio.Semaphore] = {}
+        self.idle: Dict[Tuple, List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self.ssl_context = ssl.create_default_context()
+        self.connections_opened = 0
+
+    async def post(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> Tuple[int, Dict, str]:
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        key = (parts.scheme, parts.hostname, parts.port or (443 if https else 80))
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        body = json.dumps(payload).encode()
+        lines = [f"POST {path} HTTP/1.1", f"Host: {parts.netloc}", "Content-Type: application/json",
+                 f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+        slots = self.host_slots.setdefault(key, asyncio.Semaphore(self.max_per_host))
+        async with self.window, slots:
+            for attempt in range(2):
+                reused = bool(self.idle.get(key))
+                reader, writer = self.idle[key].pop() if reused else await self._connect(key, https)
+                try:
+                    status, response_headers, text, keep = await asyncio.wait_for(
+                        self._exchange(reader, writer, request), self.timeout)
+                except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                    writer.close()
+                    # A pooled connection the server already closed fails once; a fresh one is the real test
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                if keep:
+                    self.idle.setdefault(key, []).append((reader, writer))
+                else:
+                    writer.close()
+                return status, response_headers, text
+        raise RuntimeError("unreachable")
+
+    async def _connect(self, key: Tuple, https: bool):
+        self.connections_opened += 1
+        return await asyncio.wait_for(asyncio.open_connection(
+            key[1], key[2], ssl=self.ssl_context if https else None), self.timeout)
+
+    @staticmethod
+    async def _exchange(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        request: bytes) -> Tuple[int, Dict, str, bool]:
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by server")
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            headers['connection'] = 'close'
+        keep = version == "HTTP/1.1" and headers.get('connection', '').lower() != 'close'
+        return int(status), headers, body.decode('utf-8', 'replace'), keep
+
+    async def close(self) -> None:
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle = {}
+
+
+def retry_after(headers: Dict, default: float = 1.0) -> float:
+    try:
+        return max(0.0, float(headers.get('retry-after', default)))
+    except ValueError:
+        return default
+
+
+class SlackFlusher:
+    """Drains the spool on one event loop: targets are sent concurrently, each target
+    one rate-limited, merged post at a time"""
+
+    def __init__(self, spool: SlackSpool, config: Optional[Dict] = None, idle_exit: float = IDLE_EXIT):
+        self.spool = spool
+        self.config = config if config is not None else load_config()
+        self.idle_exit = idle_exit
+        self.window = float(self.config.get('aggregation_window', AGGREGATION_WINDOW))
+        self.bot_token = self.config.get('bot_token')
+        self.threads = bool(self.config.get('preferences', {}).get('thread_messages'))
+        self.thread_ttl = float(self.config.get('thread_ttl', THREAD_TTL))
+        self.evicted_at = 0.0
+        self.max_in_flight = int(self.config.get('max_in_flight', MAX_IN_FLIGHT))
+        self.client: Optional[AsyncHttpClient] = None
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.busy_targets: set = set()
+        self.in_flight: set = set()
+        self.tasks: set = set()
+        self.delivered: List[int] = []
+        self.failed: List[int] = []
+
+    def resolve(self, target: str) -> Optional[str]:
+        if target == "default":
+            return self.config.get('webhook_url')
+        return self.config.get('webhooks', {}).get(target)
+
+    def resolve_channel(self, target: str) -> Optional[str]:
+        if target == "default":
+            return self.config.get('channel')
+        return self.config.get('channels', {}).get(target)
+
+    def run(self) -> None:
+        asyncio.run(self.drain())
+
+    async def drain(self, until_id: Optional[int] = None, deadline: Optional[float] = None) -> None:
+        """Flush until idle for idle_exit seconds, or until message `until_id` is settled"""
+        self.client = AsyncHttpClient(max_in_flight=self.max_in_flight)
+        idle_since = time.monotonic()
+        try:
+            while True:
+                if until_id is not None and (until_id in self.delivered or until_id in self.failed):
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    break
+                wait = self.dispatch()
+                if self.tasks:
+                    idle_since = time.monotonic()
+                    done, self.tasks = await asyncio.wait(
+                        self.tasks, timeout=min(wait if wait is not None else 1.0, 1.0),
+                        return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                    continue
+                if wait is None:
+                    if until_id is not None or time.monotonic() - idle_since >= self.idle_exit:
+                        break
+                    wait = min(1.0, self.idle_exit)
+                else:
+                    idle_since = time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(min(wait, 1.0))
+            if self.tasks:
+                await asyncio.wait(self.tasks)
+        finally:
+            await self.client.close()
+
+    def dispatch(self) -> Optional[float]:
+        """Start a send for every idle target with a token; return seconds until more work,
+        or None when nothing is pending"""
+        now = time.time()
+        self.spool.close_windows(now, self.window)
+        if self.bot_token and self.threads and now - self.evicted_at > 3600:
+            self.spool.evict_threads(self.thread_ttl)
+            self.evicted_at = now
+        rows = [row for row in self.spool.due(now) if row['id'] not in self.in_flight]
+        if not rows:
+            waits = [t for t in (self.spool.next_due(), self.spool.open_windows()[1]) if t is not None]
+            if not waits:
+                return None if not self.tasks else 1.0
+            return max(0.0, min(waits) - now)
+
+        by_target: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_target.setdefault(row['target'], []).append(row)
+
+        wait = float('inf')
+        for target, target_rows in by_target.items():
+            if target in self.busy_targets:
+                continue
+            bucket = self.buckets.setdefault(target, TokenBucket(
+                self.config.get('rate_per_second', RATE), self.config.get('burst', BURST)))
+            delay = bucket.wait_time()
+            if delay > 0:
+                wait = min(wait, delay)
+                continue
+            bucket.take()
+            batch = select_batch(target_rows)
+            self.busy_targets.add(target)
+            self.in_flight.update(row['id'] for row in batch)
+            self.tasks.add(asyncio.ensure_future(self._send(target, batch, bucket)))
+            wait = 0.0
+        return wait if wait != float('inf') else 1.0
+
+    async def _send(self, target: str, batch: List[Dict], bucket: TokenBucket) -> None:
+        ids = [row['id'] for row in batch]
+        payload = merge_payloads([r['payload'] for r in batch])
+        try:
+            if self.bot_token:
+                outcome, detail = await self._post_bot(target, payload, batch[0]['thread_key'])
+            else:
+                outcome, detail = await self._post_webhook(target, payload)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+            outcome, detail = 'retry', f"network {e!r}"
+        finally:
+            self.busy_targets.discard(target)
+            self.in_flight.difference_update(ids)
+
+        if outcome == 'ok':
+            self.spool.delete(ids)
+            self.delivered.extend(ids)
+        elif outcome == 'rate_limited':
+            # Not the messages' fault, so the attempt is not counted
+            bucket.block(detail)
+            self.spool.defer(ids, time.time() + detail, "rate limited", count_attempt=False)
+        elif outcome == 'rejected' and len(batch) > 1:
+            self.spool.mark_solo(ids)
+        elif outcome in ('rejected', 'config'):
+            self.spool.dead_letter(batch, detail)
+            self.failed.extend(ids)
+        else:
+            self._retry_later(batch, detail)
+
+    async def _post_webhook(self, target: str, payload: Dict) -> Tuple[str, object]:
+        url = self.resolve(target)
+        if not url:
+            return 'config', f"no webhook configured for target '{target}'"
+        status, headers, body = await self.client.post(url, payload)
+        if status == 200:
+            return 'ok', None
+        if status == 429:
+            return 'rate_limited', retry_after(headers)
+        if 400 <= status < 500:
+            return 'rejected', f"{status} {body[:200]}"
+        return 'retry', f"{status} {body[:200]}"
+
+    async def _post_bot(self, target: str, payload: Dict, thread_key: Optional[str]) -> Tuple[str, object]:
+        """chat.postMessage; the first message for a thread key starts the thread"""
+        channel = self.resolve_channel(target)
+        if not channel:
+            return 'config', f"no channel configured for target '{target}'"
+        thread_key = thread_key if self.threads else None
+        thread_ts = self.spool.thread_ts(thread_key, channel, self.thread_ttl) if thread_key else None
+        body = {**payload, 'channel': channel}
+        if thread_ts:
+            body['thread_ts'] = thread_ts
+
+        url = self.config.get('api_base', API_BASE).rstrip('/') + "/chat.postMessage"
+        status, headers, text = await self.client.post(
+            url, body, {"Authorization": f"Bearer {self.bot_token}"})
+        if status == 429:
+            return 'rate_limited', retry_after(headers)
+        if status != 200:
+            return 'retry', f"{status} {text[:200]}"
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            return 'retry', f"invalid response {text[:200]}"
+
+        if data.get('ok'):
+            if thread_key and thread_ts:
+                self.spool.touch_thread(thread_key, channel)
+            elif thread_key and data.get('ts'):
+                self.spool.remember_thread(thread_key, channel, data['ts'])
+            return 'ok', None
+        error = data.get('error', 'unknown_error')
+        if error == 'ratelimited':
+            return 'rate_limited', retry_after(headers)
+        if error in BOT_CONFIG_ERRORS:
+            return 'config', error
+        if error in BOT_RETRY_ERRORS:
+            return 'retry', error
+        return 'rejected', error
+
+    def _retry_later(self, batch: List[Dict], error: str) -> None:
+        poison = [row for row in batch if row['attempts'] + 1 >= MAX_ATTEMPTS]
+        if poison:
+            self.spool.dead_letter(poison, f"gave up after {MAX_ATTEMPTS} attempts: {error}")
+            self.failed.extend(row['id'] for row in poison)
+        for row in batch:
+            if row in poison:
+                continue
+            backoff = min(MAX_BACKOFF, 2.0 ** row['attempts'])
+            self.spool.defer([row['id']], time.time() + backoff, error)
+
+
+def _try_lock(path: Path = FLUSHER_LOCK) -> Optional[int]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+
+def run_flusher(idle_exit: float = IDLE_EXIT) -> None:
+    """Flush until idle; only one flusher runs per project"""
+    fd = _try_lock()
+    if fd is None:
+        return
+    spool = SlackSpool()
+    while True:
+        SlackFlusher(spool, idle_exit=idle_exit).run()
+        os.close(fd)
+        # A notifier may have enqueued after our last check while it saw the lock held
+        if not spool.pending():
+            return
+        fd = _try_lock()
+        if fd is None:
+            return
+
+
+def ensure_flusher() -> None:
+    """Start a background flusher unless one is already running"""
+    fd = _try_lock()
+    if fd is None:
+        return
+    os.close(fd)
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), "flush"],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+
+def _dead_lettered(message_id: int, path: Path = DEAD_LETTER_PATH) -> bool:
+    if not path.exists():
+        return False
+    with open(path) as f:
+        return any(json.loads(line).get('id') == message_id for line in f)
+
+
+def deliver(payload: Dict, target: str = "default", wait: bool = False,
+            template: Optional[str] = None, error: Optional[str] = None,
+            window: Optional[float] = None, thread_key: Optional[str] = None) -> bool:
+    """Spool a payload for delivery; with wait=True flush in-process and report the outcome
+
+    Repeats of the same notification inside the aggregation window are only counted;
+    the flusher sends one summary for them when the window closes. In bot-token mode
+    messages with the same thread_key are posted as replies in one thread.
+    """
+    spool = SlackSpool()
+    if window is None:
+        window = float(load_config().get('aggregation_window', AGGREGATION_WINDOW))
+    if window > 0:
+        text = payload.get('text', '')
+        key = fingerprint(template, text, error, thread_key)
+        if spool.aggregate(key, target, text, error, window, thread_key):
+            ensure_flusher()
+            return True
+    message_id = spool.enqueue(payload, target, thread_key)
+    if not wait:
+        ensure_flusher()
+        return True
+    deadline = time.monotonic() + 30
+    fd = _try_lock()
+    if fd is None:
+        # A background flusher owns the spool; wait for it to settle the message
+        while spool.queued(message_id) and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+        return not spool.queued(message_id) and not _dead_lettered(message_id)
+    try:
+        flusher = SlackFlusher(spool, idle_exit=0)
+        asyncio.run(flusher.drain(until_id=message_id, deadline=deadline))
+        return message_id in flusher.delivered
+    finally:
+        os.close(fd)
+        if spool.pending():
+            ensure_flusher()
+
+
+def status() -> None:
+    spool = SlackSpool()
+    pending = spool.pending()
+    next_due = spool.next_due()
+    windows, _ = spool.open_windows()
+    dead = 0
+    if DEAD_LETTER_PATH.exists():
+        with open(DEAD_LETTER_PATH) as f:
+            dead = sum(1 for _ in f)
+    print(f"📬 Slack spool: {pending} pending, {windows} aggregating, {dead} dead-lettered")
+    if next_due is not None:
+        print(f"   next attempt in {max(0.0, next_due - time.time()):.1f}s")
+    running = _try_lock()
+    if running is None:
+        print("   flusher running")
+    else:
+        os.close(running)
+
+
+def requeue_dead() -> None:
+    """Move dead-lettered messages back into the spool"""
+    if not DEAD_LETTER_PATH.exists():
+        print("No dead-lettered messages")
+        return
+    spool = SlackSpool()
+    count = 0
+    with open(DEAD_LETTER_PATH) as f:
+        for line in f:
+            entry = json.loads(line)
+            spool.enqueue(entry['payload'], entry.get('target', 'default'), entry.get('thread_key'))
+            count += 1
+    DEAD_LETTER_PATH.unlink()
+    ensure_flusher()
+    print(f"♻️  Requeued {count} messages")
+
+
+def bench(url: Optional[str], count: int, webhooks: int, in_flight: int, latency: float) -> None:
+    """Compare one-connection-per-message posting with the pooled async client"""
+    import urllib.request
+
+    stub = None
+    if url is None:
+        stub_script = Path(__file__).resolve().parent / "slack-stub.py"
+        stub = subprocess.Popen([sys.executable, "-u", str(stub_script), "--port", "0",
+                                 "--latency", str(latency)], stdout=subprocess.PIPE, text=True)
+        url = stub.stdout.readline().split()[-1]
+    urls = [f"{url.rstrip('/')}/services/T0/B{i}/bench" for i in range(webhooks)]
+    payload = {"text": "benchmark message"}
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            request = urllib.request.Request(urls[i % webhooks], data=json.dumps(payload).encode(),
+                                             headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+                response.read()
+        baseline = time.perf_counter() - start
+
+        async def pooled() -> AsyncHttpClient:
+            client = AsyncHttpClient(max_in_flight=in_flight)
+            await asyncio.gather(*(client.post(urls[i % webhooks], payload) for i in range(count)))
+            await client.close()
+            return client
+
+        start = time.perf_counter()
+        client = asyncio.run(pooled())
+        elapsed = time.perf_counter() - start
+    finally:
+        if stub:
+            stub.terminate()
+
+    print(f"\n📊 Slack transport benchmark: {count} messages over {webhooks} webhooks")
+    print(f"  new connection per message: {count / baseline:8.1f} msg/s  ({count} connections)")
+    print(f"  pooled async, {in_flight} in flight: {count / elapsed:8.1f} msg/s  "
+          f"({client.connections_opened} connections)")
+    print(f"  speedup: {baseline / elapsed:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slack delivery spool")
+    parser.add_argument("action", choices=["flush", "status", "requeue-dead", "bench"])
+    parser.add_argument("--idle-exit", type=float, default=IDLE_EXIT,
+                        help="Seconds the flusher waits for new messages before exiting")
+    parser.add_argument("--url", help="bench: stub base URL (default: start scripts/slack-stub.py)")
+    parser.add_argument("--count", type=int, default=200, help="bench: messages to send")
+    parser.add_argument("--webhooks", type=int, default=4, help="bench: webhooks to spread messages over")
+    parser.add_argument("--in-flight", type=int, default=MAX_IN_FLIGHT, help="bench: concurrent requests")
+    parser.add_argument("--latency", type=float, default=20.0, help="bench: stub latency in ms")
+    args = parser.parse_args()
+
+    if args.action == "flush":
+        run_flusher(args.idle_exit)
+    elif args.action == "status":
+        status()
+    elif args.action == "bench":
+        bench(args.url, args.count, args.webhooks, args.in_flight, args.latency)
+    else:
+        requeue_dead()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Test Impact Analysis for Multi-Agent Squad
+Keeps an import graph of Python and JS/TS sources and runs only affected tests
+"""
+
+import os
+import re
+import ast
+import sys
+import json
+import argparse
+import subprocess
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from hook_runtime import event_file_paths
+
+CACHE_PATH = Path(".claude/cache/test-impact.json")
+CACHE_VERSION = 2
+
+PY_EXTENSIONS = ('.py',)
+JS_EXTENSIONS = ('.ts', '.tsx', '.js', '.jsx', '.mjs', '.cjs')
+SKIP_DIRS = {'.git', 'node_modules', '.venv', 'venv', '__pycache__', 'dist', 'build',
+             '.claude', '.tox', '.mypy_cache', '.pytest_cache', 'coverage'}
+
+# Python package roots tried when resolving absolute imports
+PY_ROOTS = ('', 'src', 'lib')
+
+JS_IMPORT_RE = re.compile(
+    r"""(?:import|export)\s[^'"]*?from\s*['"]([^'"]+)['"]"""
+    r"""|import\s*['"]([^'"]+)['"]"""
+    r"""|(?:require|import)\s*\(\s*['"]([^'"]+)['"]\s*\)"""
+)
+
+
+def is_test_file(path: str) -> bool:
+    """Recognise pytest, jest and vitest test file conventions"""
+    name = path.rsplit('/', 1)[-1]
+    parts = path.split('/')
+    if name.endswith(PY_EXTENSIONS):
+        # pytest's default python_files; helpers and fixtures under tests/ are not tests
+        return name.startswith('test_') or name.endswith('_test.py')
+    if name.endswith(JS_EXTENSIONS):
+        return '.test.' in name or '.spec.' in name or '__tests__' in parts[:-1]
+    return False
+
+
+def module_stem(rel: str) -> str:
+    """The import target a file satisfies: its path without extension, or its package for __init__"""
+    stem = rel.rsplit('.', 1)[0]
+    return stem[:-len('/__init__')] if stem.endswith('/__init__') else stem
+
+
+class ImportGraph:
+    """Persistent file -> imports graph with a reverse index for impact queries"""
+
+    def __init__(self, root: Path = Path("."), cache_path: Path = CACHE_PATH):
+        self.root = root.resolve()
+        self.cache_path = cache_path
+        self.files: Dict[str, Dict] = {}
+        self._reverse: Optional[Dict[str, Set[str]]] = None
+        # Import targets the file being parsed asked for but that do not exist (yet)
+        self._missing: Set[str] = set()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.files = data.get('files', {})
+        except (OSError, json.JSONDecodeError):
+            self.files = {}
+
+    def save(self) -> None:
+        """Write the graph atomically so concurrent hooks never see a partial file"""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.files}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.cache_path)
+
+    def _walk(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+            for name in filenames:
+                if name.endswith(PY_EXTENSIONS + JS_EXTENSIONS):
+                    yield os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, '/')
+
+    def refresh(self) -> int:
+        """Re-parse files whose mtime changed and drop deleted ones"""
+        seen = set()
+        added = []
+        updated = 0
+        for rel in self._walk():
+            seen.add(rel)
+            try:
+                mtime = os.stat(self.root / rel).st_mtime_ns
+            except OSError:
+                continue
+            entry = self.files.get(rel)
+            if entry is None or entry['mtime'] != mtime:
+                if entry is None:
+                    added.append(rel)
+                self._parse(rel, mtime)
+                updated += 1
+        for rel in list(self.files):
+            if rel not in seen:
+                del self.files[rel]
+                updated += 1
+        self._reresolve(added)
+        self._reverse = None
+        return updated
+
+    def update(self, paths: List[str]) -> None:
+        """Incrementally re-parse just the given files"""
+        added = []
+        for path in paths:
+            rel = self._relative(path)
+            if rel is None:
+                continue
+            full = self.root / rel
+            if full.exists():
+                if rel not in self.files:
+                    added.append(rel)
+                self._parse(rel, os.stat(full).st_mtime_ns)
+            else:
+                self.files.pop(rel, None)
+        self._reresolve(added)
+        self._reverse = None
+
+    def _reresolve(self, added: List[str]) -> None:
+        """Re-parse files whose imports pointed at one of the newly added modules before it existed"""
+        stems = {module_stem(rel) for rel in added}
+        if not stems:
+            return
+        for rel, entry in list(self.files.items()):
+            if rel not in added and stems.intersection(entry.get('missing', ())):
+                self._parse(rel, entry['mtime'])
+
+    def _relative(self, path: str) -> Optional[str]:
+        full = Path(path).resolve()
+        try:
+            rel = full.relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+        return rel if rel.endswith(PY_EXTENSIONS + JS_EXTENSIONS) else None
+
+    def _parse(self, rel: str, mtime: int) -> None:
+        try:
+            with open(self.root / rel, encoding='utf-8', errors='replace') as f:
+                source = f.read()
+        except OSError:
+            return
+        self._missing = set()
+        if rel.endswith(PY_EXTENSIONS):
+            imports = self._python_imports(rel, source)
+        else:
+            imports = self._js_imports(rel, source)
+        self.files[rel] = {'mtime': mtime, 'imports': sorted(imports)}
+        if self._missing:
+            self.files[rel]['missing'] = sorted(self._missing)
+
+    def _exists(self, rel: str) -> bool:
+        return rel in self.files or (self.root / rel).is_file()
+
+    def _python_module(self, module: str, base: Optional[str] = None) -> Optional[str]:
+        """Resolve a dotted module name to a file path relative to the root"""
+        parts = module.split('.') if module else []
+        roots = [base] if base is not None else PY_ROOTS
+        stems = ['/'.join(p for p in [root] + parts if p) for root in roots]
+        for stem in stems:
+            for candidate in (f"{stem}.py", f"{stem}/__init__.py"):
+                if stem and self._exists(candidate):
+                    return candidate
+        self._missing.update(stem for stem in stems if stem)
+        return None
+
+    def _python_imports(self, rel: str, source: str) -> Set[str]:
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError):
+            return set()
+        package = rel.rsplit('/', 1)[0] if '/' in rel else ''
+        found = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    target = self._python_module(alias.name)
+                    if target:
+                        found.add(target)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base_parts = package.split('/') if package else []
+                    base_parts = base_parts[:len(base_parts) - (node.level - 1)]
+                    base = '/'.join(base_parts)
+                else:
+                    base = None
+                module = node.module or ''
+                target = self._python_module(module, base) if module else None
+                if target:
+                    found.add(target)
+                # "from pkg import submodule" imports the submodule file too
+                for alias in node.names:
+                    name = f"{module}.{alias.name}" if module else alias.name
+                    sub = self._python_module(name, base)
+                    if sub:
+                        found.add(sub)
+        found.discard(rel)
+        return found
+
+    def _js_package_dir(self, rel: str) -> str:
+        parts = rel.split('/')[:-1]
+        while parts:
+            if (self.root / '/'.join(parts) / 'package.json').exists():
+                return '/'.join(parts)
+            parts.pop()
+        return ''
+
+    def _js_imports(self, rel: str, source: str) -> Set[str]:
+        directory = rel.rsplit('/', 1)[0] if '/' in rel else ''
+        found = set()
+        for match in JS_IMPORT_RE.finditer(source):
+            spec = next(group for group in match.groups() if group)
+            if spec.startswith('.'):
+                base = os.path.normpath(os.path.join(directory, spec)).replace(os.sep, '/')
+            elif spec.startswith('@/'):
+                # Common bundler alias for <package>/src
+                base = '/'.join(p for p in [self._js_package_dir(rel), 'src', spec[2:]] if p)
+            else:
+                continue
+            target = self._resolve_js(base)
+            if target:
+                found.add(target)
+        found.discard(rel)
+        return found
+
+    def _resolve_js(self, base: str) -> Optional[str]:
+        if base.endswith(JS_EXTENSIONS) and self._exists(base):
+            return base
+        for ext in JS_EXTENSIONS:
+            if self._exists(base + ext):
+                return base + ext
+        for ext in JS_EXTENSIONS:
+            if self._exists(f"{base}/index{ext}"):
+                return f"{base}/index{ext}"
+        self._missing.update((module_stem(base) if base.endswith(JS_EXTENSIONS) else base, f"{base}/index"))
+        return None
+
+    def reverse(self) -> Dict[str, Set[str]]:
+        """Map each file to the files that import it"""
+        if self._reverse is None:
+            self._reverse = {}
+            for rel, entry in self.files.items():
+                for target in entry['imports']:
+                    self._reverse.setdefault(target, set()).add(rel)
+        return self._reverse
+
+    def affected_tests(self, paths: List[str]) -> List[str]:
+        """Walk the reverse graph from changed files to every dependent test"""
+        reverse = self.reverse()
+        queue = deque(rel for rel in (self._relative(p) for p in paths) if rel)
+        seen = set(queue)
+        tests = set()
+        while queue:
+            rel = queue.popleft()
+            if is_test_file(rel):
+                tests.add(rel)
+            for dependent in reverse.get(rel, ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    queue.append(dependent)
+        return sorted(tests)
+
+
+def js_runner(package_dir: Path) -> List[str]:
+    """Pick the JS test command for a package"""
+    try:
+        with open(package_dir / "package.json") as f:
+            package = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        package = {}
+    deps = {**package.get('dependencies', {}), **package.get('devDependencies', {})}
+    if 'vitest' in deps:
+        return ["npx", "vitest", "run"]
+    if 'jest' in deps:
+        return ["npx", "jest"]
+    return ["npm", "test", "--"]
+
+
+def run_tests(graph: ImportGraph, tests: List[str]) -> int:
+    """Run the selected tests, one runner invocation per language/package"""
+    status = 0
+    python_tests = [t for t in tests if t.endswith(PY_EXTENSIONS)]
+    if python_tests:
+        print(f"🧪 pytest: {len(python_tests)} affected test file(s)")
+        status |= subprocess.run(["pytest", "-q", *python_tests], cwd=graph.root).returncode
+
+    by_package: Dict[str, List[str]] = {}
+    for test in tests:
+        if test.endswith(JS_EXTENSIONS):
+            by_package.setdefault(graph._js_package_dir(test), []).append(test)
+    for package_dir, package_tests in by_package.items():
+        cwd = graph.root / package_dir
+        relative = [os.path.relpath(graph.root / t, cwd) for t in package_tests]
+        command = js_runner(cwd)
+        print(f"🧪 {' '.join(command)}: {len(relative)} affected test file(s) in {package_dir or '.'}")
+        status |= subprocess.run(command + relative, cwd=cwd).returncode
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run only the tests affected by changed files")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Update the graph and run affected tests")
+    run.add_argument("paths", nargs="+", help="Changed files")
+    run.add_argument("--full-on-empty", action="store_true",
+                     help="Run the full suite when no affected tests are found")
+
+    show = sub.add_parser("affected", help="List affected tests without running them")
+    show.add_argument("paths", nargs="+", help="Changed files")
+
+    sub.add_parser("refresh", help="Rescan the tree and update changed files")
+
+    args = parser.parse_args()
+    if hasattr(args, 'paths'):
+        # Batched watcher events list every changed file in CLAUDE_FILE_PATHS or CLAUDE_FILE_LIST
+        batch = event_file_paths()
+        args.paths = [p for p in dict.fromkeys(args.paths + batch) if p]
+    graph = ImportGraph()
+
+    if not graph.files or args.command == "refresh":
+        updated = graph.refresh()
+        if args.command == "refresh":
+            graph.save()
+            print(f"✅ Import graph refreshed: {len(graph.files)} files, {updated} updated")
+            return
+    else:
+        graph.update(args.paths)
+    graph.save()
+
+    tests = graph.affected_tests(args.paths)
+    if args.command == "affected":
+        print('\n'.join(tests))
+        return
+
+    if not tests:
+        if args.full_on_empty:
+            print("🧪 No affected tests found, running full suite...")
+            sys.exit(subprocess.run("npm test 2>/dev/null || pytest", shell=True).returncode)
+        print("✅ No tests affected by this change")
+        return
+    sys.exit(run_tests(graph, tests))
+
+
+if __name__ == "__main__":
+    main()
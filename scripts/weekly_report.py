@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Weekly Report for Multi-Agent Squad
+Builds the weekly email from git activity rollups, cached issues and pull requests, and sprint files
+"""
+
+import re
+import sys
+import json
+import html
+import time
+import argparse
+import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from git_activity import ActivityStore
+
+SPRINT_DIR = Path(".sprints")
+SECTIONS = ('summary', 'authors', 'repos', 'pulls', 'issues', 'sprint')
+DONE_STATUSES = {'done', 'completed', 'complete', 'closed', 'merged'}
+MAX_ITEMS = 15
+MAX_AUTHORS = 10
+BURNDOWN_LINE = re.compile(r"Day (\d+): (-?\d+) points remaining")
+BOARD_ROW = re.compile(r"^\|\s*([A-Z]+-\d+)\s*\|[^|]*\|[^|]*\|\s*([^|]+?)\s*\|")
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _sprint_file(sprint_dir: Path, name: str) -> Path:
+    # Closed sprints are moved to archived/
+    path = sprint_dir / name
+    return path if path.exists() else sprint_dir / "archived" / name
+
+
+def load_sprint(sprint_dir: Path = SPRINT_DIR) -> Optional[Dict]:
+    """Progress of the current sprint from the files sprint-management.sh writes"""
+    current = _read_json(sprint_dir / "current-sprint.json")
+    if not current or not current.get('sprint_number'):
+        return None
+    number = current['sprint_number']
+    plan = _read_json(_sprint_file(sprint_dir, f"sprint-{number}-plan.json")) or {}
+    board = {}
+    try:
+        with open(_sprint_file(sprint_dir, f"sprint-{number}-board.md")) as f:
+            for line in f:
+                match = BOARD_ROW.match(line)
+                if match:
+                    board[match.group(1)] = match.group(2)
+    except OSError:
+        pass
+
+    stories = plan.get('stories') or current.get('stories') or []
+    done, open_stories = [], []
+    for story in stories:
+        status = story.get('status') or board.get(story.get('id'), 'To Do')
+        entry = {'id': story.get('id', '?'), 'title': story.get('title', ''), 'points': story.get('points', 0),
+                 'status': status}
+        (done if status.lower() in DONE_STATUSES else open_stories).append(entry)
+    total = plan.get('total_points', sum(s['points'] for s in done + open_stories))
+    points_done = sum(s['points'] for s in done)
+
+    remaining = total - points_done
+    try:
+        with open(_sprint_file(sprint_dir, f"sprint-{number}-burndown.log")) as f:
+            matches = [BURNDOWN_LINE.search(line) for line in f]
+        matches = [m for m in matches if m]
+        if matches:
+            remaining = int(matches[-1].group(2))
+    except OSError:
+        pass
+    return {'number': number, 'status': current.get('status', 'unknown'), 'goal': plan.get('sprint_goal', ''),
+            'start': plan.get('start_date'), 'end': plan.get('end_date'), 'points_total': total,
+            'points_done': points_done, 'remaining': remaining, 'done': done, 'open': open_stories}
+
+
+def recipient_groups(config: Dict) -> List[Dict]:
+    """`report_groups` from the email config, or one group of every recipient seeing every section"""
+    groups = []
+    for group in config.get('report_groups') or []:
+        if not group.get('recipients'):
+            continue
+        groups.append({'name': group.get('name', 'team'), 'recipients': list(group['recipients']),
+                       'sections': [s for s in group.get('sections', SECTIONS) if s in SECTIONS],
+                       'repos': group.get('repos')})
+    return groups or [{'name': 'team', 'recipients': list(config.get('recipients', [])),
+                       'sections': list(SECTIONS), 'repos': None}]
+
+
+def collect(store: ActivityStore, end: datetime.date, repos: Optional[List[str]] = None,
+            sprint: Optional[Dict] = None) -> Dict:
+    """Everything one report shows; each part is a range query over daily rows"""
+    start = end - datetime.timedelta(days=6)
+    previous_end = start - datetime.timedelta(days=1)
+    days = [(start + datetime.timedelta(days=i)).isoformat() for i in range(7)]
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': days,
+        'week': store.summary(days[0], days[-1], repos),
+        'previous': store.summary((previous_end - datetime.timedelta(days=6)).isoformat(),
+                                  previous_end.isoformat(), repos),
+        'pulls': store.items('pr', days[0], days[-1], repos),
+        'issues': store.items('issue', days[0], days[-1], repos),
+        'sprint': sprint,
+    }
+
+
+def trend(current: int, previous: int) -> str:
+    if not previous:
+        return "new" if current else "–"
+    change = (current - previous) * 100 // previous
+    return f"{change:+d}% vs last week"
+
+
+def _top_authors(week: Dict) -> List[Tuple[str, Dict]]:
+    return sorted(week['authors'].items(), key=lambda item: (-item[1]['commits'], item[0]))[:MAX_AUTHORS]
+
+
+def render_text(data: Dict, sections: List[str]) -> Tuple[str, str]:
+    """Subject and plain-text body"""
+    week = data['week']
+    subject = (f"Weekly Project Report - {data['start']} to {data['end']}: "
+               f"{week['commits']} commits, {len(data['pulls'])} PRs merged")
+    lines = ["Weekly Project Report", "=====================", "",
+             f"Week: {data['start']} to {data['end']}", ""]
+    if 'summary' in sections:
+        lines += ["Summary", "-------",
+                  f"- Commits: {week['commits']} ({trend(week['commits'], data['previous']['commits'])})",
+                  f"- Files changed: {week['files_changed']}",
+                  f"- Lines: +{week['lines_added']} -{week['lines_removed']}",
+                  f"- Contributors: {len(week['authors'])}",
+                  f"- Pull requests merged: {len(data['pulls'])}",
+                  f"- Issues closed: {len(data['issues'])}", ""]
+        peak = max((week['days'].get(day, {}).get('commits', 0) for day in data['days']), default=0)
+        for day in data['days']:
+            commits = week['days'].get(day, {}).get('commits', 0)
+            bar = "#" * (commits * 20 // peak if peak else 0)
+            lines.append(f"  {datetime.date.fromisoformat(day).strftime('%a')} {bar:<20} {commits}")
+        lines.append("")
+    if 'authors' in sections and week['authors']:
+        lines += ["Contributors", "------------"]
+        for author, entry in _top_authors(week):
+            lines.append(f"- {author}: {entry['commits']} commits, +{entry['lines_added']} -{entry['lines_removed']}")
+        lines.append("")
+    if 'repos' in sections and len(week['repos']) > 1:
+        lines += ["Repositories", "------------"]
+        for repo, entry in sorted(week['repos'].items(), key=lambda item: -item[1]['commits']):
+            lines.append(f"- {repo}: {entry['commits']} commits, +{entry['lines_added']} -{entry['lines_removed']}")
+        lines.append("")
+    for key, title in (('pulls', "Merged Pull Requests"), ('issues', "Closed Issues")):
+        if key not in sections or not data[key]:
+            continue
+        lines += [title, "-" * len(title)]
+        for item in data[key][:MAX_ITEMS]:
+            lines.append(f"- {item['repo']}#{item['number']} {item['title']} (@{item['author']})")
+        if len(data[key]) > MAX_ITEMS:
+            lines.append(f"- … and {len(data[key]) - MAX_ITEMS} more")
+        lines.append("")
+    sprint = data['sprint']
+    if 'sprint' in sections and sprint:
+        title = f"Sprint {sprint['number']} ({sprint['status']})"
+        lines += [title, "-" * len(title)]
+        if sprint['goal']:
+            lines.append(f"Goal: {sprint['goal']}")
+        if sprint['start'] and sprint['end']:
+            lines.append(f"Dates: {sprint['start']} to {sprint['end']}")
+        lines.append(f"Points: {sprint['points_done']}/{sprint['points_total']} done, {sprint['remaining']} remaining")
+        for story in sprint['done']:
+            lines.append(f"  ✓ {story['id']} {story['title']} ({story['points']} pts)")
+        for story in sprint['open']:
+            lines.append(f"  · {story['id']} {story['title']} ({story['points']} pts, {story['status']})")
+        lines.append("")
+    lines.append("Generated automatically by Multi-Agent Squad")
+    return subject, "\n".join(lines) + "\n"
+
+
+def render_html(data: Dict, sections: List[str]) -> str:
+    """HTML body with inline styles, since most mail clients drop <style> blocks"""
+    e = html.escape
+    week = data['week']
+    cell = 'style="padding:4px 8px;border-bottom:1px solid #eee"'
+    parts = ['<div style="font-family:-apple-system,Segoe UI,Helvetica,Arial,sans-serif;color:#222;max-width:640px">',
+             f'<h2 style="margin-bottom:4px">Weekly Project Report</h2>'
+             f'<div style="color:#666">{e(data["start"])} to {e(data["end"])}</div>']
+    if 'summary' in sections:
+        stats = [("Commits", week['commits']), ("Files changed", week['files_changed']),
+                 ("Lines", f"+{week['lines_added']} / -{week['lines_removed']}"),
+                 ("Contributors", len(week['authors'])), ("PRs merged", len(data['pulls'])),
+                 ("Issues closed", len(data['issues']))]
+        parts.append('<table style="border-collapse:collapse;margin:16px 0"><tr>' + ''.join(
+            f'<td style="padding:8px 12px;text-align:center"><div style="font-size:20px;font-weight:bold">'
+            f'{e(str(value))}</div><div style="color:#666;font-size:12px">{label}</div></td>'
+            for label, value in stats) + '</tr></table>')
+        parts.append(f'<div style="color:#666;font-size:12px">'
+                     f'{e(trend(week["commits"], data["previous"]["commits"]))}</div>')
+        peak = max((week['days'].get(day, {}).get('commits', 0) for day in data['days']), default=0)
+        rows = []
+        for day in data['days']:
+            commits = week['days'].get(day, {}).get('commits', 0)
+            width = commits * 200 // peak if peak else 0
+            rows.append(f'<tr><td style="padding:2px 8px">{datetime.date.fromisoformat(day).strftime("%a")}</td>'
+                        f'<td style="padding:2px 0"><div style="background:#4a90d9;height:10px;width:{width}px">'
+                        f'</div></td><td style="padding:2px 8px">{commits}</td></tr>')
+        parts.append('<table style="border-collapse:collapse">' + ''.join(rows) + '</table>')
+    if 'authors' in sections and week['authors']:
+        parts.append('<h3>Contributors</h3><table style="border-collapse:collapse">' + ''.join(
+            f'<tr><td {cell}>{e(author)}</td><td {cell}>{entry["commits"]} commits</td>'
+            f'<td {cell}>+{entry["lines_added"]} / -{entry["lines_removed"]}</td></tr>'
+            for author, entry in _top_authors(week)) + '</table>')
+    if 'repos' in sections and len(week['repos']) > 1:
+        parts.append('<h3>Repositories</h3><table style="border-collapse:collapse">' + ''.join(
+            f'<tr><td {cell}>{e(repo)}</td><td {cell}>{entry["commits"]} commits</td>'
+            f'<td {cell}>+{entry["lines_added"]} / -{entry["lines_removed"]}</td></tr>'
+            for repo, entry in sorted(week['repos'].items(), key=lambda item: -item[1]['commits'])) + '</table>')
+    for key, title in (('pulls', "Merged Pull Requests"), ('issues', "Closed Issues")):
+        if key not in sections or not data[key]:
+            continue
+        items = []
+        for item in data[key][:MAX_ITEMS]:
+            label = f"{item['repo']}#{item['number']}"
+            link = f'<a href="{e(item["url"])}">{e(label)}</a>' if item['url'] else e(label)
+            items.append(f'<li>{link} {e(item["title"])} <span style="color:#666">@{e(item["author"])}</span></li>')
+        if len(data[key]) > MAX_ITEMS:
+            items.append(f'<li style="color:#666">… and {len(data[key]) - MAX_ITEMS} more</li>')
+        parts.append(f'<h3>{title}</h3><ul>{"".join(items)}</ul>')
+    sprint = data['sprint']
+    if 'sprint' in sections and sprint:
+        percent = sprint['points_done'] * 100 // sprint['points_total'] if sprint['points_total'] else 0
+        parts.append(f'<h3>Sprint {sprint["number"]} ({e(sprint["status"])})</h3>')
+        if sprint['goal']:
+            parts.append(f'<div>Goal: {e(sprint["goal"])}</div>')
+        parts.append(f'<div style="background:#eee;width:300px;height:12px;margin:8px 0">'
+                     f'<div style="background:#5cb85c;height:12px;width:{percent * 3}px"></div></div>'
+                     f'<div>{sprint["points_done"]}/{sprint["points_total"]} points done, '
+                     f'{sprint["remaining"]} remaining</div>')
+        parts.append('<ul>' + ''.join(
+            f'<li>{"✓" if story in sprint["done"] else "·"} {e(story["id"])} {e(story["title"])} '
+            f'<span style="color:#666">({story["points"]} pts, {e(story["status"])})</span></li>'
+            for story in sprint['done'] + sprint['open']) + '</ul>')
+    parts.append('<p style="color:#999;font-size:12px">Generated automatically by Multi-Agent Squad</p></div>')
+    return "\n".join(parts)
+
+
+def build_reports(config: Dict, end: Optional[datetime.date] = None, store: Optional[ActivityStore] = None,
+                  sprint_dir: Path = SPRINT_DIR, refresh: bool = True) -> List[Dict]:
+    """One rendered report per recipient group: subject, text and HTML, built once and sent to all members"""
+    end = end or datetime.date.today()
+    store = store or ActivityStore()
+    if refresh:
+        store.refresh()
+    sprint = load_sprint(sprint_dir)
+    collected: Dict[Optional[Tuple], Dict] = {}
+    reports = []
+    for group in recipient_groups(config):
+        key = tuple(group['repos']) if group['repos'] is not None else None
+        if key not in collected:
+            collected[key] = collect(store, end, group['repos'], sprint)
+        subject, text = render_text(collected[key], group['sections'])
+        reports.append({'group': group['name'], 'recipients': group['recipients'], 'subject': subject,
+                        'text': text, 'html': render_html(collected[key], group['sections'])})
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preview the weekly report email")
+    parser.add_argument("--date", type=datetime.date.fromisoformat, help="Last day of the report week")
+    parser.add_argument("--config", type=Path, default=Path(".claude/integrations/email.json"))
+    parser.add_argument("--html", action="store_true", help="Print the HTML body instead of the text")
+    parser.add_argument("--group", help="Only this recipient group")
+    args = parser.parse_args()
+
+    config = _read_json(args.config) or {}
+    start = time.perf_counter()
+    reports = build_reports(config, args.date)
+    elapsed = (time.perf_counter() - start) * 1000
+    for report in reports:
+        if args.group and report['group'] != args.group:
+            continue
+        print(f"To ({report['group']}): {', '.join(report['recipients'])}")
+        print(f"Subject: {report['subject']}\n")
+        print(report['html'] if args.html else report['text'])
+    print(f"⏱️  Built {len(reports)} report(s) in {elapsed:.0f}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
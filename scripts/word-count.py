@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Incremental Word Count for Multi-Agent Squad
+Keeps a per-file word count index and a per-day writing progress history
+"""
+
+import os
+import sys
+import json
+import argparse
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+INDEX_PATH = Path(".claude/cache/word-index.json")
+HISTORY_PATH = Path(".writing-progress.json")
+INDEX_VERSION = 1
+
+EXTENSIONS = ('.md', '.txt')
+SKIP_DIRS = {'.git', 'node_modules', '.venv', 'venv', '__pycache__', '.claude'}
+# Below this many changed files, counting in-process beats starting workers
+PARALLEL_THRESHOLD = 32
+
+
+def count_words(path: str) -> Tuple[str, int]:
+    """Count whitespace separated words, like wc -w"""
+    try:
+        with open(path, 'rb') as f:
+            return path, len(f.read().split())
+    except OSError:
+        return path, 0
+
+
+def read_roots(path: Path) -> Dict[str, Dict]:
+    """The {resolved root: entries} map stored in an index file, or {} if unreadable"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return data['roots'] if data.get('version') == INDEX_VERSION else {}
+    except (OSError, json.JSONDecodeError, KeyError, AttributeError):
+        return {}
+
+
+class WordIndex:
+    """Word counts keyed by path, validated by mtime and size; one entry per counted root"""
+
+    def __init__(self, root: Path, index_path: Path = INDEX_PATH):
+        self.root = root
+        self.index_path = index_path
+        self.files: Dict[str, List[int]] = read_roots(index_path).get(str(root), {})
+
+    def save(self) -> None:
+        # Re-read so roots counted since we loaded are kept
+        roots = read_roots(self.index_path)
+        roots[str(self.root)] = self.files
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'roots': roots}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def _scan(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                if name.endswith(EXTENSIONS):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_mtime_ns, st.st_size
+
+    def update(self) -> Tuple[int, int]:
+        """Recount only new or modified files; returns (total words, files recounted)"""
+        current = {}
+        stale = []
+        for path, mtime, size in self._scan():
+            entry = self.files.get(path)
+            if entry and entry[0] == mtime and entry[1] == size:
+                current[path] = entry
+            else:
+                current[path] = [mtime, size, 0]
+                stale.append(path)
+
+        if len(stale) >= PARALLEL_THRESHOLD:
+            with ProcessPoolExecutor() as pool:
+                counts = pool.map(count_words, stale, chunksize=16)
+                for path, words in counts:
+                    current[path][2] = words
+        else:
+            for path in stale:
+                current[path][2] = count_words(path)[1]
+
+        self.files = current
+        return sum(entry[2] for entry in current.values()), len(stale)
+
+
+class ProgressHistory:
+    """Per-day totals for one root, stored as {root: {"YYYY-MM-DD": [start, end, sessions]}}"""
+
+    def __init__(self, root: Path, path: Path = HISTORY_PATH):
+        self.root = str(root)
+        self.path = path
+        try:
+            with open(path) as f:
+                self.roots: Dict[str, Dict[str, List[int]]] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.roots = {}
+        self.days = self.roots.setdefault(self.root, {})
+
+    def record(self, total: int) -> int:
+        """Record a session total and return the words written today"""
+        today = datetime.date.today().isoformat()
+        if today not in self.days:
+            previous = self.days[max(self.days)][1] if self.days else total
+            self.days[today] = [previous, total, 0]
+        self.days[today][1] = total
+        self.days[today][2] += 1
+        with open(self.path, 'w') as f:
+            json.dump(self.roots, f, separators=(',', ':'), sort_keys=True)
+        return total - self.days[today][0]
+
+    def show(self, days: int) -> None:
+        print("📈 Writing progress")
+        for day in sorted(self.days)[-days:]:
+            start, end, sessions = self.days[day]
+            print(f"  {day}  {end:>8} words  {end - start:+7}  ({sessions} sessions)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental word count for writing projects")
+    parser.add_argument("--root", default=".", help="Directory to count")
+    parser.add_argument("--history", type=int, nargs="?", const=14, metavar="DAYS",
+                        help="Show the per-day history instead of counting")
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"Directory not found: {root}", file=sys.stderr)
+        sys.exit(1)
+    root = root.resolve()
+
+    history = ProgressHistory(root)
+    if args.history:
+        history.show(args.history)
+        return
+
+    index = WordIndex(root)
+    total, recounted = index.update()
+    index.save()
+    today = history.record(total)
+    print(f"📝 Session word count: {total} total words ({today:+} today, {recounted} files recounted)")
+
+
+if __name__ == "__main__":
+    main()